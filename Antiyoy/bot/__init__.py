@@ -8,6 +8,11 @@ from .province import Province, ProvinceManager
 from .ai_simple import SimpleAI
 from .ai_rl_ready import RLReadyAI, RLAction, GameState
 from .rl_policy import QTablePolicy, RewardCalculator, create_policy
+from .perspective import PerspectiveView
+from .engine import Engine, play_match
+from .batch_sim import BatchSimulator
+from .selfplay import SelfPlayPool
+from .mcts import MCTSPlanner, TurnModel
 
 # Try to import DQN if PyTorch is available
 try:
@@ -18,6 +23,8 @@ except ImportError:
 __all__ = [
     'GameUtils', 'Province', 'ProvinceManager', 
     'SimpleAI', 'RLReadyAI', 'RLAction', 'GameState',
-    'QTablePolicy', 'DQNPolicy', 'RewardCalculator', 'create_policy'
+    'QTablePolicy', 'DQNPolicy', 'RewardCalculator', 'create_policy',
+    'PerspectiveView', 'Engine', 'play_match', 'BatchSimulator',
+    'SelfPlayPool', 'MCTSPlanner', 'TurnModel'
 ]
 
@@ -15,6 +15,12 @@ from typing import List, Optional, Tuple, Set, Dict
 from enum import IntEnum
 from .game_utils import GameUtils, Resident, UNIT_PRICES, INCOME_TABLE
 from .province import Province, ProvinceManager
+from .hex_geometry import get_grid
+from .engine import ACTION_PLACE
+from .propagation import PropagationGrid
+from .defense import DefensePlanner
+from .phase_timer import timed
+from .situation import SituationReport
 
 MOVE_DELAY = 0.5
 
@@ -108,6 +114,9 @@ class RLReadyAI:
         self.debug = debug
         self.province_manager = ProvinceManager(board, my_player_id)
         self.failed_targets: Set[Tuple[int, int]] = set()
+        self.moved_units: Set[Tuple[int, int]] = set()
+        self.defense: Optional[DefensePlanner] = None  # Built on first use each turn
+        self.defense_used: Set[int] = set()
         
         # RL policy (if None, uses rule-based fallback)
         self.rl_policy = rl_policy
@@ -122,6 +131,7 @@ class RLReadyAI:
         self.front_line: List = []
         self.neutral_lands: List = []
         self.threat_level = 0
+        self.situations: Dict[int, SituationReport] = {}  # id(province) -> report, for this turn
     
     def log(self, msg: str):
         if self.debug:
@@ -129,11 +139,15 @@ class RLReadyAI:
     
     # ==================== MAIN TURN LOGIC ====================
     
+    @timed
     def make_move(self):
         """Execute turn with hardcoded + RL-controlled actions."""
         self.log(f"=== Turn for player {self.my_player_id} ===")
         self.units_built = 0
         self.money_spent = 0
+        self.moved_units = set()
+        self.defense = None
+        self.situations.clear()
         
         for province in self.province_manager.my_provinces:
             self.log(f"Province: {len(province.hexes)} hexes, {province.money}g, income {province.get_income()}")
@@ -172,6 +186,7 @@ class RLReadyAI:
     
     # ==================== STATE EXTRACTION ====================
     
+    @timed
     def extract_state_features(self, province: Province):
         """Extract normalized features for RL model."""
         total_hexes = self.board.width * self.board.height
@@ -198,12 +213,7 @@ class RLReadyAI:
         
         # Defense
         self.state.front_line_size = min(len(self.front_line) / 20.0, 1.0)
-        if self.front_line:
-            undefended = sum(1 for h in self.front_line 
-                           if GameUtils.get_defense_level(h, self.board) == 0)
-            self.state.undefended_pct = undefended / len(self.front_line)
-        else:
-            self.state.undefended_pct = 0.0
+        self.state.undefended_pct = self.situation(province).undefended_share()
         
         # Opportunities
         self.state.neutral_lands_nearby = min(len(self.neutral_lands) / 10.0, 1.0)
@@ -212,20 +222,19 @@ class RLReadyAI:
         attackable_farms = 0
         can_attack_castle = False
         if province.castle_hex:
-            for strength in range(1, 5):
-                placeable = self.province_manager.get_placeable_hexes(province, strength)
-                for h in placeable:
-                    if h.owner_id != self.my_player_id:
-                        if h.resident == Resident.Farm:
-                            attackable_farms += 1
-                        if h.resident == Resident.Castle:
-                            can_attack_castle = True
+            for h, weakest, strongest in self.province_manager.get_placement_strengths(province):
+                if h.owner_id != self.my_player_id:
+                    if h.resident == Resident.Farm:
+                        attackable_farms += strongest - weakest + 1  # Once per strength that takes it
+                    if h.resident == Resident.Castle:
+                        can_attack_castle = True
         
         self.state.attackable_farms = min(attackable_farms / 5.0, 1.0)
         self.state.can_attack_castle = 1.0 if can_attack_castle else 0.0
     
     # ==================== RL ACTION SELECTION ====================
     
+    @timed
     def choose_rl_action(self, province: Province) -> RLAction:
         """Choose action using RL policy or fallback rules."""
         if self.rl_policy is not None:
@@ -267,6 +276,7 @@ class RLReadyAI:
         # Default: balanced between expand and attack
         return RLAction.EXPAND if len(self.neutral_lands) > 0 else RLAction.ATTACK
     
+    @timed
     def execute_rl_action(self, province: Province, action: RLAction):
         """Execute the chosen RL action."""
         self.log(f"  RL Action: {action.name}")
@@ -378,35 +388,23 @@ class RLReadyAI:
     
     # ==================== HARDCODED ACTIONS ====================
     
+    @timed
     def analyze_situation(self, province: Province):
         """Analyze threats and opportunities."""
-        self.enemy_threats = []
-        self.front_line = []
-        self.neutral_lands = []
-        self.threat_level = 0
-        
-        for h in province.hexes:
-            neighbors = GameUtils.get_hex_neighbors(h.x, h.y, self.board.width, self.board.height)
-            is_front_line = False
-            
-            for nx, ny in neighbors:
-                neighbor = self.board.get_hex(nx, ny)
-                if not neighbor or GameUtils.is_water(neighbor.resident):
-                    continue
-                
-                if neighbor.owner_id == 0:
-                    if neighbor not in self.neutral_lands:
-                        self.neutral_lands.append(neighbor)
-                elif neighbor.owner_id != self.my_player_id:
-                    is_front_line = True
-                    if GameUtils.is_warrior(neighbor.resident):
-                        strength = GameUtils.get_warrior_strength(neighbor.resident)
-                        self.enemy_threats.append((neighbor, strength))
-                        self.threat_level += strength
-            
-            if is_front_line:
-                self.front_line.append(h)
-    
+        report = self.situation(province)
+        self.enemy_threats = report.enemy_threats
+        self.front_line = report.front_line
+        self.neutral_lands = report.neutral_lands
+        self.threat_level = report.threat_level
+    
+    def situation(self, province: Province) -> SituationReport:
+        """This turn's SituationReport of province (bot/situation.py)."""
+        report = self.situations.get(id(province))
+        if report is None:
+            report = self.situations[id(province)] = SituationReport(self.board, province, self.my_player_id)
+        return report
+    
+    @timed
     def move_existing_units(self, province: Province):
         """HARDCODED: Move all existing units (attack/clear trees)."""
         movable = province.get_movable_units()
@@ -437,6 +435,7 @@ class RLReadyAI:
             if tree:
                 self.send_move(unit_hex, tree)
     
+    @timed
     def clear_palms_with_new_units(self, province: Province):
         """HARDCODED: Build units to clear palms (always profitable)."""
         while province.can_afford_unit(1):
@@ -451,41 +450,48 @@ class RLReadyAI:
             else:
                 break
     
+    @timed
     def counter_immediate_threats(self, province: Province):
-        """HARDCODED: React to immediate enemy threats."""
-        for threat_hex, threat_strength in self.enemy_threats:
-            our_hexes = self.get_adjacent_owned_hexes(threat_hex)
-            if not our_hexes:
-                continue
-            
-            best_defense = max(GameUtils.get_defense_level(h, self.board) for h in our_hexes)
-            
-            if best_defense >= threat_strength:
-                continue  # Safe
-            
-            # Try to counter-attack
-            for h in province.hexes:
-                if not GameUtils.is_unmoved_warrior(h.resident):
-                    continue
-                our_str = GameUtils.get_warrior_strength(h.resident)
-                if our_str <= threat_strength:
-                    continue
-                
-                reachable = self.province_manager._get_move_zone(h, our_str)
-                if threat_hex in reachable:
-                    self.log(f"    -> Counter-attack threat at ({threat_hex.x},{threat_hex.y})")
-                    self.send_move(h, threat_hex)
-                    break
+        """HARDCODED: Answer the enemy groups that threaten the province (see defense.py)."""
+        if not province.castle_hex:
+            return
+        width = self.board.width
+        if self.defense is None:
+            self.defense = DefensePlanner(PropagationGrid.from_board(self.board), self.my_player_id)
+            self.defense_used = set()
+        used = self.defense_used
+        used.update(y * width + x for x, y in self.moved_units | self.failed_targets)
+        castle = province.castle_hex
+        answers = self.defense.plan([h.y * width + h.x for h in province.hexes], castle.y * width + castle.x,
+                                    province.money, province.get_income(), used, min_danger=0.0)
+        
+        for answer in answers:
+            target = self.board.hexes[answer.target]
+            self.log(f"    -> Defense: {answer.kind} against ({target.x},{target.y})")
+            for action in answer.actions(width):
+                if action[0] == ACTION_PLACE:
+                    _, resident, _, _, x, y = action
+                    resident = Resident(resident)
+                    if not self.send_place(resident, castle, self.board.get_hex(x, y)):
+                        break
+                    province.money -= UNIT_PRICES[resident]
+                    self.units_built += 1
+                else:
+                    _, x_from, y_from, x, y = action
+                    if not self.send_move(self.board.get_hex(x_from, y_from), self.board.get_hex(x, y)):
+                        break
     
+    @timed
     def pull_idle_units_to_front(self, province: Province):
         """HARDCODED: Pull idle units toward front line."""
         if len(province.hexes) < 15:
             return
         
         movable = province.get_movable_units()
+        grid = get_grid(self.board.width, self.board.height)
         
         for unit_hex in movable:
-            if unit_hex in self.front_line:
+            if self.situation(province).on_front(unit_hex):
                 continue
             
             closest = None
@@ -494,7 +500,7 @@ class RLReadyAI:
             for fl in self.front_line:
                 if not GameUtils.hex_is_free(fl.resident):
                     continue
-                dist = abs(fl.x - unit_hex.x) + abs(fl.y - unit_hex.y)
+                dist = grid.hex_distance(fl, unit_hex)
                 if dist < min_dist:
                     min_dist = dist
                     closest = fl
@@ -505,14 +511,14 @@ class RLReadyAI:
     # ==================== HELPER METHODS ====================
     
     def find_palm(self, unit_hex) -> Optional:
-        reachable = self.province_manager._get_move_zone(unit_hex, 1)
+        reachable = self.province_manager.get_movements(unit_hex)
         for h in reachable:
             if h.owner_id == self.my_player_id and GameUtils.is_palm(h.resident):
                 return h
         return None
     
     def find_tree(self, unit_hex) -> Optional:
-        reachable = self.province_manager._get_move_zone(unit_hex, 1)
+        reachable = self.province_manager.get_movements(unit_hex)
         for h in reachable:
             if h.owner_id == self.my_player_id and GameUtils.is_tree(h.resident):
                 return h
@@ -575,7 +581,7 @@ class RLReadyAI:
         for h in province.hexes:
             if not GameUtils.hex_is_free(h.resident):
                 continue
-            if h in self.front_line:
+            if self.situation(province).on_front(h):
                 continue
             
             neighbors = GameUtils.get_hex_neighbors(h.x, h.y, self.board.width, self.board.height)
@@ -656,8 +662,10 @@ class RLReadyAI:
                 if not approved:
                     self.failed_targets.add((to_hex.x, to_hex.y))
                 else:
+                    self.moved_units.add((from_hex.x, from_hex.y))
                     time.sleep(MOVE_DELAY)
                 return approved
+        self.moved_units.add((from_hex.x, from_hex.y))
         return True
     
     def send_place(self, resident: Resident, from_hex, to_hex) -> bool:
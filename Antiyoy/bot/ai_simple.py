@@ -15,6 +15,9 @@ import time
 from typing import List, Optional, Tuple, Set, Dict
 from .game_utils import GameUtils, Resident, UNIT_PRICES, INCOME_TABLE
 from .province import Province, ProvinceManager
+from .distance_field import DistanceField
+from .phase_timer import timed
+from .situation import SituationReport
 
 MOVE_DELAY = 0.5
 MAX_EXTRA_FARM_COST = 80  # From Java: Don't build farms if cost > 80
@@ -32,22 +35,27 @@ class ImprovedAI:
         self.province_manager = ProvinceManager(board, my_player_id)
         self.failed_targets: Set[Tuple[int, int]] = set()
         self.units_built_this_turn = 0
+        self.distance_fields: Dict[int, DistanceField] = {}  # strength -> field, rebuilt each turn
         
         # Situation tracking
         self.front_line: List = []
         self.neutral_lands: List = []
         self.enemy_threats: List = []
         self.threat_level = 0
+        self.situations: Dict[int, SituationReport] = {}  # id(province) -> report, for this turn
     
     def log(self, msg: str):
         if self.debug:
             print(f"[AI] {msg}")
     
+    @timed
     def make_move(self):
         """Execute turn matching Java AI structure."""
         self.log(f"=== Turn for player {self.my_player_id} ===")
         self.units_built_this_turn = 0
         self.failed_targets.clear()
+        self.distance_fields.clear()
+        self.situations.clear()
         
         for province in self.province_manager.my_provinces:
             self.log(f"Province: {len(province.hexes)} hexes, {province.money}g, income {province.get_income()}")
@@ -69,39 +77,27 @@ class ImprovedAI:
     
     # ==================== SITUATION ANALYSIS ====================
     
+    @timed
     def analyze_situation(self, province: Province):
         """Analyze threats and opportunities."""
-        self.front_line = []
-        self.neutral_lands = []
-        self.enemy_threats = []
-        self.threat_level = 0
-        
-        for h in province.hexes:
-            neighbors = GameUtils.get_hex_neighbors(h.x, h.y, self.board.width, self.board.height)
-            is_perimeter = False
-            
-            for nx, ny in neighbors:
-                neighbor = self.board.get_hex(nx, ny)
-                if not neighbor or GameUtils.is_water(neighbor.resident):
-                    continue
-                
-                if neighbor.owner_id == 0:
-                    if neighbor not in self.neutral_lands:
-                        self.neutral_lands.append(neighbor)
-                elif neighbor.owner_id != self.my_player_id:
-                    is_perimeter = True
-                    if GameUtils.is_warrior(neighbor.resident):
-                        strength = GameUtils.get_warrior_strength(neighbor.resident)
-                        self.enemy_threats.append((neighbor, strength))
-                        self.threat_level += strength
-            
-            if is_perimeter:
-                self.front_line.append(h)
+        report = self.situation(province)
+        self.front_line = report.front_line
+        self.neutral_lands = list(report.neutral_lands)  # expand_to_neutrals takes targets off it
+        self.enemy_threats = report.enemy_threats
+        self.threat_level = report.threat_level
         
         self.log(f"  Perimeter: {len(self.front_line)}, Neutral: {len(self.neutral_lands)}, Threats: {self.threat_level}")
     
+    def situation(self, province: Province) -> SituationReport:
+        """This turn's SituationReport of province (bot/situation.py)."""
+        report = self.situations.get(id(province))
+        if report is None:
+            report = self.situations[id(province)] = SituationReport(self.board, province, self.my_player_id)
+        return report
+    
     # ==================== MOVE UNITS (Java: moveUnits) ====================
     
+    @timed
     def move_units(self, province: Province):
         """Move all unmoved units."""
         movable = province.get_movable_units()
@@ -150,16 +146,13 @@ class ImprovedAI:
                 if self.send_move(unit_hex, h):
                     return
         
-        # Priority 4: Move through owned territory to find targets
-        # BFS to find nearest attackable hex
-        nearest_target = self.find_nearest_attackable(unit_hex, strength)
-        if nearest_target:
-            # Move one step toward it
-            next_step = self.get_next_step_toward(unit_hex, nearest_target)
-            if next_step:
-                self.log(f"    Unit ({unit_hex.x},{unit_hex.y}) moving toward ({nearest_target.x},{nearest_target.y})")
-                if self.send_move(unit_hex, next_step):
-                    return
+        # Priority 4: Move through owned territory toward the nearest attackable hex
+        field = self.get_distance_field(strength)
+        next_step = field.descend(unit_hex, lambda h: GameUtils.hex_is_free(h.resident))
+        if next_step:
+            self.log(f"    Unit ({unit_hex.x},{unit_hex.y}) moving toward target via ({next_step.x},{next_step.y})")
+            if self.send_move(unit_hex, next_step):
+                return
         
         # Priority 5: Push to better defense if in perimeter
         if self.is_in_perimeter(unit_hex):
@@ -188,66 +181,17 @@ class ImprovedAI:
         
         return result
     
-    def find_nearest_attackable(self, unit_hex, strength: int):
-        """BFS to find nearest attackable enemy/neutral hex."""
-        from collections import deque
-        
-        visited = set()
-        queue = deque([(unit_hex, 0)])  # (hex, distance)
-        
-        while queue:
-            current, dist = queue.popleft()
-            key = (current.x, current.y)
-            
-            if key in visited:
-                continue
-            visited.add(key)
-            
-            # Check if this hex is attackable (enemy or neutral, not ours)
-            if current.owner_id != self.my_player_id and current != unit_hex:
-                defense = GameUtils.get_defense_level(current, self.board)
-                if strength > defense:
-                    return current
-            
-            # Only continue BFS through our territory
-            if current.owner_id != self.my_player_id and current != unit_hex:
-                continue
-            
-            neighbors = GameUtils.get_hex_neighbors(current.x, current.y, self.board.width, self.board.height)
-            for nx, ny in neighbors:
-                if (nx, ny) in visited:
-                    continue
-                h = self.board.get_hex(nx, ny)
-                if h and not GameUtils.is_water(h.resident):
-                    queue.append((h, dist + 1))
-        
-        return None
-    
-    def get_next_step_toward(self, unit_hex, target_hex):
-        """Get the next step from unit toward target through our territory."""
-        # Simple: check adjacent hexes, pick the one that's ours and closest to target
-        neighbors = GameUtils.get_hex_neighbors(unit_hex.x, unit_hex.y, self.board.width, self.board.height)
-        
-        best = None
-        best_dist = 999
-        
-        for nx, ny in neighbors:
-            h = self.board.get_hex(nx, ny)
-            if not h:
-                continue
-            
-            # Must be our territory to move through
-            if h.owner_id != self.my_player_id:
-                continue
-            if not GameUtils.hex_is_free(h.resident):
-                continue  # Can't move to occupied hex
-            
-            dist = abs(nx - target_hex.x) + abs(ny - target_hex.y)
-            if dist < best_dist:
-                best_dist = dist
-                best = h
-        
-        return best
+    def get_distance_field(self, strength: int) -> DistanceField:
+        """Distance to the nearest hex a unit of this strength can take (built once per turn)."""
+        field = self.distance_fields.get(strength)
+        if field is None:
+            def is_target(h):
+                if h.owner_id == self.my_player_id or GameUtils.is_water(h.resident):
+                    return False
+                return strength > GameUtils.get_defense_level(h, self.board)
+            field = DistanceField(self.board, self.my_player_id, is_target)
+            self.distance_fields[strength] = field
+        return field
     
     def try_to_attack_something(self, unit_hex, province: Province, attackable: List, strength: int):
         """Java: tryToAttackSomething() - attack only if safe."""
@@ -401,6 +345,7 @@ class ImprovedAI:
     
     # ==================== SPEND MONEY (Java: spendMoney) ====================
     
+    @timed
     def spend_money(self, province: Province):
         """Java order: Towers -> Farms -> Units."""
         # Step 1: Build towers
@@ -523,7 +468,7 @@ class ImprovedAI:
                 continue
             
             # Don't build on front line
-            if h in self.front_line:
+            if self.situation(province).on_front(h):
                 continue
             
             # Must be adjacent to castle or farm
@@ -656,6 +601,7 @@ class ImprovedAI:
     
     # ==================== MOVE AFK UNITS (Java: moveAfkUnits) ====================
     
+    @timed
     def move_afk_units(self, province: Province):
         """Java: moveAfkUnits() - move idle units to perimeter."""
         if len(province.hexes) < 15:
@@ -673,7 +619,7 @@ class ImprovedAI:
     
     def find_random_perimeter_hex(self, province: Province) -> Optional:
         """Find a random hex on the perimeter."""
-        perimeter = [h for h in province.hexes if self.is_in_perimeter(h)]
+        perimeter = self.situation(province).front_line
         if perimeter:
             return random.choice(perimeter)
         return None
@@ -0,0 +1,133 @@
+"""
+Whole-turn unit-to-target assignment.
+
+AiEasy used to decide its units one at a time in list order: each took
+the best target the units before it had left (targeted_hexes), so a unit
+that could only reach one hex lost it to a unit that had five others, and
+every unit rebuilt its move zone from scratch. Here all units of a
+province are matched against their targets at once:
+
+    values[unit][target] > 0     what sending unit onto target is worth
+
+built from the board's precomputed tables (MoveGenerator reach, the
+AttackTable's capture values), and solved for the largest total value
+with every unit and every target used at most once. Units that get
+nothing are left to the caller's one-by-one rules (trees, defense,
+advancing).
+
+Small problems are solved exactly (Hungarian method, shortest augmenting
+paths with potentials, O(units^2 * targets)); above EXACT_LIMIT units the
+greedy matching takes pairs best-first from a heap (at least half the
+optimum, O(pairs log pairs)).
+
+    plan = assign(values)                 # {unit: target}
+    for unit, target in plan.items():
+        ...
+"""
+
+import heapq
+from typing import Dict, Hashable, List
+
+EXACT_LIMIT = 40  # Units solved with the Hungarian method; more go greedy
+
+Values = Dict[Hashable, Dict[Hashable, float]]
+
+
+def greedy_assignment(values: Values) -> Dict[Hashable, Hashable]:
+    """Best remaining (unit, target) pair first until no pair has both free."""
+    heap = []
+    for order, (unit, row) in enumerate(values.items()):
+        for rank, (target, value) in enumerate(row.items()):
+            if value > 0:
+                heap.append((-value, order, rank, unit, target))
+    heapq.heapify(heap)
+    plan: Dict[Hashable, Hashable] = {}
+    taken = set()
+    while heap:
+        _, _, _, unit, target = heapq.heappop(heap)
+        if unit in plan or target in taken:
+            continue
+        plan[unit] = target
+        taken.add(target)
+    return plan
+
+
+def optimal_assignment(values: Values) -> Dict[Hashable, Hashable]:
+    """Largest total value; a unit stays unassigned when no target adds to the total."""
+    units = [u for u, row in values.items() if any(v > 0 for v in row.values())]
+    if not units:
+        return {}
+    targets: List[Hashable] = []
+    column: Dict[Hashable, int] = {}
+    for u in units:
+        for t, v in values[u].items():
+            if v > 0 and t not in column:
+                column[t] = len(targets)
+                targets.append(t)
+    n = len(units)
+    m = len(targets) + n  # One "stay" column per unit, worth 0
+    # Costs (negated values), rows and columns 1-based as in the classic formulation
+    blocked = 1.0 + sum(max(values[u].values()) for u in units)
+    cost = [None]
+    for r, u in enumerate(units):
+        row = [0.0] + [blocked] * m
+        for t, v in values[u].items():
+            if v > 0:
+                row[column[t] + 1] = -v
+        row[len(targets) + r + 1] = 0.0
+        cost.append(row)
+
+    inf = float('inf')
+    pot_row = [0.0] * (n + 1)
+    pot_col = [0.0] * (m + 1)
+    match = [0] * (m + 1)  # Column -> row
+    way = [0] * (m + 1)
+    for r in range(1, n + 1):
+        match[0] = r
+        j0 = 0
+        best = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            c_row = cost[i0]
+            p_i0 = pot_row[i0]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if used[j]:
+                    continue
+                cur = c_row[j] - p_i0 - pot_col[j]
+                if cur < best[j]:
+                    best[j] = cur
+                    way[j] = j0
+                if best[j] < delta:
+                    delta = best[j]
+                    j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    pot_row[match[j]] += delta
+                    pot_col[j] -= delta
+                else:
+                    best[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    plan: Dict[Hashable, Hashable] = {}
+    for j in range(1, len(targets) + 1):
+        r = match[j]
+        if r and cost[r][j] < 0:
+            plan[units[r - 1]] = targets[j - 1]
+    return plan
+
+
+def assign(values: Values) -> Dict[Hashable, Hashable]:
+    """Exact for up to EXACT_LIMIT units, greedy above."""
+    if len(values) <= EXACT_LIMIT:
+        return optimal_assignment(values)
+    return greedy_assignment(values)
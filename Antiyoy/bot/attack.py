@@ -0,0 +1,87 @@
+"""
+Per-turn attack targets, after AttackManager.java (AiMaster).
+
+AttackManager plans around getStrengthNecessaryToCapture(): the weakest
+warrior that can take a hex, i.e. one more than the strongest defender on
+it or next to it (its own resident, or a unit, tower or castle of its owner
+around it), and 4 for anything, since a Warrior4 beats every defender.
+AttackTable works that out once for every hex that isn't ours, together
+with what the bots rank targets by, so unit moves and purchases look
+values up instead of rescanning neighbours for every candidate:
+
+    required[i]   strength needed to take hex i (NO_ATTACK for water and our land)
+    value[i]      attack allure for us: our hexes around i, +10 for enemy land
+    covered[i]    i is next to a tower of its owner (what Barons go for)
+    attackers[i]  our unmoved units that can reach and take i this turn
+    targets[u]    the hexes unit u can take this turn (same data, by unit)
+
+The reach of all our unmoved units is cast in one PropagationGrid.cast()
+batch (through our land, MOVE_LIMIT steps, like possibleMovements).
+
+    table = AttackTable(PropagationGrid.from_board(board), player)
+    hexes = [i for i in zone if table.can_take(i, 2)]   # where a Spearman can attack
+    table.attackers.get(i, [])                          # who can take i without buying
+"""
+
+from typing import Dict, List
+
+from .engine import POWER, STRONG_TOWER, TOWER, is_unmoved
+from .hex_geometry import MOVE_LIMIT
+from .propagation import Caster, PropagationGrid
+
+NO_ATTACK = 5  # Above any warrior's strength
+ENEMY_BONUS = 10  # get_attack_allure: enemy land before neutral land
+
+
+class AttackTable:
+    """Capture requirements and attack values of every hex, for one player and one board."""
+
+    def __init__(self, grid: PropagationGrid, player: int):
+        self.grid = grid
+        self.player = player
+        owner = grid.owner
+        resident = grid.resident
+        neighbors = grid.neighbors
+        land = grid.land
+        self.own = own = grid.owner_mask(player)
+
+        self.required = required = [NO_ATTACK] * grid.size
+        self.value = value = [0] * grid.size
+        self.covered = covered = [False] * grid.size
+        for i in range(grid.size):
+            if own[i] or not land[i]:
+                continue
+            o = owner[i]
+            defense = POWER[resident[i]]
+            mine = 0
+            for n in neighbors[i]:
+                if owner[n] == o:
+                    r = resident[n]
+                    defense = max(defense, POWER[r])
+                    if r == TOWER or r == STRONG_TOWER:
+                        covered[i] = True
+                elif own[n]:
+                    mine += 1
+            required[i] = min(max(defense + 1, 1), 4)
+            value[i] = mine + (ENEMY_BONUS if o != 0 else 0)
+
+        units = [i for i in range(grid.size) if own[i] and is_unmoved(resident[i])]
+        reaches = grid.cast([Caster([u], MOVE_LIMIT, through=own) for u in units])
+        self.targets: Dict[int, List[int]] = {}
+        self.attackers: Dict[int, List[int]] = {}
+        for u, reach in zip(units, reaches):
+            strength = POWER[resident[u]]
+            found = [i for i in reach.reached() if required[i] <= strength]
+            self.targets[u] = found
+            for i in found:
+                self.attackers.setdefault(i, []).append(u)
+
+    def can_take(self, i: int, strength: int) -> bool:
+        return self.required[i] <= strength
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'attackable': len(self.attackers),
+            'units': len(self.targets),
+            'enemy_targets': sum(1 for i in self.attackers if self.grid.owner[i] != 0),
+        }
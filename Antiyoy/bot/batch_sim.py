@@ -0,0 +1,682 @@
+"""
+Lockstep batch simulator: many games stepped together with numpy.
+
+B games of one board size are stored as stacked (B, width*height) arrays
+of owner, resident and castle money (money sits on the castle hex, like
+Country::castles). Province labels are recomputed for all games at once
+by min-label propagation with pointer jumping, and every rule that works
+per province (income, upkeep, bankruptcy, castle merging and founding,
+lone-hex rot) becomes a bincount over (game, label) keys.
+
+Turns are driven by the high-level RLAction of the player to move. The
+same turn is applied to every game in one vectorized step:
+
+1. units advance: every unmoved warrior captures its best neighbouring
+   hex it is strong enough to take (one hex, not the full 4-hex reach);
+2. spending: the chosen action buys up to a few pieces per province
+   (ATTACK/EXPAND warriors on the border, FARM farms, DEFEND towers);
+3. end of turn: unmove, graves to trees, income, bankruptcy, tree spread
+   and eliminations, as in Board::nextTurn.
+
+This is a coarse model of the game meant for collecting experience fast;
+Engine (engine.py) is the exact one. Games start from Engine.new_game
+maps, so the starting positions are the real thing.
+"""
+
+import random
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .ai_rl_ready import RLAction
+from .engine import (
+    Engine, POWER, HEX_INCOME, WATER, EMPTY, WARRIOR1, WARRIOR4,
+    WARRIOR1_MOVED, WARRIOR4_MOVED, FARM, CASTLE, TOWER, STRONG_TOWER, PALM, PINE,
+    GRAVESTONE, TREE_SPREAD_PALM, TREE_SPREAD_PINE,
+)
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+NUM_FEATURES = 14  # Same layout as AiRL.extract_state
+# Pieces bought per province by one action (AiRL.action_* limits)
+MAX_BUYS = {RLAction.DEFEND: 2, RLAction.FARM: 2, RLAction.ATTACK: 3, RLAction.EXPAND: 4}
+
+if HAS_NUMPY:
+    _POWER = np.array(POWER, dtype=np.int16)
+    _INCOME = np.array(HEX_INCOME, dtype=np.int32)
+    _UPKEEP = np.array([0, 2, 6, 18, 36], dtype=np.int32)  # By warrior power
+
+
+class BatchSimulator:
+    """
+    B games in lockstep. All games have the same size and player count;
+    finished games are restarted on a new map so the batch stays full.
+    """
+
+    def __init__(self, num_games: int, width: int = 14, height: int = 14, num_players: int = 2,
+                 seed: int = 0, max_rounds: int = 200):
+        if not HAS_NUMPY:
+            raise RuntimeError("BatchSimulator needs numpy")
+        self.num_games = num_games
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.num_players = num_players
+        self.max_rounds = max_rounds
+        self.rng = np.random.default_rng(seed)
+        self._seeds = random.Random(seed)
+
+        n = self.size
+        neighbors = Engine(width, height, 1).directions
+        self.nbr = np.array(neighbors, dtype=np.int64)
+        self.valid_nbr = self.nbr >= 0
+        self.nbr[~self.valid_nbr] = n  # Off-board points at a padding column
+        self.cells = np.arange(n)
+
+        b = num_games
+        self.owner = np.zeros((b, n), dtype=np.int16)
+        self.resident = np.zeros((b, n), dtype=np.int16)
+        self.money = np.zeros((b, n), dtype=np.int32)
+        self.temp_money = np.zeros((b, num_players + 1), dtype=np.int32)
+        self.current = np.ones(b, dtype=np.int64)
+        self.first_round = np.ones(b, dtype=bool)
+        self.rounds = np.ones(b, dtype=np.int64)
+        self.alive = np.zeros((b, num_players + 1), dtype=bool)
+        self.eliminated: List[List[int]] = [[] for _ in range(b)]
+        self.games_finished = 0
+        self.turns = 0
+        self.finished = np.zeros(0, dtype=np.int64)  # Games restarted by the last step
+        self.last_rankings: Dict[int, List[int]] = {}  # Their final rankings
+        self._labels = np.zeros((b, n), dtype=np.int64)
+        self._dirty = np.ones(b, dtype=bool)  # Games whose labels are out of date
+        self.reset(range(b))
+
+    # ==================== SETUP ====================
+
+    def reset(self, games: Sequence[int]):
+        """Start new games (fresh Engine.new_game maps) in the given slots."""
+        for g in games:
+            engine = Engine.new_game(self.width, self.height, self.num_players, seed=self._seeds.getrandbits(32))
+            self.owner[g] = engine.owner
+            self.resident[g] = engine.resident
+            self.money[g] = 0
+            for player in range(1, self.num_players + 1):
+                for castle, amount in engine.castles[player].items():
+                    self.money[g, castle] = amount
+            self.temp_money[g] = 0
+            self.current[g] = 1
+            self.first_round[g] = True
+            self.rounds[g] = 1
+            self.alive[g] = True
+            self.alive[g, 0] = False
+            self.eliminated[g] = []
+            self._dirty[g] = True
+
+    # ==================== NEIGHBOURHOODS ====================
+
+    def _gather(self, arr, pad):
+        """(B, N, 6) neighbour values of a (B, N) array; off-board reads pad."""
+        padded = np.concatenate([arr, np.full((arr.shape[0], 1), pad, dtype=arr.dtype)], axis=1)
+        return padded[:, self.nbr]
+
+    def labels(self):
+        """
+        Province label per hex (lowest hex index of the province), N for
+        neutral hexes. Min-label propagation with hooking and pointer
+        jumping; only games whose owners changed are relabelled.
+        """
+        dirty = np.nonzero(self._dirty)[0]
+        if len(dirty):
+            self._labels[dirty] = self._label_rows(dirty)
+            self._dirty[:] = False
+        return self._labels
+
+    def _label_rows(self, rows):
+        n = self.size
+        owner = self.owner[rows]
+        owned = owner > 0
+        same = (self._gather(owner, 0) == owner[:, :, None]) & owned[:, :, None]
+        # Flat indices into a padded (rows, N+1) label array; non-province neighbours read the padding
+        stride = (np.arange(len(rows)) * (n + 1))[:, None]
+        links = np.where(same, self.nbr[None], n) + stride[:, :, None]
+        lab = np.full((len(rows), n + 1), n, dtype=np.int64)
+        lab[:, :n] = np.where(owned, self.cells[None, :], n)
+        flat = lab.reshape(-1)
+        while True:
+            before = lab[:, :n].copy()
+            smallest = flat[links].min(axis=2)
+            # Hooking: the root a hex points at also takes the smaller neighbour label
+            np.minimum.at(flat, (before + stride).ravel(), smallest.ravel())
+            np.minimum(lab[:, :n], smallest, out=lab[:, :n])
+            while True:  # Pointer jumping until every hex points at its root
+                parent = flat[lab[:, :n] + stride]
+                if np.array_equal(parent, lab[:, :n]):
+                    break
+                lab[:, :n] = parent
+            if np.array_equal(before, lab[:, :n]):
+                return lab[:, :n]
+
+    def _keys(self, lab):
+        """Flat (game, label) keys for bincount; label N is the neutral bucket."""
+        return lab + (np.arange(lab.shape[0]) * (self.size + 1))[:, None]
+
+    def _province_sums(self, keys, values=None):
+        return np.bincount(keys.ravel(), None if values is None else values.ravel(),
+                           minlength=keys.shape[0] * (self.size + 1))
+
+    def _castle_of(self, keys, resident):
+        """Lowest castle hex per (game, label) key, -1 where there is none."""
+        castle_mask = resident == CASTLE
+        result = np.full(keys.shape[0] * (self.size + 1), self.size, dtype=np.int64)
+        cells = np.broadcast_to(self.cells, keys.shape)
+        np.minimum.at(result, keys[castle_mask], cells[castle_mask])
+        result[result == self.size] = -1
+        return result
+
+    def _defense(self, owner, resident):
+        """Strongest piece protecting each hex (its own and same-owner neighbours)."""
+        power = _POWER[resident]
+        nb_power = _POWER[self._gather(resident, WATER)]
+        same = (self._gather(owner, 0) == owner[:, :, None]) & (owner > 0)[:, :, None]
+        guard = np.where(same, nb_power, -1).max(axis=2)
+        return np.maximum(power, guard)
+
+    def _near_water(self, count_edge: bool):
+        water = self._gather(self.resident, WATER if count_edge else EMPTY) == WATER
+        return water.any(axis=2)
+
+    # ==================== PROVINCES ====================
+
+    def fix_provinces(self):
+        """calculateProvince for every province: merge castles, found missing ones, rot lone hexes."""
+        n = self.size
+        lab = self.labels()
+        keys = self._keys(lab)
+        owned = self.owner > 0
+        sizes = self._province_sums(keys)
+        is_castle = self.resident == CASTLE
+        castle_count = self._province_sums(keys, is_castle)
+        keep = self._castle_of(keys, self.resident)
+
+        # Several castles in one province: the lowest one keeps all the money
+        merged = is_castle & (castle_count[keys] > 1)
+        if merged.any():
+            total = self._province_sums(keys, np.where(merged, self.money, 0))
+            drop = merged & (self.cells[None, :] != keep[keys])
+            self.resident[drop] = EMPTY
+            self.money[drop] = 0
+            g, c = np.nonzero(merged & ~drop)
+            self.money[g, c] = total[keys[g, c]]
+
+        # Lone hex without a castle rots
+        lone = owned & (sizes[keys] == 1) & (castle_count[keys] == 0)
+        if lone.any():
+            self._rot(lone)
+
+        # Province without a castle gets one on its first empty hex
+        needs = owned & (sizes[keys] > 1) & (castle_count[keys] == 0)
+        if needs.any():
+            empty_first = np.where(needs & (self.resident == EMPTY), self.cells[None, :], n)
+            any_first = np.where(needs, self.cells[None, :], n)
+            first_empty = np.full(self.num_games * (n + 1), n, dtype=np.int64)
+            first_any = np.full(self.num_games * (n + 1), n, dtype=np.int64)
+            np.minimum.at(first_empty, keys[needs], empty_first[needs])
+            np.minimum.at(first_any, keys[needs], any_first[needs])
+            site = np.where(first_empty < n, first_empty, first_any)
+            g, c = np.nonzero(needs & (self.cells[None, :] == site[keys]))
+            self.resident[g, c] = CASTLE
+            self.money[g, c] = 0
+            # Money held from a captured castle goes to the player's first new castle
+            players = self.owner[g, c]
+            _, first = np.unique(g * (self.num_players + 1) + players, return_index=True)
+            g, c, players = g[first], c[first], players[first]
+            self.money[g, c] = self.temp_money[g, players]
+            self.temp_money[g, players] = 0
+
+        self._eliminate_castleless()
+
+    def _rot(self, mask):
+        """Hexagon::rot on every masked hex."""
+        r = self.resident
+        warriors = mask & (r >= WARRIOR1) & (r <= WARRIOR4_MOVED)
+        buildings = mask & (((r >= CASTLE) & (r <= STRONG_TOWER)) | (r == GRAVESTONE))
+        self.money[mask & (r == CASTLE)] = 0
+        r[warriors] = GRAVESTONE
+        r[buildings] = np.where(self._near_water(False), PALM, PINE)[buildings]
+
+    def _eliminate_castleless(self):
+        has_castle = np.zeros_like(self.alive)
+        g, c = np.nonzero(self.resident == CASTLE)
+        has_castle[g, self.owner[g, c]] = True
+        gone = self.alive & ~has_castle
+        gone[:, 0] = False
+        for g, player in zip(*np.nonzero(gone)):
+            self.alive[g, player] = False
+            self.eliminated[g].append(int(player))
+
+    # ==================== TURN ====================
+
+    def step(self, actions: Sequence[int]):
+        """Play one turn in every game: the player to move uses actions[game]."""
+        actions = np.asarray(actions, dtype=np.int64)
+        self._advance_units()
+        self.fix_provinces()
+        # Games with different actions don't interact, so each round of
+        # purchases covers all of them and needs one province fix-up
+        playing = {action: actions == action for action in MAX_BUYS}
+        for round_ in range(max(MAX_BUYS.values())):
+            bought = False
+            for action, limit in MAX_BUYS.items():
+                if round_ < limit and playing[action].any():
+                    playing[action] &= self._buy(action, playing[action])
+                    bought |= playing[action].any()
+            if not bought:
+                break
+            self.fix_provinces()
+        self.end_turn()
+        self.turns += self.num_games
+
+    def _advance_units(self):
+        """Each unmoved warrior of the player to move takes its best neighbouring hex."""
+        player = self.current[:, None]
+        r = self.resident
+        units = (self.owner == player) & (r >= WARRIOR1) & (r <= WARRIOR4)
+        if not units.any():
+            return
+        power = _POWER[r]
+        defense = self._gather(self._defense(self.owner, r), 99)
+        nb_owner = self._gather(self.owner, 0)
+        nb_res = self._gather(r, WATER)
+        takeable = ((nb_owner != player[:, :, None]) & (nb_res != WATER) &
+                    ((defense < power[:, :, None]) | (power == 4)[:, :, None]) & units[:, :, None])
+        # Enemy land first, castles above all, then neutral land
+        score = np.where(takeable, 1 + 2 * (nb_owner > 0) + 4 * (nb_res == CASTLE), 0)
+        best = score.argmax(axis=2)
+        g, c = np.nonzero(score.max(axis=2) > 0)
+        if not len(g):
+            return
+        targets = self.nbr[c, best[g, c]]
+        # Two units going for one hex: the first one gets it
+        _, first = np.unique(g * (self.size + 1) + targets, return_index=True)
+        g, c, targets = g[first], c[first], targets[first]
+        castle = r[g, targets] == CASTLE
+        self.money[g[castle], targets[castle]] = 0  # A castle taken by a move loses its money
+        r[g, targets] = r[g, c] + (WARRIOR1_MOVED - WARRIOR1)
+        self.owner[g, targets] = self.owner[g, c]
+        self._dirty[g] = True
+        r[g, c] = EMPTY
+
+    def _buy(self, action: int, playing):
+        """One purchase per province for the games playing action. Returns the games that bought something."""
+        n = self.size
+        bought = np.zeros(self.num_games, dtype=bool)
+        rows = np.nonzero(playing)[0]
+        # Everything below works on the playing games only (local row numbers)
+        owner = self.owner[rows]
+        r = self.resident[rows]
+        player = self.current[rows][:, None]
+        keys = self._keys(self.labels()[rows])
+        castles = self._castle_of(keys, r)
+        money = self.money[rows].reshape(-1)
+        castle_money = np.where(castles >= 0, money[np.maximum(castles, 0) + np.repeat(np.arange(len(rows)) * n, n + 1)], 0)
+        nb_owner = self._gather(owner, 0)
+        nb_res = self._gather(r, WATER)
+        own_nb = (nb_owner == player[:, :, None]) & self.valid_nbr[None]
+        friends = own_nb.sum(axis=2)
+
+        if action in (RLAction.ATTACK, RLAction.EXPAND):
+            # Border hex, bought from the (lowest) own province touching it
+            nb_keys = self._gather(keys, -1)
+            border_key = np.where(own_nb, nb_keys, np.iinfo(np.int64).max).min(axis=2)
+            touches = own_nb.any(axis=2) & (owner != player) & (r != WATER)
+            defense = self._defense(owner, r)
+            if action == RLAction.ATTACK:
+                candidates = touches & (owner > 0)
+                strength = np.clip(defense + 1, 1, 4)  # A 4 takes anything
+                score = friends + 10 * (r == CASTLE) - strength
+            else:
+                candidates = touches & (owner == 0) & (defense < 1)
+                strength = np.ones_like(defense)
+                score = friends
+            cell_keys = np.where(candidates, border_key, -1)
+            price = 10 * strength
+        else:
+            free = (owner == player) & ((r == EMPTY) | (r == GRAVESTONE))
+            frontier = ((nb_owner != player[:, :, None]) & (nb_res != WATER) & self.valid_nbr[None]).any(axis=2)
+            if action == RLAction.FARM:
+                farms = self._province_sums(keys, r == FARM)
+                feeds = (own_nb & ((nb_res == CASTLE) | (nb_res == FARM))).any(axis=2)
+                candidates = free & feeds & ~frontier
+                price = 12 + 2 * farms[keys].astype(np.int64)
+            else:
+                candidates = free & frontier
+                price = np.full(r.shape, 15)
+            score = friends
+            cell_keys = np.where(candidates, keys, -1)
+
+        g, c = np.nonzero(candidates)
+        if not len(g):
+            return bought
+        k = cell_keys[g, c]
+        # Best candidate per province: sort by key, then by score descending
+        order = np.lexsort((-score[g, c], k))
+        g, c, k = g[order], c[order], k[order]
+        first = np.ones(len(k), dtype=bool)
+        first[1:] = k[1:] != k[:-1]
+        g, c, k = g[first], c[first], k[first]
+        cost = price[g, c]
+        castle = castles[k]
+        ok = (castle >= 0) & (castle_money[k] >= cost)
+        if action == RLAction.ATTACK:
+            # Like AiRL.action_attack: no 3/4 warriors whose upkeep eats the income
+            income = self._province_sums(keys, _INCOME[r])[k]
+            s = strength[g, c]
+            ok &= (s < 3) | (_UPKEEP[s] <= income * 0.3)
+        g, c, cost, castle = g[ok], c[ok], cost[ok], castle[ok]
+        if not len(g):
+            return bought
+        placed = strength[g, c] if action in (RLAction.ATTACK, RLAction.EXPAND) else None
+        g = rows[g]
+        bought[g] = True
+
+        self.money[g, castle] -= cost.astype(np.int32)
+        if placed is not None:
+            old = self.owner[g, c]
+            captured = self.resident[g, c] == CASTLE
+            np.add.at(self.temp_money, (g[captured], old[captured]), self.money[g[captured], c[captured]])
+            self.money[g[captured], c[captured]] = 0
+            self.resident[g, c] = WARRIOR1_MOVED - 1 + placed
+            self.owner[g, c] = self.current[g]
+            self._dirty[g] = True
+        elif action == RLAction.FARM:
+            self.resident[g, c] = FARM
+        else:
+            self.resident[g, c] = TOWER
+        return bought
+
+    def end_turn(self):
+        """Board::nextTurn for every game, then restart finished games."""
+        r = self.resident
+        player = self.current[:, None]
+        ready = (self.owner == player) & (r >= WARRIOR1) & (r <= WARRIOR4)
+        r[ready] += WARRIOR1_MOVED - WARRIOR1
+
+        rows = np.arange(self.num_games)
+        pending = np.ones(self.num_games, dtype=bool)
+        for _ in range(self.num_players + 1):
+            if not pending.any():
+                break
+            nxt = self.current % self.num_players + 1
+            self.current = np.where(pending, nxt, self.current)
+            wrapped = pending & (nxt == 1)
+            if wrapped.any():
+                self._propagate_trees(wrapped)
+                self.first_round[wrapped] = False
+                self.rounds[wrapped] += 1
+            starting = pending & self.alive[rows, self.current]
+            if starting.any():
+                self._start_turn(starting)
+            # Done once the player to move survived its upkeep
+            pending &= ~(starting & self.alive[rows, self.current])
+        self._finish_games()
+
+    def _start_turn(self, games):
+        """Upkeep for the player to move in the given games."""
+        n = self.size
+        r = self.resident
+        player = self.current[:, None]
+        lab = self.labels()
+        keys = self._keys(lab)
+        sizes = self._province_sums(keys)
+        mine = (self.owner == player) & games[:, None]
+        castles = mine & (r == CASTLE)
+
+        # Castle left alone in its province: it rots and is removed
+        lone = castles & (sizes[keys] == 1)
+        if lone.any():
+            self._rot(lone)
+            self._eliminate_castleless()
+
+        has_castle = np.zeros(self.num_games * (n + 1), dtype=bool)
+        has_castle[keys[castles & ~lone]] = True
+        active = mine & has_castle[keys]
+        moved = active & (r >= WARRIOR1_MOVED) & (r <= WARRIOR4_MOVED)
+        r[moved] -= WARRIOR1_MOVED - WARRIOR1
+        graves = active & (r == GRAVESTONE)
+        r[graves] = np.where(self._near_water(True), PALM, PINE)[graves]
+
+        income = self._province_sums(keys, np.where(active, _INCOME[r], 0))
+        g, c = np.nonzero(castles & ~lone)
+        earn = ~self.first_round[g]
+        balance = self.money[g, c] + np.where(earn, income[keys[g, c]], 0).astype(np.int32)
+        bankrupt = balance < 0
+        self.money[g, c] = np.maximum(balance, 0)
+        if bankrupt.any():
+            broke = np.zeros(self.num_games * (n + 1), dtype=bool)
+            broke[keys[g[bankrupt], c[bankrupt]]] = True
+            dying = active & broke[keys] & (r >= WARRIOR1) & (r <= WARRIOR4_MOVED)
+            r[dying] = GRAVESTONE
+
+    def _propagate_trees(self, games):
+        r = self.resident
+        trees = ((r == PALM) | (r == PINE)) & games[:, None]
+        nb_res = self._gather(r, WATER)
+        free = (nb_res == EMPTY) & self.valid_nbr[None]
+        trees &= free.any(axis=2)
+        if not trees.any():
+            return
+        chance = self.rng.random(r.shape)
+        near_water = self._gather(self._near_water(True).astype(np.int16), 0) == 1
+        is_pine = r == PINE
+        tree = (r == PALM) | is_pine
+        pine_nb = self._gather(is_pine.astype(np.int16), 0).sum(axis=2) > 0
+        tree_nb = self._gather(tree.astype(np.int16), 0).sum(axis=2) >= 2
+        grove = self._gather((pine_nb & tree_nb).astype(np.int16), 0) == 1
+
+        spread = []
+        for kind, odds, ok in ((PINE, TREE_SPREAD_PINE, grove), (PALM, TREE_SPREAD_PALM, near_water)):
+            seeds = trees & (r == kind) & (chance <= odds)
+            options = free & ok & seeds[:, :, None]
+            pick = np.where(options, self.rng.random(options.shape), -1).argmax(axis=2)
+            g, c = np.nonzero(options.any(axis=2))
+            spread.append((kind, g, self.nbr[c, pick[g, c]]))
+        for kind, g, targets in spread:
+            r[g, targets] = kind
+
+    def _finish_games(self):
+        alive_count = self.alive[:, 1:].sum(axis=1)
+        over = (alive_count <= 1) | (self.rounds > self.max_rounds)
+        self.finished = np.nonzero(over)[0]
+        self.last_rankings = {}
+        for g in self.finished:
+            self.last_rankings[int(g)] = self.ranking(g)
+        if len(self.finished):
+            self.games_finished += len(self.finished)
+            self.reset(self.finished)
+
+    def ranking(self, game: int) -> List[int]:
+        """Players still in (most land first), then the eliminated ones, last out last."""
+        land = np.bincount(self.owner[game], minlength=self.num_players + 1)
+        alive = [p for p in range(1, self.num_players + 1) if self.alive[game, p]]
+        alive.sort(key=lambda p: -land[p])
+        return alive + self.eliminated[game][::-1]
+
+    # ==================== OBSERVATIONS ====================
+
+    def player_stats(self):
+        """(B, P+1, 4) per player: hexes, income, units, hexes of everyone else."""
+        b = self.num_games
+        p = self.num_players + 1
+        flat = self.owner + (np.arange(b) * p)[:, None]
+        r = self.resident
+        hexes = np.bincount(flat.ravel(), minlength=b * p).reshape(b, p)
+        income = np.bincount(flat.ravel(), _INCOME[r].ravel(), minlength=b * p).reshape(b, p)
+        units = np.bincount(flat.ravel(), ((r >= WARRIOR1) & (r <= WARRIOR4_MOVED)).ravel(),
+                            minlength=b * p).reshape(b, p)
+        hexes[:, 0] = 0
+        enemy = hexes.sum(axis=1, keepdims=True) - hexes
+        return np.stack([hexes, income, units, enemy], axis=2).astype(np.float64)
+
+    def observe(self):
+        """
+        (B, 14) features for the player to move, laid out like
+        AiRL.extract_state, taken from that player's largest province.
+        """
+        n = self.size
+        b = self.num_games
+        total = float(n)
+        player = self.current[:, None]
+        r = self.resident
+        lab = self.labels()
+        keys = self._keys(lab)
+        mine = self.owner == player
+
+        sizes = self._province_sums(keys)
+        size_of = np.where(mine & (r == CASTLE), sizes[keys], -1)
+        best_cell = size_of.argmax(axis=1)
+        rows = np.arange(b)
+        has = size_of[rows, best_cell] > 0
+        province = mine & (lab == lab[rows, best_cell][:, None]) & has[:, None]
+
+        nb_owner = self._gather(self.owner, 0)
+        nb_res = self._gather(r, WATER)
+        foreign_land = (nb_owner != player[:, :, None]) & (nb_res != WATER) & self.valid_nbr[None]
+        enemy_units = ((nb_owner != player[:, :, None]) & (nb_owner > 0) &
+                       (nb_res >= WARRIOR1) & (nb_res <= WARRIOR4_MOVED))
+        neutral_nb = (nb_owner == 0) & (nb_res != WATER) & self.valid_nbr[None]
+        own_units_nb = ((nb_owner == player[:, :, None]) & (nb_res >= WARRIOR1) & (nb_res <= WARRIOR4_MOVED)).any(axis=2)
+        own_guard_nb = ((nb_owner == player[:, :, None]) & (nb_res >= CASTLE) & (nb_res <= STRONG_TOWER)).any(axis=2)
+        frontier = foreign_land.any(axis=2)
+        guarded = (r >= TOWER) & (r <= STRONG_TOWER) | own_guard_nb
+
+        def count(mask):
+            return (mask & province).sum(axis=1).astype(np.float64)
+
+        money = (self.money * (province & (r == CASTLE))).sum(axis=1).astype(np.float64)
+        income = (_INCOME[r] * province).sum(axis=1).astype(np.float64)
+        my_hexes = count(np.ones_like(province))
+        owner_land = (self.owner > 0) & (self.owner != player)
+        enemy_hexes = owner_land.sum(axis=1)
+        neutral = ((self.owner == 0) & (r != WATER)).sum(axis=1)
+        units = count((r >= WARRIOR1) & (r <= WARRIOR4_MOVED))
+        threats = (enemy_units.sum(axis=2) * province).sum(axis=1)
+        strength = (np.where(enemy_units, _POWER[nb_res], 0).sum(axis=2) * province).sum(axis=1)
+        front = count(frontier)
+        undefended = count(frontier & ~guarded & ~own_units_nb)
+        nearby = (neutral_nb.sum(axis=2) * province).sum(axis=1)
+        farms = count(r == FARM)
+
+        return np.stack([
+            np.minimum(money / 100.0, 1.0),
+            np.minimum(np.maximum(income, 0) / 20.0, 1.0),
+            (money >= 10).astype(np.float64),
+            my_hexes / total,
+            enemy_hexes / total,
+            neutral / total,
+            np.minimum(units / 10.0, 1.0),
+            np.minimum(threats / 5.0, 1.0),
+            np.minimum(strength / 10.0, 1.0),
+            np.minimum(front / 15.0, 1.0),
+            np.where(front > 0, np.minimum(undefended / 10.0, 1.0), 0.0),
+            np.minimum(nearby / 10.0, 1.0),
+            np.minimum(farms / 5.0, 1.0),
+            (money > 50).astype(np.float64),
+        ], axis=1)
+
+
+def shaped_rewards(prev, stats, won, lost, game_length):
+    """ImprovedRewardShaping.calculate_reward for whole arrays of transitions."""
+    d_hexes = stats[..., 0] - prev[..., 0]
+    d_income = stats[..., 1] - prev[..., 1]
+    d_units = np.minimum(stats[..., 2] - prev[..., 2], 0)
+    d_enemy = prev[..., 3] - stats[..., 3]
+    reward = 2.0 * d_hexes + d_income + 1.5 * d_units + 3.0 * d_enemy
+    reward += np.where(lost, -100.0, 0.1)
+    reward += np.where(won, 100.0 + 0.5 * np.maximum(0, 50 - game_length), 0.0)
+    return reward
+
+
+class SelfPlayCollector:
+    """
+    Self-play in the simulator: every player of every game is driven by
+    policy (choose_action on the observed features). With learn=True each
+    player's transition is passed on when that player moves again, or with
+    done=True when its game ends, like the receiver loop. Transitions go
+    to sink(state, action, reward, next_state, done, trajectory),
+    policy.update by default; trajectory is (game, player), so the
+    n-step window of EnhancedQTable never mixes the B interleaved games.
+    With decay=True (the default when learning in this process) every
+    finished game calls policy.decay_epsilon() if it has one; a frozen
+    copy that only plays for another learner passes decay=False.
+    run() can be called repeatedly; pending transitions carry over.
+    """
+
+    def __init__(self, sim: BatchSimulator, policy, learn: bool = True, sink: Optional[Callable] = None,
+                 decay: Optional[bool] = None):
+        self.sim = sim
+        self.policy = policy
+        self.learn = learn
+        self.decay = learn if decay is None else decay
+        self.sink = sink if sink is not None else policy.update
+        b = sim.num_games
+        p = sim.num_players + 1
+        self.prev_state: List[List[Optional[list]]] = [[None] * p for _ in range(b)]
+        self.prev_action = np.zeros((b, p), dtype=np.int64)
+        self.prev_stats = np.zeros((b, p, 4))
+
+    def run(self, turns: int) -> Dict[str, float]:
+        sim = self.sim
+        learn = self.learn
+        prev_state, prev_action, prev_stats = self.prev_state, self.prev_action, self.prev_stats
+        b = sim.num_games
+        p = sim.num_players + 1
+        rows = np.arange(b)
+        transitions = 0
+        games = 0
+        decay_epsilon = getattr(self.policy, 'decay_epsilon', None) if self.decay else None
+        for _ in range(turns):
+            states = sim.observe()
+            players = sim.current.copy()
+            stats = sim.player_stats()
+            if learn:
+                rewards = shaped_rewards(prev_stats[rows, players], stats[rows, players], False, False, sim.rounds)
+            actions = []
+            for g in range(b):
+                state = states[g].tolist()
+                pid = players[g]
+                if learn and prev_state[g][pid] is not None:
+                    self.sink(prev_state[g][pid], int(prev_action[g, pid]), float(rewards[g]), state, False,
+                              (g, int(pid)))
+                    transitions += 1
+                action = self.policy.choose_action(state)
+                actions.append(action)
+                prev_state[g][pid] = state
+                prev_action[g, pid] = action
+            prev_stats[rows, players] = stats[rows, players]
+            rounds = sim.rounds.copy()
+            sim.step(actions)
+
+            # Terminal updates for games that ended (they were restarted by step)
+            for g, ranking in sim.last_rankings.items():
+                winner = ranking[0]
+                for pid in range(1, p):
+                    if prev_state[g][pid] is not None and learn:
+                        reward = shaped_rewards(prev_stats[g, pid], prev_stats[g, pid], pid == winner,
+                                                pid != winner, rounds[g])
+                        self.sink(prev_state[g][pid], int(prev_action[g, pid]), float(reward),
+                                  prev_state[g][pid], True, (g, pid))
+                        transitions += 1
+                    prev_state[g][pid] = None
+                prev_stats[g] = 0
+                games += 1
+                if decay_epsilon is not None:
+                    decay_epsilon()
+        return {'turns': turns * b, 'transitions': transitions, 'games': games}
+
+
+def collect_experience(sim: BatchSimulator, policy, turns: int, learn: bool = True,
+                       sink: Optional[Callable] = None, decay: Optional[bool] = None) -> Dict[str, float]:
+    """One-off SelfPlayCollector run."""
+    return SelfPlayCollector(sim, policy, learn, sink, decay).run(turns)
@@ -0,0 +1,328 @@
+"""
+Beam search over the concrete actions of one province's turn.
+
+AiEasy commits to every move and purchase as soon as it picks it, in a
+fixed order. Some plans only pay off after several actions, e.g. merging
+two units into one that is strong enough to break a tower. Search finds
+those. A beam state is a sequence of PLACE / MOVE actions. Each layer
+extends every state by one action, scores the results, and keeps the
+best `width` of them (and at most `branch` children of any one state).
+After `depth` layers the best sequence seen at any length is returned.
+
+States are not copied. A state's actions are replayed on the Engine
+inside a journal transaction, and each candidate is applied and rolled
+back on top of them. Scoring is incremental: only the hexes the journal
+says have changed are looked at (Engine.changes_since), plus the
+province's money. Sequences that reach the same position in a different
+order are merged.
+
+When a capture splits an enemy province, the game founds its new castle on a
+random hex, so the engine's copy of that castle is only a guess. Attacks
+on enemy land that is no longer in the province of a castle the real board
+has (KnownCastles) must be strong enough for a castle anywhere there
+(power 2+); everything else the plan does is exactly what the game will do.
+
+    search = BeamSearch(width=6, depth=4)
+    actions = search.search(engine, castle)     # engine is left unchanged
+    for action in actions:
+        add_to_builder(action_builder, action)
+"""
+
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .engine import (ACTION_MOVE, ACTION_PLACE, CASTLE, EMPTY, FARM, GRAVESTONE, HEX_INCOME, POWER, STRONG_TOWER, TOWER,
+                     WARRIOR1, WARRIOR4, Engine, is_tree, is_unmoved, is_warrior)
+
+# Evaluation weights, in coins
+LAND = 10.0  # Owning a hex
+ENEMY_LAND = 5.0  # Taking it from an enemy (on top of LAND)
+ENEMY_CASTLE = 15.0  # Destroying an enemy castle
+INCOME = 2.0  # Per coin of income (upkeep is negative income)
+MONEY = 0.4  # Per coin kept
+DEFENSE = 1.5  # Per power point per exposed hex a defender covers
+ELIMINATION = 200.0  # Knocking a player out
+BANKRUPTCY = 100.0  # Ending with less than the upkeep (all units die next turn)
+FARMS_PER_STATE = 2  # Farm sites tried per state (they all score the same)
+
+
+def add_to_builder(action_builder, action: tuple) -> bool:
+    """
+    Add an engine action tuple to a receiver or engine ActionBuilder.
+    False when it was not queued (TrackedActionBuilder refused it).
+    """
+    if action[0] == ACTION_PLACE:
+        return action_builder.add_place(*action[1:]) is not False
+    if action[0] == ACTION_MOVE:
+        return action_builder.add_move(*action[1:]) is not False
+    return False
+
+
+def apply_action(engine: Engine, action: tuple) -> bool:
+    if action[0] == ACTION_PLACE:
+        _, resident, x_from, y_from, x_to, y_to = action
+        return engine.place(engine.index(x_from, y_from), resident, engine.index(x_to, y_to))
+    _, x_from, y_from, x_to, y_to = action
+    return engine.move(engine.index(x_from, y_from), engine.index(x_to, y_to))
+
+
+class BeamSearch:
+    """
+    width:  states kept per layer
+    depth:  actions per sequence (upper bound)
+    branch: children kept per state (default: width)
+    """
+
+    def __init__(self, width: int = 6, depth: int = 4, branch: Optional[int] = None):
+        self.width = width
+        self.depth = depth
+        self.branch = branch or width
+        self.last_stats: Dict = {}
+
+    def search(self, engine: Engine, castle: int, deadline: Optional[float] = None,
+               known: Optional['KnownCastles'] = None) -> List[tuple]:
+        """
+        Best action sequence for the province of castle (any hex of it works)
+        for its owner; [] when doing nothing scores best. deadline is a
+        time.perf_counter() value; the best sequence so far is returned when
+        it passes. known: the real board's castles (default: the engine's).
+        """
+        started = time.perf_counter()
+        player = engine.owner[castle]
+        self._known = known or KnownCastles(engine, player)
+        self._player = player
+        self._anchor = castle
+        self._money = sum(engine.castles[player].values())
+        self._income = engine.province_income(engine.province(castle))
+        self._eliminated = len(engine.leaderboard)
+        beam: List[Tuple[float, List[tuple]]] = [(0.0, [])]
+        best_score, best = 0.0, []
+        seen = set()
+        evaluated = 0
+        layers = 0
+        for _ in range(self.depth):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            children = []
+            for _, actions in beam:
+                mark = engine.begin()
+                try:
+                    for action in actions:
+                        apply_action(engine, action)
+                    kept = []
+                    for action in self._candidates(engine, castle):
+                        inner = engine.begin()
+                        try:
+                            if not apply_action(engine, action):
+                                continue
+                            changes = engine.changes_since(mark)
+                            key = self._key(engine, changes)
+                            if key in seen:
+                                continue
+                            seen.add(key)
+                            kept.append((self._evaluate(engine, changes), actions + [action]))
+                            evaluated += 1
+                        finally:
+                            engine.rollback(inner)
+                finally:
+                    engine.rollback(mark)
+                kept.sort(key=lambda c: c[0], reverse=True)
+                children.extend(kept[:self.branch])
+            if not children:
+                break
+            children.sort(key=lambda c: c[0], reverse=True)
+            beam = children[:self.width]
+            layers += 1
+            if beam[0][0] > best_score:
+                best_score, best = beam[0]
+        self.last_stats = {
+            'score': best_score,
+            'actions': len(best),
+            'layers': layers,
+            'evaluated': evaluated,
+            'elapsed': time.perf_counter() - started,
+        }
+        return best
+
+    # ==================== MOVE GENERATION ====================
+
+    def _candidates(self, engine: Engine, anchor: int) -> List[tuple]:
+        """Moves and purchases worth trying in the province of anchor."""
+        castle = engine.province_castle(anchor)
+        if castle < 0:
+            return []
+        player = self._player
+        owner = engine.owner
+        resident = engine.resident
+        width = engine.width
+        province = engine.province(castle)
+        guessed = self._known.guessed_land(engine)
+        result = []
+
+        def useful(h: int, power: int) -> bool:
+            # Conquests, merges, clearing trees and manning the front line
+            r = resident[h]
+            if owner[h] != player:
+                return power >= 2 or h not in guessed
+            return is_warrior(r) or is_tree(r) or ((r == EMPTY or r == GRAVESTONE) and self._exposed(engine, h))
+
+        for h in province:
+            if is_unmoved(resident[h]):
+                hx, hy = h % width, h // width
+                power = POWER[resident[h]]
+                for d in engine.possible_movements(h):
+                    if useful(d, power):
+                        result.append((ACTION_MOVE, hx, hy, d % width, d // width))
+
+        money = engine.castles[player].get(castle, 0)
+        cx, cy = castle % width, castle // width
+        for warrior in range(WARRIOR1, WARRIOR4 + 1):
+            if POWER[warrior] * 10 > money:
+                break
+            for d in engine.possible_placements(castle, warrior):
+                if useful(d, POWER[warrior]):
+                    result.append((ACTION_PLACE, warrior, cx, cy, d % width, d // width))
+        if money >= 15:
+            for d in engine.possible_placements(castle, TOWER):
+                if self._exposed(engine, d):
+                    result.append((ACTION_PLACE, TOWER, cx, cy, d % width, d // width))
+        if money >= 35:
+            for d in engine.possible_placements(castle, STRONG_TOWER):
+                if self._exposed(engine, d):
+                    result.append((ACTION_PLACE, STRONG_TOWER, cx, cy, d % width, d // width))
+        if money >= engine.price(castle, FARM):
+            for d in engine.possible_placements(castle, FARM)[:FARMS_PER_STATE]:
+                result.append((ACTION_PLACE, FARM, cx, cy, d % width, d // width))
+        return result
+
+    def _exposed(self, engine: Engine, h: int) -> bool:
+        """h borders enemy land."""
+        player = self._player
+        owner = engine.owner
+        for n in engine.neighbors[h]:
+            o = owner[n]
+            if o != 0 and o != player:
+                return True
+        return False
+
+    # ==================== EVALUATION ====================
+
+    def _key(self, engine: Engine, changes: Dict[int, Tuple[int, int]]) -> tuple:
+        owner = engine.owner
+        resident = engine.resident
+        return (tuple(sorted((h, owner[h], resident[h]) for h in changes)),
+                sum(engine.castles[self._player].values()))
+
+    def _evaluate(self, engine: Engine, changes: Dict[int, Tuple[int, int]]) -> float:
+        """Score of the position relative to the search root, from the changed hexes only."""
+        owner = engine.owner
+        resident = engine.resident
+        player = self._player
+        score = 0.0
+        income = self._income
+        for h, (old_owner, old_resident) in changes.items():
+            if owner[h] == player:
+                income += HEX_INCOME[resident[h]]
+            if old_owner == player:
+                income -= HEX_INCOME[old_resident]
+            exposure = -1  # Computed on demand, once per hex
+            for o, r, sign in ((owner[h], resident[h], 1.0), (old_owner, old_resident, -1.0)):
+                value, defends = self._hex_value(o, r)
+                if defends:
+                    if exposure < 0:
+                        exposure = self._exposure(engine, h)
+                    value += DEFENSE * POWER[r] * exposure
+                score += sign * value
+        money = sum(engine.castles[player].values())
+        score += MONEY * (money - self._money)
+        if engine.money_at(self._anchor) + income < 0:
+            score -= BANKRUPTCY
+        score += ELIMINATION * (len(engine.leaderboard) - self._eliminated)
+        return score
+
+    def _hex_value(self, o: int, r: int) -> Tuple[float, bool]:
+        """Value of a hex with owner o and resident r, and whether r defends it for us."""
+        player = self._player
+        if o == player:
+            return LAND + INCOME * HEX_INCOME[r], POWER[r] > 0
+        if o != 0:
+            return -ENEMY_LAND - (ENEMY_CASTLE if r == CASTLE else 0.0), False
+        return 0.0, False
+
+    def _exposure(self, engine: Engine, h: int) -> int:
+        """Our hexes among h and its neighbours that border enemy land."""
+        player = self._player
+        owner = engine.owner
+        count = 1 if owner[h] == player and self._exposed(engine, h) else 0
+        for n in engine.neighbors[h]:
+            if owner[n] == player and self._exposed(engine, n):
+                count += 1
+        return count
+
+
+class KnownCastles:
+    """Enemy castles of the real board, and enemy land without one, when planning started."""
+
+    def __init__(self, engine: Engine, player: int):
+        self.player = player
+        self.castles = {c for p, castles in enumerate(engine.castles) if p != player for c in castles}
+        covered = set()
+        for c in self.castles:
+            covered.update(engine.province(c))
+        owner = engine.owner
+        self.castleless = {h for h in range(engine.size) if owner[h] != 0 and owner[h] != player and h not in covered}
+        self._guessed: Optional[Set[int]] = None  # guessed_land() for certain(), until invalidate()
+
+    def guessed_land(self, engine: Engine) -> Set[int]:
+        """Enemy hexes whose castle may be somewhere else on the real board than on the engine."""
+        certain = set(self.castleless)
+        for p, castles in enumerate(engine.castles):
+            if p != self.player:
+                for c in castles:
+                    if c in self.castles:
+                        certain.update(engine.province(c))
+        owner = engine.owner
+        player = self.player
+        return {h for h in range(engine.size) if owner[h] != 0 and owner[h] != player and h not in certain}
+
+    def certain(self, engine: Engine, dst: int, power: int) -> bool:
+        """
+        Whether the server takes dst with a warrior of power the way engine
+        does: power 1 is stopped by a castle the engine may have put on the
+        wrong hex. Call invalidate() after every action played on engine.
+        """
+        if dst < 0 or power >= 2 or engine.owner[dst] in (0, self.player):
+            return True
+        if self._guessed is None:
+            self._guessed = self.guessed_land(engine)
+        return dst not in self._guessed
+
+    def invalidate(self):
+        self._guessed = None
+
+
+def plan_turn(engine: Engine, player: int, search: BeamSearch, deadline: Optional[float] = None,
+              max_searches: int = 8) -> List[tuple]:
+    """
+    Plan every province of player: search, apply the best sequence, search
+    again from there (a sequence is at most search.depth long) until nothing
+    improves. engine ends up with the planned actions applied, so each
+    province sees what the ones before it did.
+    """
+    actions = []
+    done = set()
+    known = KnownCastles(engine, player)
+    for castle in sorted(engine.castles[player]):
+        if castle in done or engine.owner[castle] != player:
+            continue
+        done.update(engine.province(castle))
+        for _ in range(max_searches):
+            if deadline is not None and time.perf_counter() >= deadline:
+                return actions
+            found = search.search(engine, castle, deadline, known)
+            if not found:
+                break
+            for action in found:
+                if apply_action(engine, action):
+                    actions.append(action)
+    return actions
@@ -0,0 +1,53 @@
+"""
+Per-board memoization of derived queries.
+
+Provinces, perimeters, income and similar facts only change when a cell
+changes. BoardCache stores them under a key until the board version is
+bumped, so one bot turn computes each of them once.
+
+Usage:
+    board.cache = BoardCache()
+    provinces = board.cache.memo(('provinces', player_id), compute)
+    ...
+    hex.resident = new_resident
+    board.cache.invalidate()  # every cell mutation must bump the version
+"""
+
+from typing import Any, Callable, Dict, Hashable
+
+
+class BoardCache:
+    """Derived-state cache keyed by a board version counter."""
+
+    def __init__(self):
+        self.version = 0
+        self._values: Dict[Hashable, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def memo(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the value stored under key, computing it on first use this version."""
+        try:
+            value = self._values[key]
+        except KeyError:
+            self.misses += 1
+            value = compute()
+            self._values[key] = value
+            return value
+        self.hits += 1
+        return value
+
+    def invalidate(self):
+        """Drop everything derived from the board (call after any cell mutation)."""
+        self.version += 1
+        self._values.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            'version': self.version,
+            'entries': len(self._values),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
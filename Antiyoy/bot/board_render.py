@@ -0,0 +1,121 @@
+"""
+Board dumps for debugging.
+
+render_board() builds the whole dump (same layout as Board.print_owners /
+print_residents / print_money) as one string from precomputed cell
+strings. BoardRenderer writes it with a single write + flush and can
+sample: every Nth board, or only boards where one of our bots moves.
+"""
+
+import os
+import sys
+from typing import Optional, Sequence, TextIO
+
+SECTIONS = ('owners', 'residents', 'money')
+
+_RESET = '\x1b[0m'
+# Owner colours (0 = neutral stays plain), cycled for bigger games
+_OWNER_COLORS = ('\x1b[31m', '\x1b[34m', '\x1b[32m', '\x1b[33m', '\x1b[35m', '\x1b[36m')
+# Resident ids as in the game enum: 0 water, 1 empty, 2-9 warriors, 10 farm,
+# 11-13 castle/towers, 14-15 trees, 16 gravestone
+_RESIDENT_COLORS = {
+    0: '\x1b[34m',
+    10: '\x1b[33m', 11: '\x1b[1;33m', 12: '\x1b[33m', 13: '\x1b[33m',
+    14: '\x1b[32m', 15: '\x1b[32m', 16: '\x1b[90m',
+}
+_UNIT_COLOR = '\x1b[31m'
+
+_MAX_ID = 256  # Owners and residents are single bytes on the wire
+
+
+def _owner_cells(color: bool):
+    cells = [f"{o:2d}" for o in range(_MAX_ID)]
+    if color:
+        for o in range(1, _MAX_ID):
+            cells[o] = _OWNER_COLORS[(o - 1) % len(_OWNER_COLORS)] + cells[o] + _RESET
+    return cells
+
+
+def _resident_cells(color: bool):
+    cells = [f"{r:2d}" for r in range(_MAX_ID)]
+    if color:
+        for r in range(_MAX_ID):
+            code = _UNIT_COLOR if 2 <= r <= 9 else _RESIDENT_COLORS.get(r)
+            if code:
+                cells[r] = code + cells[r] + _RESET
+    return cells
+
+
+_CELLS = {
+    False: (_owner_cells(False), _resident_cells(False)),
+    True: (_owner_cells(True), _resident_cells(True)),
+}
+
+
+def render_board(board, sections: Sequence[str] = SECTIONS, color: bool = False) -> str:
+    """Whole dump as one string: header line, then one grid per section."""
+    owner_cells, resident_cells = _CELLS[color]
+    hexes = board.hexes
+    width = board.width
+    out = [f"Board({board.width}x{board.height}, {len(hexes)} hexes)"]
+
+    for section in sections:
+        if section == 'owners':
+            out.append("Owners:")
+            for start in range(0, board.height * width, width):
+                out.append(" ".join([owner_cells[hexes[i].owner_id] for i in range(start, start + width)]))
+        elif section == 'residents':
+            out.append("Residents:")
+            for start in range(0, board.height * width, width):
+                out.append(" ".join([resident_cells[int(hexes[i].resident)] for i in range(start, start + width)]))
+        elif section == 'money':
+            out.append("Money:")
+            for start in range(0, board.height * width, width):
+                out.append(" ".join([f"{hexes[i].money:3d}" for i in range(start, start + width)]))
+        else:
+            raise ValueError(f"Unknown board section: {section}")
+        out.append("")
+
+    out.append("")
+    return "\n".join(out)
+
+
+class BoardRenderer:
+    """
+    Rate-limited board dumps.
+
+    every:          dump one board out of every N seen (1 = all of them)
+    bot_turns_only: skip boards where none of our bots is to move
+    color:          ANSI colours; None = only when writing to a terminal
+    """
+
+    def __init__(self, every: int = 1, bot_turns_only: bool = False,
+                 sections: Sequence[str] = SECTIONS, color: Optional[bool] = None,
+                 stream: Optional[TextIO] = None):
+        self.every = max(1, every)
+        self.bot_turns_only = bot_turns_only
+        self.sections = tuple(sections)
+        self.stream = stream
+        if color is None:
+            out = stream or sys.stdout
+            color = hasattr(out, 'isatty') and out.isatty() and 'NO_COLOR' not in os.environ
+        self.color = color
+        self.seen = 0
+        self.dumped = 0
+
+    def maybe_dump(self, board, bot_turn: bool = True) -> bool:
+        """Dump the board if the sampling rules allow it. Returns True if dumped."""
+        if self.bot_turns_only and not bot_turn:
+            return False
+        self.seen += 1
+        if (self.seen - 1) % self.every:
+            return False
+        self.dump(board)
+        return True
+
+    def dump(self, board):
+        """Render and write the board in one write call."""
+        stream = self.stream or sys.stdout
+        stream.write(render_board(board, self.sections, self.color))
+        stream.flush()
+        self.dumped += 1
@@ -0,0 +1,319 @@
+"""
+Enemy threat groups and defensive answers, after DefenseManager.java (AiMaster).
+
+Once per turn, DefensePlanner finds the enemy units next to our land and
+clusters each with the enemy units connected to it into a ThreatGroup
+(DmGroup). A group's danger is calculateDanger(): a quarter of its
+strongest unit, lowered when that unit is the only one that strong, when
+the group borders only unimportant land, and when it is one unit touching
+one of our hexes. A group is not dangerous if it has no empty land of its
+own behind it (already cut off) or if it can't take any hex it reaches.
+
+The reach of every group and the reverse reach of every enemy unit into
+our land (which of our units can get to it, casterDirectFight) are cast
+in one PropagationGrid.cast() batch. Each enemy unit of strength 2+ next
+to our land is then answered, in Java's order:
+
+    FIGHT      one of our unmoved units is strong enough and moves onto it
+    MERGE      two of our units merge (one moves onto the other), then attack
+    REINFORCE  a bought warrior is placed onto one of our units, which attacks
+    BUY        a warrior strong enough is bought right onto it
+
+plan() picks at most one answer per enemy unit, most dangerous group
+first, never reusing a unit or spending more than the province has.
+Answers that raise upkeep more than canAffordTaxChange() allows are only
+taken next to important hexes (close to farms and the castle, as in
+AiMaster.updateImportance). The Java cut-off and mass march answers are
+not ported; they need multi-turn plans the Python bots don't keep.
+
+    planner = DefensePlanner(PropagationGrid.from_board(board), player)
+    for answer in planner.plan(province, castle, money, income):
+        for action in answer.actions(board.width):
+            add_to_builder(action_builder, action)
+"""
+
+from typing import Dict, List, Optional, Sequence, Set
+
+from .engine import ACTION_MOVE, ACTION_PLACE, CASTLE, FARM, POWER, WARRIOR1, is_unmoved, is_warrior
+from .hex_geometry import MOVE_LIMIT
+from .propagation import Caster, PropagationGrid
+
+FIGHT = 'fight'
+MERGE = 'merge'
+REINFORCE = 'reinforce'
+BUY = 'buy'
+
+UPKEEP = (0, 2, 6, 18, 36)  # Per warrior strength, as in Province.get_income
+UNIT_PRICE = 10  # Per strength point
+DANGER_THRESHOLD = 0.45  # getThirst(): weaker groups are left alone
+IMPORTANCE_DEPTH = 4  # updateImportance(): farms and the castle start at 4
+REALLY_NEEDED = 2.5  # doesHexReallyNeedDefense(): importance above this ignores upkeep
+
+
+def can_afford_tax_change(tax_change: int, income: int, money: int) -> bool:
+    """AiMaster.canAffordTaxChange: can the province carry this much more upkeep."""
+    if money > 500:
+        return tax_change < income + 50
+    if money > 200:
+        return tax_change < income + 20
+    return tax_change < income - 7
+
+
+def merge_tax_change(s1: int, s2: int) -> int:
+    """predictTaxChangeFromMerge: upkeep added by merging warriors of strength s1 and s2."""
+    return UPKEEP[s1 + s2] - UPKEEP[s1] - UPKEEP[s2]
+
+
+class ThreatGroup:
+    """
+    Connected enemy units next to our land (DmGroup).
+
+    units:   hexes of its units
+    contact: our hexes next to them
+    support: empty land of theirs next to them (none = already cut off)
+    targets: our hexes its strongest unit can reach and take this turn
+    """
+
+    __slots__ = ('player', 'units', 'contact', 'support', 'targets', 'max_strength', 'danger')
+
+    def __init__(self, player: int, units: List[int]):
+        self.player = player
+        self.units = units
+        self.contact: List[int] = []
+        self.support: List[int] = []
+        self.targets: List[int] = []
+        self.max_strength = 0
+        self.danger = 0.0
+
+    def __repr__(self):
+        return f"ThreatGroup(player={self.player}, units={len(self.units)}, danger={self.danger:.2f})"
+
+
+class DefenseAnswer:
+    """
+    One way to remove the enemy unit on `target`.
+
+    unit:     our unit that attacks (-1 for BUY)
+    partner:  our unit that merges into `unit` first (MERGE)
+    strength: strength bought (REINFORCE, BUY)
+    source:   hex of the paying province (REINFORCE, BUY)
+    """
+
+    __slots__ = ('kind', 'target', 'unit', 'partner', 'strength', 'source', 'cost', 'tax', 'group')
+
+    def __init__(self, kind: str, target: int, group: ThreatGroup, unit: int = -1, partner: int = -1,
+                 strength: int = 0, source: int = -1, cost: int = 0, tax: int = 0):
+        self.kind = kind
+        self.target = target
+        self.group = group
+        self.unit = unit
+        self.partner = partner
+        self.strength = strength
+        self.source = source
+        self.cost = cost
+        self.tax = tax
+
+    def actions(self, width: int) -> List[tuple]:
+        """Engine action tuples, in the order they have to be sent."""
+        def xy(i):
+            return i % width, i // width
+        tx, ty = xy(self.target)
+        if self.kind == BUY:
+            return [(ACTION_PLACE, WARRIOR1 - 1 + self.strength, *xy(self.source), tx, ty)]
+        result = []
+        if self.kind == MERGE:
+            result.append((ACTION_MOVE, *xy(self.partner), *xy(self.unit)))
+        elif self.kind == REINFORCE:
+            result.append((ACTION_PLACE, WARRIOR1 - 1 + self.strength, *xy(self.source), *xy(self.unit)))
+        result.append((ACTION_MOVE, *xy(self.unit), tx, ty))
+        return result
+
+    def __repr__(self):
+        return f"DefenseAnswer({self.kind}, target={self.target}, unit={self.unit}, cost={self.cost})"
+
+
+class DefensePlanner:
+    """Threat groups around player's land and the answers to them, for one board."""
+
+    def __init__(self, grid: PropagationGrid, player: int):
+        self.grid = grid
+        self.player = player
+        owner = grid.owner
+        resident = grid.resident
+        neighbors = grid.neighbors
+        size = grid.size
+        self.own = own = grid.owner_mask(player)
+        self.defense = [self._defense(i) for i in range(size)]
+
+        farms = [i for i in range(size) if own[i] and (resident[i] == FARM or resident[i] == CASTLE)]
+        self.importance = grid.cast([Caster(farms, IMPORTANCE_DEPTH, into=own, same_owner=True)])[0].values
+
+        # updateTempUnitListByAdjacentHexes + startGroup: enemy units on our border and the units joined to them
+        warriors = [owner[i] not in (0, player) and is_warrior(resident[i]) for i in range(size)]
+        grouped: Set[int] = set()
+        self.groups: List[ThreatGroup] = []
+        for i in range(size):
+            if not warriors[i] or i in grouped or not any(own[n] for n in neighbors[i]):
+                continue
+            area = grid.cast([Caster([i], size, into=warriors, same_owner=True)])[0]
+            units = [h for h, v in enumerate(area.values) if v >= 0]
+            grouped.update(units)
+            self.groups.append(ThreatGroup(owner[i], units))
+
+        # Enemy reach (per group) and our reach onto every enemy unit next to our land, in one batch
+        self.front_units = [u for g in self.groups for u in g.units
+                            if POWER[resident[u]] >= 2 and any(own[n] for n in neighbors[u])]
+        casters = [Caster(g.units, MOVE_LIMIT, through=grid.owner_mask(g.player)) for g in self.groups]
+        casters += [Caster([u], MOVE_LIMIT, into=own) for u in self.front_units]
+        results = grid.cast(casters)
+        for group, reach in zip(self.groups, results):
+            self._analyze(group, reach.values)
+        self.groups.sort(key=lambda g: g.danger, reverse=True)
+        self.attackers: Dict[int, List[int]] = {}
+        for u, reach in zip(self.front_units, results[len(self.groups):]):
+            units = [h for h in reach.reached() if is_unmoved(resident[h])]
+            units.sort(key=reach.steps, reverse=True)  # Furthest first, like getFurthestUnitInTempUnitList
+            self.attackers[u] = units
+        self._unit_reach: Dict[int, List[int]] = {}
+
+    def _defense(self, i: int) -> int:
+        """Strongest defender of hex i: its resident and its owner's residents around it."""
+        owner = self.grid.owner
+        resident = self.grid.resident
+        d = POWER[resident[i]]
+        for n in self.grid.neighbors[i]:
+            if owner[n] == owner[i]:
+                d = max(d, POWER[resident[n]])
+        return d
+
+    def capture_strength(self, i: int) -> int:
+        """getStrengthNecessaryToCapture: weakest warrior that can take hex i."""
+        return min(max(self.defense[i] + 1, 1), 4)
+
+    def _analyze(self, group: ThreatGroup, reach: Sequence[int]):
+        grid = self.grid
+        owner = grid.owner
+        resident = grid.resident
+        own = self.own
+        contact = set()
+        support = set()
+        for u in group.units:
+            for n in grid.neighbors[u]:
+                if own[n]:
+                    contact.add(n)
+                elif owner[n] == group.player and not is_warrior(resident[n]):
+                    support.add(n)
+        group.contact = sorted(contact)
+        group.support = sorted(support)
+        strengths = [POWER[resident[u]] for u in group.units]
+        group.max_strength = strength = max(strengths)
+        group.targets = [i for i, v in enumerate(reach) if v >= 0 and own[i]
+                         and (strength == 4 or strength > self.defense[i])]
+        if not group.support or not group.targets:
+            return
+
+        k = 0.25
+        if strengths.count(strength) == 1:
+            k *= 0.8
+        if sum(max(self.importance[c], 0) for c in group.contact) < len(group.contact):
+            k *= 0.9
+        if len(group.units) == 1 and len(group.contact) == 1:
+            k *= 0.66
+        group.danger = k * strength
+
+    def thirst(self) -> float:
+        """getThirst: how urgently the most dangerous group needs an answer (0 = not at all)."""
+        if not self.groups or self.groups[0].danger <= DANGER_THRESHOLD:
+            return 0.0
+        return 1.5 + 5 * self.groups[0].danger
+
+    def really_needed(self, target: int) -> bool:
+        """doesHexReallyNeedDefense for the most important of our hexes next to target."""
+        importance = max((self.importance[n] for n in self.grid.neighbors[target] if self.own[n]), default=-1)
+        return importance > REALLY_NEEDED
+
+    def _reachable_units(self, unit: int) -> List[int]:
+        """casterReachableUnits: our unmoved units that can move onto unit (furthest first)."""
+        if unit not in self._unit_reach:
+            reach = self.grid.cast([Caster([unit], MOVE_LIMIT, into=self.own)])[0]
+            units = [h for h in reach.reached() if is_unmoved(self.grid.resident[h])]
+            units.sort(key=reach.steps, reverse=True)
+            self._unit_reach[unit] = units
+        return self._unit_reach[unit]
+
+    def plan(self, province: Sequence[int], source: int, money: int, income: int,
+             used: Optional[Set[int]] = None, min_danger: float = DANGER_THRESHOLD) -> List[DefenseAnswer]:
+        """
+        Answers for the province (its hexes; source is the hex that pays),
+        most dangerous group first, strongest enemy unit first within a
+        group. used: hexes already spoken for this turn (units that moved,
+        enemy hexes already attacked); the answers' units and targets are
+        added to it.
+        """
+        resident = self.grid.resident
+        neighbors = self.grid.neighbors
+        members = set(province)
+        used = set() if used is None else used
+        answers = []
+        for group in self.groups:
+            if group.danger <= min_danger:
+                break
+            targets = [u for u in group.units if u in self.attackers and u not in used]
+            targets.sort(key=lambda u: POWER[resident[u]], reverse=True)
+            for target in targets:
+                answer = self._answer(group, target, members, source, money, income, used, neighbors)
+                if answer is None:
+                    continue
+                answers.append(answer)
+                money -= answer.cost
+                income -= answer.tax
+                used.update(h for h in (answer.target, answer.unit, answer.partner) if h >= 0)
+        return answers
+
+    def _answer(self, group, target, members, source, money, income, used, neighbors) -> Optional[DefenseAnswer]:
+        resident = self.grid.resident
+        required = self.capture_strength(target)
+        needed = self.really_needed(target)
+        attackers = [u for u in self.attackers[target] if u in members and u not in used]
+
+        for u in attackers:
+            if POWER[resident[u]] >= required:
+                return DefenseAnswer(FIGHT, target, group, unit=u)
+
+        for u in attackers:
+            s = POWER[resident[u]]
+            partners = [k for k in self._reachable_units(u)
+                        if k != u and k not in used and required - s <= POWER[resident[k]] <= 4 - s]
+            partners = [k for k in partners if needed or can_afford_tax_change(
+                merge_tax_change(POWER[resident[k]], s), income, money)]
+            if partners:
+                weakest = min(POWER[resident[k]] for k in partners)
+                partner = next(k for k in partners if POWER[resident[k]] == weakest)
+                return DefenseAnswer(MERGE, target, group, unit=u, partner=partner,
+                                     tax=merge_tax_change(weakest, s))
+
+        if attackers:
+            u = max(attackers, key=lambda h: POWER[resident[h]])
+            s = POWER[resident[u]]
+            extra = required - s
+            cost = extra * UNIT_PRICE
+            tax = merge_tax_change(s, extra) + UPKEEP[extra]
+            if cost <= money and (needed or can_afford_tax_change(tax + 2, income, money)):
+                return DefenseAnswer(REINFORCE, target, group, unit=u, strength=extra, source=source,
+                                     cost=cost, tax=tax)
+
+        # tryToFightUnitWithMoney: not for strength 2 units, and only onto hexes next to the province
+        cost = required * UNIT_PRICE
+        if (POWER[resident[target]] > 2 and cost <= money and any(n in members for n in neighbors[target])
+                and (needed or can_afford_tax_change(UPKEEP[required], income, money))):
+            return DefenseAnswer(BUY, target, group, strength=required, source=source,
+                                 cost=cost, tax=UPKEEP[required])
+        return None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'groups': len(self.groups),
+            'danger': self.groups[0].danger if self.groups else 0.0,
+            'front_units': len(self.front_units),
+            'thirst': self.thirst(),
+        }
@@ -0,0 +1,79 @@
+"""
+Distance-field navigation.
+
+One multi-source BFS per turn from every target hex, expanding only through
+the player's own land. Units then walk downhill on the field instead of
+running their own search.
+"""
+
+from collections import deque
+from typing import Callable, List, Optional
+from .game_utils import GameUtils
+from .hex_geometry import MOVE_LIMIT
+
+UNREACHABLE = -1
+
+
+class DistanceField:
+    """
+    Distance (in hex steps through our territory) to the nearest target.
+
+    Targets have distance 0. Own hexes get the length of the shortest path
+    to a target that only crosses own hexes. Everything else is UNREACHABLE.
+    """
+
+    def __init__(self, board, player_id: int, is_target: Callable):
+        self.board = board
+        self.player_id = player_id
+        self.neighbors = GameUtils.get_neighbor_table(board.width, board.height)
+        self.dist: List[int] = [UNREACHABLE] * (board.width * board.height)
+        self._build(is_target)
+
+    def _build(self, is_target: Callable):
+        hexes = self.board.hexes
+        dist = self.dist
+        queue = deque()
+
+        for i, h in enumerate(hexes):
+            if is_target(h):
+                dist[i] = 0
+                queue.append(i)
+
+        while queue:
+            i = queue.popleft()
+            d = dist[i] + 1
+            for n in self.neighbors[i]:
+                if dist[n] == UNREACHABLE and hexes[n].owner_id == self.player_id:
+                    dist[n] = d
+                    queue.append(n)
+
+    def distance(self, hex_obj) -> int:
+        """Steps to the nearest target, or UNREACHABLE."""
+        return self.dist[hex_obj.y * self.board.width + hex_obj.x]
+
+    def next_step(self, hex_obj) -> Optional[object]:
+        """Own neighbor one step closer to a target (None if already there or cut off)."""
+        i = hex_obj.y * self.board.width + hex_obj.x
+        d = self.dist[i]
+        if d <= 1:
+            return None
+        for n in self.neighbors[i]:
+            if self.dist[n] == d - 1:
+                return self.board.hexes[n]
+        return None
+
+    def descend(self, hex_obj, can_stop: Callable, max_steps: int = MOVE_LIMIT) -> Optional[object]:
+        """
+        Follow the gradient for up to max_steps through own land and return
+        the furthest hex on the way that can_stop accepts (None if none does).
+        Never steps onto a target itself.
+        """
+        best = None
+        current = hex_obj
+        for _ in range(max_steps):
+            current = self.next_step(current)
+            if current is None:
+                break
+            if can_stop(current):
+                best = current
+        return best
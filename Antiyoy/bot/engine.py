@@ -0,0 +1,1003 @@
+"""
+Headless Antiyoy rules engine.
+
+Pure-Python port of the rules in board.cpp / game.cpp, so whole matches can
+be played in-process without the game binary and its socket round trips.
+The board is kept as flat lists (index = y * width + x) of owners and
+residents; castle money lives per player like Country::castles.
+
+Every state change goes through a small set of setters, which can record
+an undo journal. apply_actions() uses it to accept or reject a batch of
+actions atomically, the way the server validates batches on a dummy board.
+
+Deliberate differences from the C++ game:
+- random numbers come from Python's random.Random, so a seed does not
+  reproduce the same match as the binary;
+- map generation ports InitializeRandom only (no "ants" variant);
+- where C++ iterates an unordered_set (which castle keeps the money when
+  castles merge), the engine picks the lowest hex index;
+- a unit can not "move" onto its own hex (in C++ this deletes the unit);
+- the price of a placement is charged before provinces are recalculated,
+  so it is never charged to a castle that a capture merged away.
+"""
+
+import random
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from .game_utils import GameUtils, Resident
+
+# Resident ids as plain ints (hot loops avoid enum lookups)
+WATER = int(Resident.Water)
+EMPTY = int(Resident.Empty)
+WARRIOR1 = int(Resident.Warrior1)
+WARRIOR4 = int(Resident.Warrior4)
+WARRIOR1_MOVED = int(Resident.Warrior1Moved)
+WARRIOR4_MOVED = int(Resident.Warrior4Moved)
+FARM = int(Resident.Farm)
+CASTLE = int(Resident.Castle)
+TOWER = int(Resident.Tower)
+STRONG_TOWER = int(Resident.StrongTower)
+PALM = int(Resident.PalmTree)
+PINE = int(Resident.PineTree)
+GRAVESTONE = int(Resident.Gravestone)
+RESIDENT_COUNT = GRAVESTONE + 1
+
+# power() from board.cpp: -1 land/trees/graves, 0 farm, 1-4 warriors and buildings
+POWER = (-1, -1, 1, 2, 3, 4, 1, 2, 3, 4, 0, 1, 2, 3, -1, -1, -1)
+# incomeBoard + 1 (every hex of a province earns 1)
+HEX_INCOME = (1, 1, -1, -5, -17, -37, -1, -5, -17, -35, 5, 1, 0, -5, 0, 0, 1)
+
+TREE_SPREAD_PALM = 0.03
+TREE_SPREAD_PINE = 0.02
+START_MONEY = 10  # Country::Country gives every starting castle 10
+MAX_WIRE_MONEY = 65535  # sendBoard clamps money to uint16
+
+
+def is_warrior(r: int) -> bool:
+    return WARRIOR1 <= r <= WARRIOR4_MOVED
+
+
+def is_unmoved(r: int) -> bool:
+    return WARRIOR1 <= r <= WARRIOR4
+
+
+def is_moved(r: int) -> bool:
+    return WARRIOR1_MOVED <= r <= WARRIOR4_MOVED
+
+
+def is_tree(r: int) -> bool:
+    return r == PALM or r == PINE
+
+
+def moved(r: int) -> int:
+    return r + 4 if is_unmoved(r) else EMPTY
+
+
+def unmoved(r: int) -> int:
+    return r - 4 if is_moved(r) else EMPTY
+
+
+def merge_warriors(a: int, b: int) -> int:
+    """mergeWarriors(): combined warrior, or EMPTY if they can't merge."""
+    if not (is_warrior(a) and is_warrior(b)):
+        return EMPTY
+    total = POWER[a] + POWER[b]
+    if total > 4:
+        return EMPTY
+    return WARRIOR1 - 1 + total + (4 if (is_moved(a) or is_moved(b)) else 0)
+
+
+@lru_cache(maxsize=None)
+def direction_table(width: int, height: int) -> Tuple[Tuple[int, ...], ...]:
+    """Per hex: the 6 neighbors in board.cpp direction order, -1 when off the board."""
+    table = []
+    for y in range(height):
+        for x in range(width):
+            if x % 2 == 0:
+                offsets = ((0, -1), (-1, -1), (-1, 0), (0, 1), (1, 0), (1, -1))
+            else:
+                offsets = ((0, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0))
+            row = []
+            for dx, dy in offsets:
+                nx, ny = x + dx, y + dy
+                row.append(ny * width + nx if 0 <= nx < width and 0 <= ny < height else -1)
+            table.append(tuple(row))
+    return tuple(table)
+
+
+# Journal entry kinds
+_J_RESIDENT, _J_OWNER, _J_CASTLE, _J_TEMP, _J_ATTR, _J_LEADERBOARD, _J_RNG = range(7)
+_MISSING = object()
+
+# Action tuples used by apply_actions() / EngineActionBuilder
+ACTION_END_TURN = 0
+ACTION_PLACE = 1
+ACTION_MOVE = 2
+ACTION_BUILD = 3  # Sent by old AI code, the game has no such action
+
+
+class Engine:
+    """Game state plus the rules of board.cpp."""
+
+    def __init__(self, width: int, height: int, num_players: int, seed: Optional[int] = None):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.num_players = num_players
+        self.owner: List[int] = [0] * self.size
+        self.resident: List[int] = [WATER] * self.size
+        self.neighbors = GameUtils.get_neighbor_table(width, height)
+        self.directions = direction_table(width, height)
+        # castles[player] = {castle hex index: money}; index 0 unused (neutral)
+        self.castles: List[Dict[int, int]] = [{} for _ in range(num_players + 1)]
+        self.temp_money: List[int] = [0] * (num_players + 1)
+        self.current_player = 1
+        self.first_round = True
+        self.round = 1
+        self.turn = 0
+        self.leaderboard: List[int] = []
+        self.rng = random.Random(seed)
+        self.version = 0  # Bumped on every change, for caches keyed on state
+        self._journal: Optional[list] = None
+        self._depth = 0  # Open begin() calls
+        self._stamp = 0
+        self._marks = [0] * self.size
+
+    # ==================== SETUP ====================
+
+    @classmethod
+    def new_game(cls, width: int, height: int, num_players: int, seed: Optional[int] = None,
+                 min_province: int = 2, max_province: Optional[int] = None,
+                 min_land: float = 0.3, max_land: float = 0.6, tree_ratio: float = 0.2) -> 'Engine':
+        """Random map like Game::Init (InitializeRandom, InitializeCountries, spawnTrees)."""
+        engine = cls(width, height, num_players, seed)
+        total = width * height
+        if max_province is None:
+            max_province = max(min_province, int(total * min_land / num_players))
+        engine._init_land(int(total * min_land), int(total * max_land))
+        engine._init_countries(min_province, max_province)
+        engine._spawn_trees(tree_ratio)
+        return engine
+
+    @classmethod
+    def from_board(cls, board, num_players: Optional[int] = None, current_player: int = 1,
+                   first_round: bool = False, seed: Optional[int] = None) -> 'Engine':
+        """
+        State from a received board. Castle money is taken from the castle
+        hexes; players without castles count as eliminated.
+        """
+        if num_players is None:
+            num_players = max([h.owner_id for h in board.hexes] + [1])
+        engine = cls(board.width, board.height, num_players, seed)
+        for i, h in enumerate(board.hexes):
+            engine.owner[i] = h.owner_id
+            engine.resident[i] = int(h.resident)
+            if engine.resident[i] == CASTLE and h.owner_id:
+                engine.castles[h.owner_id][i] = h.money
+        engine.current_player = current_player
+        engine.first_round = first_round
+        for player in range(1, num_players + 1):
+            if not engine.castles[player] and not engine.is_game_over():
+                engine._eliminate(player)
+        return engine
+
+    def _init_land(self, min_hexes: int, max_hexes: int):
+        rng = self.rng
+        n = rng.randint(min_hexes, max_hexes)
+        middle = (self.height // 2) * self.width + self.width // 2
+        addable_set = {middle}
+        addable = [middle]
+        while n > 0 and addable:
+            k = rng.randrange(len(addable))
+            i = addable[k]
+            addable_set.discard(i)
+            addable[k] = addable[-1]
+            addable.pop()
+            self.resident[i] = EMPTY
+            for nb in self.neighbors[i]:
+                if self.resident[nb] == WATER and nb not in addable_set:
+                    addable_set.add(nb)
+                    addable.append(nb)
+            n -= 1
+
+    def _init_countries(self, min_size: int, max_size: int):
+        if min_size > max_size:
+            min_size, max_size = max_size, min_size
+        if min_size < 1:
+            return
+        rng = self.rng
+        for attempt in range(100):
+            origins = []
+            failed = False
+            for player in range(1, self.num_players + 1):
+                available = [i for i in range(self.size) if self.resident[i] != WATER and self.owner[i] == 0]
+                if not available:
+                    raise RuntimeError("Not enough space to initialize countries")
+                origin = available[rng.randrange(len(available))]
+                origins.append(origin)
+                addable_set = {origin}
+                addable = [origin]
+                n = rng.randint(min_size, max_size)
+                while n > 0:
+                    if not addable:
+                        failed = True  # Boxed in by other countries, start over
+                        break
+                    k = rng.randrange(len(addable))
+                    i = addable[k]
+                    addable_set.discard(i)
+                    addable[k] = addable[-1]
+                    addable.pop()
+                    self.owner[i] = player
+                    for nb in self.neighbors[i]:
+                        if self.resident[nb] != WATER and self.owner[nb] == 0 and nb not in addable_set:
+                            addable_set.add(nb)
+                            addable.append(nb)
+                    n -= 1
+                if failed:
+                    break
+            if not failed:
+                for player, origin in enumerate(origins, 1):
+                    self.resident[origin] = CASTLE
+                    self.castles[player][origin] = START_MONEY
+                return
+            self.owner = [0] * self.size
+        raise RuntimeError("Too many failed country initializations")
+
+    def _spawn_trees(self, ratio: float):
+        empties = [i for i in range(self.size) if self.resident[i] == EMPTY]
+        self.rng.shuffle(empties)
+        count = len(empties) * ratio
+        for k, i in enumerate(empties):
+            if k >= count:
+                break
+            self.resident[i] = PALM if self.is_near_water(i) else PINE
+
+    # ==================== JOURNAL ====================
+
+    def begin(self) -> int:
+        """Start recording changes; returns a mark for rollback()/commit(). Can be nested."""
+        if self._journal is None:
+            self._journal = []
+        self._depth += 1
+        return len(self._journal)
+
+    def rollback(self, mark: int):
+        """Undo every change made since begin() returned mark."""
+        journal = self._journal
+        while len(journal) > mark:
+            entry = journal.pop()
+            kind = entry[0]
+            if kind == _J_RESIDENT:
+                self.resident[entry[1]] = entry[2]
+            elif kind == _J_OWNER:
+                self.owner[entry[1]] = entry[2]
+            elif kind == _J_CASTLE:
+                if entry[3] is _MISSING:
+                    self.castles[entry[1]].pop(entry[2], None)
+                else:
+                    self.castles[entry[1]][entry[2]] = entry[3]
+            elif kind == _J_TEMP:
+                self.temp_money[entry[1]] = entry[2]
+            elif kind == _J_ATTR:
+                setattr(self, entry[1], entry[2])
+            elif kind == _J_LEADERBOARD:
+                self.leaderboard = entry[1]
+            elif kind == _J_RNG:
+                self.rng.setstate(entry[1])
+        self.version += 1
+        self._end()
+
+    def commit(self, mark: int):
+        """Keep the changes since mark. The outermost commit stops recording."""
+        self._end()
+
+    def _end(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._journal = None
+
+    def changes_since(self, mark: int) -> Dict[int, Tuple[int, int]]:
+        """Hexes changed since begin() returned mark, with their (owner, resident) back then."""
+        owners: Dict[int, int] = {}
+        residents: Dict[int, int] = {}
+        for entry in self._journal[mark:]:  # The first entry of a hex holds its oldest value
+            kind = entry[0]
+            if kind == _J_RESIDENT:
+                residents.setdefault(entry[1], entry[2])
+            elif kind == _J_OWNER:
+                owners.setdefault(entry[1], entry[2])
+        return {i: (owners.get(i, self.owner[i]), residents.get(i, self.resident[i]))
+                for i in owners.keys() | residents.keys()}
+
+    def _set_resident(self, i: int, r: int):
+        if self._journal is not None:
+            self._journal.append((_J_RESIDENT, i, self.resident[i]))
+        self.resident[i] = r
+        self.version += 1
+
+    def _set_owner(self, i: int, owner: int):
+        if self._journal is not None:
+            self._journal.append((_J_OWNER, i, self.owner[i]))
+        self.owner[i] = owner
+        self.version += 1
+
+    def _set_castle_money(self, player: int, i: int, money: int):
+        castles = self.castles[player]
+        if self._journal is not None:
+            self._journal.append((_J_CASTLE, player, i, castles.get(i, _MISSING)))
+        castles[i] = money
+        self.version += 1
+
+    def _drop_castle(self, player: int, i: int) -> int:
+        castles = self.castles[player]
+        money = castles.pop(i)
+        if self._journal is not None:
+            self._journal.append((_J_CASTLE, player, i, money))
+        self.version += 1
+        return money
+
+    def _set_temp_money(self, player: int, money: int):
+        if self._journal is not None:
+            self._journal.append((_J_TEMP, player, self.temp_money[player]))
+        self.temp_money[player] = money
+
+    def _set_attr(self, name: str, value):
+        if self._journal is not None:
+            self._journal.append((_J_ATTR, name, getattr(self, name)))
+        setattr(self, name, value)
+
+    def _random_index(self, n: int) -> int:
+        if self._journal is not None:
+            self._journal.append((_J_RNG, self.rng.getstate()))
+        return self.rng.randrange(n)
+
+    def _random(self) -> float:
+        if self._journal is not None:
+            self._journal.append((_J_RNG, self.rng.getstate()))
+        return self.rng.random()
+
+    # ==================== QUERIES ====================
+
+    def index(self, x: int, y: int) -> int:
+        """Flat index, or -1 when off the board."""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y * self.width + x
+        return -1
+
+    def province(self, i: int) -> List[int]:
+        """All hexes connected to i with the same owner (i first)."""
+        owner = self.owner[i]
+        self._stamp += 1
+        stamp = self._stamp
+        marks = self._marks
+        marks[i] = stamp
+        result = [i]
+        for h in result:  # grows while iterating (BFS)
+            for n in self.neighbors[h]:
+                if marks[n] != stamp and self.owner[n] == owner:
+                    marks[n] = stamp
+                    result.append(n)
+        return result
+
+    def province_castle(self, i: int) -> int:
+        """Castle of the province containing i, or -1 (Hexagon::province()[0])."""
+        if self.owner[i] == 0:
+            return -1
+        if self.resident[i] == CASTLE:
+            return i
+        for h in self.province(i):
+            if self.resident[h] == CASTLE:
+                return h
+        return -1
+
+    def is_near_water(self, i: int) -> bool:
+        """Next to water or to the edge of the board."""
+        nbs = self.neighbors[i]
+        if len(nbs) < 6:
+            return True
+        resident = self.resident
+        for n in nbs:
+            if resident[n] == WATER:
+                return True
+        return False
+
+    def _borders_water(self, i: int) -> bool:
+        for n in self.neighbors[i]:
+            if self.resident[n] == WATER:
+                return True
+        return False
+
+    def _borders_pine_and_other_tree(self, i: int) -> bool:
+        pine = False
+        trees = 0
+        for n in self.neighbors[i]:
+            r = self.resident[n]
+            if r == PINE:
+                pine = True
+            if r == PINE or r == PALM:
+                trees += 1
+        return pine and trees >= 2
+
+    def allows(self, i: int, warrior: int, owner: int) -> bool:
+        """Hexagon::allows: can an (unmoved) warrior of owner enter hex i."""
+        if not is_unmoved(warrior):
+            return False
+        r = self.resident[i]
+        if r == WATER:
+            return False
+        target_owner = self.owner[i]
+        if target_owner == owner:
+            if is_warrior(r):
+                return merge_warriors(r, warrior) != EMPTY
+            return POWER[r] < 0
+        attack = POWER[warrior]
+        if attack == 4:
+            return True
+        if POWER[r] >= attack:
+            return False
+        for n in self.neighbors[i]:
+            if self.owner[n] == target_owner and POWER[self.resident[n]] >= attack:
+                return False
+        return True
+
+    def price(self, i: int, resident: int) -> int:
+        """Hexagon::price for buying resident in the province of i (0 = can't buy)."""
+        castle = self.province_castle(i)
+        if castle < 0:
+            return 0
+        if is_unmoved(resident):
+            return POWER[resident] * 10
+        if resident == FARM:
+            return 12 + 2 * self.count_farms(castle)
+        if resident == TOWER:
+            return 15
+        if resident == STRONG_TOWER:
+            return 35
+        return 0
+
+    def count_farms(self, i: int) -> int:
+        resident = self.resident
+        return sum(1 for h in self.province(i) if resident[h] == FARM)
+
+    def province_income(self, province: Sequence[int]) -> int:
+        """calculateIncome(): per-turn income of a province."""
+        resident = self.resident
+        return sum(HEX_INCOME[resident[h]] for h in province)
+
+    def money_at(self, i: int) -> int:
+        """Money of the castle of i's province (what the BOARD message shows on every hex)."""
+        castle = self.province_castle(i)
+        if castle < 0:
+            return 0
+        return self.castles[self.owner[castle]].get(castle, 0)
+
+    def possible_movements(self, i: int) -> List[int]:
+        """Hexagon::possibleMovements, without the unit's own hex."""
+        owner = self.owner[i]
+        warrior = self.resident[i]
+        if owner == 0 or not is_unmoved(warrior):
+            return []
+        visited, border = self._reach(i, 4)
+        return [h for h in visited[1:] + border if self.allows(h, warrior, owner)]
+
+    def possible_placements(self, i: int, resident: int) -> List[int]:
+        """Hexagon::possiblePlacements for buying resident from the province of i."""
+        owner = self.owner[i]
+        if owner == 0:
+            return []
+        if is_unmoved(resident):
+            visited, border = self._reach(i, self.size)
+            return [h for h in visited + border if self.allows(h, resident, owner)]
+        res = self.resident
+        if resident == FARM:
+            return [h for h in self.province(i)
+                    if (res[h] == EMPTY or res[h] == GRAVESTONE) and
+                    any(self.owner[n] == owner and (res[n] == CASTLE or res[n] == FARM) for n in self.neighbors[h])]
+        if resident == TOWER:
+            return [h for h in self.province(i) if res[h] == EMPTY or res[h] == GRAVESTONE]
+        if resident == STRONG_TOWER:
+            return [h for h in self.province(i) if res[h] == EMPTY or res[h] == GRAVESTONE or res[h] == TOWER]
+        return []
+
+    def placement_strengths(self, i: int) -> Dict[int, Tuple[int, int]]:
+        """
+        possible_placements() of all four warriors in one pass: every hex a
+        warrior bought in the province of i may be put on, with the weakest
+        and the strongest power that allows() lets in. Foreign hexes need one
+        more than their strongest defender (4 always works); own warriors
+        take merges up to a total of 4; own empty land, graves and trees
+        take any warrior.
+        """
+        owner = self.owner[i]
+        if owner == 0:
+            return {}
+        resident = self.resident
+        visited, border = self._reach(i, self.size)
+        result: Dict[int, Tuple[int, int]] = {}
+        for h in visited:
+            r = resident[h]
+            if is_warrior(r):
+                if POWER[r] < 4:
+                    result[h] = (1, 4 - POWER[r])
+            elif POWER[r] < 0:
+                result[h] = (1, 4)
+        for h in border:
+            r = resident[h]
+            if r == WATER:
+                continue
+            target_owner = self.owner[h]
+            defense = POWER[r]
+            for n in self.neighbors[h]:
+                if self.owner[n] == target_owner:
+                    defense = max(defense, POWER[resident[n]])
+            result[h] = (min(max(defense + 1, 1), 4), 4)
+        return result
+
+    def _reach(self, i: int, layers: int) -> Tuple[List[int], List[int]]:
+        """
+        addNeighboursLayerWithBorder: own hexes up to `layers` steps from i
+        (walking only through own land), and the foreign hexes touching them.
+        """
+        owner = self.owner[i]
+        self._stamp += 1
+        stamp = self._stamp
+        marks = self._marks
+        marks[i] = stamp
+        visited = [i]
+        border = []
+        layer = [i]
+        for _ in range(layers):
+            if not layer:
+                break
+            new_layer = []
+            for h in layer:
+                for n in self.neighbors[h]:
+                    if marks[n] != stamp:
+                        marks[n] = stamp
+                        if self.owner[n] == owner:
+                            visited.append(n)
+                            new_layer.append(n)
+                        else:
+                            border.append(n)
+            layer = new_layer
+        return visited, border
+
+    def is_game_over(self) -> bool:
+        return len(self.leaderboard) >= self.num_players
+
+    def alive_players(self) -> List[int]:
+        return [p for p in range(1, self.num_players + 1) if self.castles[p]]
+
+    # ==================== ACTIONS ====================
+
+    def place(self, src: int, resident: int, dst: int) -> bool:
+        """
+        Hexagon::place: buy resident with the money of src's province and put
+        it on dst. Like the server, src may be any hex of the province.
+        """
+        if not (is_unmoved(resident) or resident == FARM or resident == TOWER or resident == STRONG_TOWER):
+            return False
+        if src < 0 or dst < 0:
+            return False
+        castle = self.province_castle(src)
+        if castle < 0:
+            return False
+        price = self.price(castle, resident)
+        if not price:
+            return False
+        owner = self.owner[castle]
+        money = self.castles[owner].get(castle, 0)
+        if price > money:
+            return False
+        if dst not in self.possible_placements(src, resident):
+            return False
+
+        self._set_castle_money(owner, castle, money - price)
+        if not is_unmoved(resident):
+            self._set_resident(dst, resident)  # Farm or tower
+            return True
+
+        r = self.resident[dst]
+        if self.owner[dst] == owner:
+            if is_warrior(r):
+                self._set_resident(dst, merge_warriors(resident, r))
+            elif r == GRAVESTONE:
+                self._set_resident(dst, moved(resident))
+            elif is_tree(r):
+                self._remove_tree(dst)
+                self._set_resident(dst, moved(resident))
+            else:
+                self._set_resident(dst, resident)
+        else:
+            old_owner = self.owner[dst]
+            if r == CASTLE and old_owner:
+                self._set_temp_money(old_owner, self.temp_money[old_owner] + self._remove_castle(dst, False))
+            self._set_resident(dst, moved(resident))
+            self._set_owner(dst, owner)
+            self._calculate_environment(dst, old_owner)
+        return True
+
+    def move(self, src: int, dst: int) -> bool:
+        """Hexagon::move: move the unmoved warrior on src to dst (merge or conquer)."""
+        if src < 0 or dst < 0:
+            return False
+        warrior = self.resident[src]
+        if not is_unmoved(warrior):
+            return False
+        if dst not in self.possible_movements(src):
+            return False
+
+        owner = self.owner[src]
+        old_owner = self.owner[dst]
+        r = self.resident[dst]
+        if old_owner == owner and is_warrior(r):
+            self._set_resident(dst, merge_warriors(warrior, r))
+        else:
+            if r == CASTLE:
+                self._remove_castle(dst, False)  # Money of a castle taken by a move is lost
+            if is_tree(r):
+                self._remove_tree(dst)
+            self._set_resident(dst, moved(warrior))
+        self._set_resident(src, EMPTY)
+
+        if owner != old_owner:
+            self._set_owner(dst, owner)
+            self._calculate_environment(dst, old_owner)
+        return True
+
+    def next_turn(self, full: bool = True):
+        """Board::nextTurn: end the current player's turn and start the next living player's."""
+        player = self.current_player
+        if full:
+            for castle in list(self.castles[player]):
+                for h in self.province(castle):
+                    if is_unmoved(self.resident[h]):
+                        self._set_resident(h, moved(self.resident[h]))
+
+        for _ in range(self.num_players + 1):
+            player = player % self.num_players + 1
+            self._set_attr('current_player', player)
+            if player == 1 and full:
+                self._propagate_trees()
+                self._set_attr('first_round', False)
+                self._set_attr('round', self.round + 1)
+            castles = self.castles[player]
+            if not castles:
+                continue
+
+            to_remove = []
+            for castle in list(castles):
+                province = self.province(castle)
+                if len(province) == 1:  # Only the castle is left
+                    to_remove.append(castle)
+                    continue
+                if not full:
+                    continue
+                for h in province:
+                    r = self.resident[h]
+                    if is_moved(r):
+                        self._set_resident(h, unmoved(r))
+                    elif r == GRAVESTONE:
+                        self._set_resident(h, PALM if self.is_near_water(h) else PINE)
+                money = castles[castle]
+                if not self.first_round:
+                    money += self.province_income(province)
+                if money < 0:  # Bankrupt: the army dies
+                    money = 0
+                    for h in province:
+                        if is_warrior(self.resident[h]):
+                            self._set_resident(h, GRAVESTONE)
+                self._set_castle_money(player, castle, money)
+            for castle in to_remove:
+                self._rot(castle)
+                self._remove_castle(castle, True)
+            if castles:
+                break
+        self._set_attr('turn', self.turn + 1)
+
+    def apply_actions(self, actions: Sequence[tuple], player: Optional[int] = None) -> Tuple[bool, bool]:
+        """
+        Run a batch like the server does for one ACTION message: either every
+        action is legal and all of them happen, or nothing changes.
+        Returns (approved, turn_ended).
+        """
+        if player is not None and player != self.current_player:
+            return False, False
+        mark = self.begin()
+        for action in actions:
+            kind = action[0]
+            if kind == ACTION_END_TURN:
+                self.commit(mark)
+                self.next_turn()
+                return True, True
+            if kind == ACTION_PLACE:
+                _, resident, x_from, y_from, x_to, y_to = action
+                ok = self.place(self.index(x_from, y_from), resident, self.index(x_to, y_to))
+            elif kind == ACTION_MOVE:
+                _, x_from, y_from, x_to, y_to = action
+                ok = self.move(self.index(x_from, y_from), self.index(x_to, y_to))
+            else:
+                ok = False
+            if not ok:
+                self.rollback(mark)
+                return False, False
+        self.commit(mark)
+        return True, False
+
+    # ==================== PROVINCE UPKEEP ====================
+
+    def _rot(self, i: int):
+        r = self.resident[i]
+        if is_warrior(r):
+            self._set_resident(i, GRAVESTONE)
+        elif CASTLE <= r <= STRONG_TOWER or r == GRAVESTONE:
+            self._set_resident(i, PALM if self._borders_water(i) else PINE)
+
+    def _remove_castle(self, i: int, eliminate_castleless: bool) -> int:
+        """Hexagon::removeCastle: returns the castle's money."""
+        if self.resident[i] == CASTLE:
+            self._set_resident(i, EMPTY)
+        player = self.owner[i]
+        if i in self.castles[player]:
+            money = self._drop_castle(player, i)
+            if eliminate_castleless and not self.castles[player]:
+                self._eliminate(player)
+            return money
+        return 0
+
+    def _remove_tree(self, i: int):
+        """Hexagon::removeTree: cutting a tree pays 3 to the tree owner's castle."""
+        player = self.owner[i]
+        if not player or not self.castles[player]:
+            return
+        castle = self.province_castle(i)
+        if castle >= 0:
+            self._set_castle_money(player, castle, self.castles[player].get(castle, 0) + 3)
+
+    def _calculate_province(self, i: int):
+        """Hexagon::calculateProvince: rot lone hexes, merge castles, found missing ones."""
+        player = self.owner[i]
+        if player == 0:
+            return
+        province = self.province(i)
+        castles = [h for h in province if self.resident[h] == CASTLE]
+        if len(province) == 1:
+            if not castles:
+                self._rot(i)
+            return
+        if len(castles) > 1:
+            keep = min(castles)
+            total = self.castles[player].get(keep, 0)
+            for c in castles:
+                if c != keep:
+                    total += self._remove_castle(c, False)
+            self._set_castle_money(player, keep, total)
+            return
+        if not castles:
+            empties = [h for h in province if self.resident[h] == EMPTY]
+            pool = empties or province
+            new_castle = pool[self._random_index(len(pool))]
+            self._set_resident(new_castle, CASTLE)
+            self._set_castle_money(player, new_castle, self.temp_money[player])
+            if self.temp_money[player]:
+                self._set_temp_money(player, 0)
+
+    def _calculate_environment(self, center: int, old_owner: int):
+        """calculateEnvironment: fix provinces around a hex that changed owner."""
+        if old_owner != 0:
+            to_check = []
+            add = True
+            trim_first = False
+            directions = self.directions[center]
+            for k in range(6):
+                n = directions[k]
+                if n < 0 or self.owner[n] != old_owner:
+                    add = True
+                else:
+                    if add:
+                        to_check.append(n)
+                        add = False
+                        if k == 0:
+                            trim_first = True
+                    if k == 5 and trim_first and len(to_check) > 1:  # Last run wraps into the first
+                        to_check[0] = to_check[-1]
+                        to_check.pop()
+            for h in to_check:
+                self._calculate_province(h)
+            if not self.castles[old_owner] and old_owner not in self.leaderboard:
+                self._eliminate(old_owner)
+        self._calculate_province(center)
+
+    def _eliminate(self, player: int):
+        """Board::eliminateCountry: leaderboard is filled from last place to the winner."""
+        leaderboard = [player] + self.leaderboard
+        if len(leaderboard) >= self.num_players - 1:
+            for p in range(1, self.num_players + 1):
+                if p not in leaderboard:
+                    leaderboard.insert(0, p)
+                    break
+        if self._journal is not None:
+            self._journal.append((_J_LEADERBOARD, self.leaderboard))
+        self.leaderboard = leaderboard
+
+    def _propagate_trees(self):
+        """Board::propagateTrees: palms spread along water, pines into pine groves."""
+        resident = self.resident
+        palms = set()
+        pines = set()
+        for i in range(self.size):
+            r = resident[i]
+            if r != PALM and r != PINE:
+                continue
+            free = [n for n in self.neighbors[i] if resident[n] == EMPTY]
+            if not free:
+                continue
+            chance = self._random()
+            if r == PALM and chance <= TREE_SPREAD_PALM:
+                free = [n for n in free if self.is_near_water(n)]
+                if free:
+                    palms.add(free[self._random_index(len(free))])
+            elif r == PINE and chance <= TREE_SPREAD_PINE:
+                free = [n for n in free if self._borders_pine_and_other_tree(n)]
+                if free:
+                    pines.add(free[self._random_index(len(free))])
+        for h in sorted(pines):
+            self._set_resident(h, PINE)
+        for h in sorted(palms):
+            self._set_resident(h, PALM)
+
+    # ==================== EXPORT ====================
+
+    def hex_money(self) -> List[int]:
+        """Money per hex as in the BOARD message (castle money on its whole province)."""
+        money = [0] * self.size
+        for player in range(1, self.num_players + 1):
+            for castle, amount in self.castles[player].items():
+                amount = min(amount, MAX_WIRE_MONEY) & 0xFFFF
+                for h in self.province(castle):
+                    money[h] = amount
+        return money
+
+    def to_board(self, board_cls, hex_cls, resident_cls=Resident):
+        """Build the board a bot would receive right now."""
+        residents = [resident_cls(r) for r in range(RESIDENT_COUNT)]
+        money = self.hex_money()
+        board = board_cls(self.width, self.height)
+        width = self.width
+        for i in range(self.size):
+            board.add_hex(hex_cls(i % width, i // width, self.owner[i], residents[self.resident[i]], money[i]))
+        touch = getattr(board, 'touch', None)  # Boards with a query cache invalidate once, after the last hex
+        if touch is not None:
+            touch()
+        return board
+
+    def to_bytes(self) -> bytes:
+        """Current board as a snapshot (the BOARD payload, see snapshot.py)."""
+        data = bytearray(4 + 4 * self.size)
+        data[0:4] = self.width.to_bytes(2, 'big') + self.height.to_bytes(2, 'big')
+        pos = 4
+        for i, m in enumerate(self.hex_money()):
+            data[pos] = self.owner[i]
+            data[pos + 1] = self.resident[i]
+            data[pos + 2] = m >> 8
+            data[pos + 3] = m & 0xFF
+            pos += 4
+        return bytes(data)
+
+    def ranking(self) -> List[int]:
+        """Leaderboard if the game is over, otherwise players by land owned."""
+        if self.is_game_over():
+            return list(self.leaderboard)
+        land = [0] * (self.num_players + 1)
+        for o in self.owner:
+            land[o] += 1
+        alive = sorted((p for p in range(1, self.num_players + 1) if p not in self.leaderboard),
+                       key=lambda p: -land[p])
+        return alive + self.leaderboard
+
+
+# ==================== MATCHES ====================
+
+class EngineActionBuilder:
+    """
+    Same interface as the receivers' ActionBuilder, but send() hands the
+    batch to an Engine (atomically, like the server) instead of a socket.
+    """
+
+    def __init__(self, engine: Engine, player: int):
+        self.engine = engine
+        self.player = player
+        self.buffer: List[tuple] = []
+        self.num = 0
+        self.approved = None  # Result of the last send()
+        self.still_awaiting = True
+        self.sent = 0
+        self.rejected = 0
+
+    def add_place(self, resident: int, x_from: int, y_from: int, x_to: int, y_to: int):
+        self._add((ACTION_PLACE, int(resident), x_from, y_from, x_to, y_to))
+
+    def add_move(self, x_from: int, y_from: int, x_to: int, y_to: int):
+        self._add((ACTION_MOVE, x_from, y_from, x_to, y_to))
+
+    def add_build(self, resident: int, x: int, y: int):
+        """Not a game action: a batch containing it is rejected, as by the server."""
+        self._add((ACTION_BUILD, int(resident), x, y))
+
+    def add_end_turn(self):
+        self._add((ACTION_END_TURN,))
+        self.send()
+
+    def _add(self, action: tuple):
+        self.buffer.append(action)
+        self.num += 1
+        if self.num == 255:  # Action count is one byte on the wire
+            self.send()
+
+    def send(self):
+        if not self.buffer:
+            return
+        approved, ended = self.engine.apply_actions(self.buffer, self.player)
+        self.approved = approved
+        self.still_awaiting = approved and not ended and not self.engine.is_game_over()
+        self.sent += 1
+        if not approved:
+            self.rejected += 1
+        self.buffer.clear()
+        self.num = 0
+
+
+class MatchResult:
+    def __init__(self, ranking: List[int], rounds: int, turns: int, finished: bool, rejected: int):
+        self.ranking = ranking
+        self.rounds = rounds
+        self.turns = turns
+        self.finished = finished  # False if stopped by the round limit
+        self.rejected = rejected
+
+    @property
+    def winner(self) -> int:
+        return self.ranking[0]
+
+    def __repr__(self):
+        return (f"MatchResult(ranking={self.ranking}, rounds={self.rounds}, turns={self.turns}, "
+                f"finished={self.finished}, rejected={self.rejected})")
+
+
+def play_turn(engine: Engine, bot: Callable, board_factory: Callable[[Engine], object]):
+    """
+    One turn of the player to move, following the receiver protocol: the bot
+    gets a fresh board, its actions are sent as one batch, and the turn is
+    ended afterwards (also when the batch was rejected). Returns (board, builder).
+    """
+    player = engine.current_player
+    board = board_factory(engine)
+    builder = EngineActionBuilder(engine, player)
+    bot(player, board, builder)
+    builder.send()
+    if not engine.is_game_over() and engine.current_player == player:
+        engine.next_turn()
+    return board, builder
+
+
+def play_match(engine: Engine, bots: Dict[int, Callable], board_factory: Callable[[Engine], object],
+               max_rounds: int = 200, on_turn: Optional[Callable] = None) -> MatchResult:
+    """
+    Play until the game ends or max_rounds is reached.
+
+    bots maps player id to turn(player_id, board, builder); players without a
+    bot just end their turn. Turns are played with play_turn().
+    on_turn(player_id, board, builder) runs after every bot turn.
+    """
+    rejected = 0
+    while not engine.is_game_over() and engine.round <= max_rounds:
+        player = engine.current_player
+        bot = bots.get(player)
+        if bot is None:
+            engine.next_turn()
+            continue
+        board, builder = play_turn(engine, bot, board_factory)
+        rejected += builder.rejected
+        if on_turn:
+            on_turn(player, board, builder)
+    return MatchResult(engine.ranking(), engine.round, engine.turn, engine.is_game_over(), rejected)
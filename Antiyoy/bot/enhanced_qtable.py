@@ -13,7 +13,7 @@ Features:
 import random
 import json
 import math
-from typing import List, Tuple, Dict, Optional
+from typing import Dict, Hashable, List, Optional, Tuple
 from collections import deque, defaultdict
 
 
@@ -83,12 +83,8 @@ class PrioritizedReplayBuffer:
         
         batch_size = min(batch_size, len(self.buffer))
         
-        # Normalize priorities
-        total = sum(self.priorities)
-        probs = [p / total for p in self.priorities]
-        
-        # Sample indices
-        indices = random.choices(range(len(self.buffer)), weights=probs, k=batch_size)
+        # Sample indices (choices normalizes the priorities itself)
+        indices = random.choices(range(len(self.buffer)), weights=self.priorities, k=batch_size)
         
         return [self.buffer[i] for i in indices]
     
@@ -114,6 +110,8 @@ class EnhancedQTable:
     - Eligibility traces (optional)
     """
     
+    KEY_CACHE_SIZE = 200000
+    
     def __init__(self, num_actions: int = 5, 
                  learning_rate: float = 0.1,
                  discount: float = 0.99,
@@ -127,7 +125,7 @@ class EnhancedQTable:
         self.gamma = discount
         self.epsilon = epsilon
         self.epsilon_min = 0.01
-        self.epsilon_decay = 0.9995
+        self.epsilon_decay = 0.995  # Per decay_epsilon() call
         self.n_step = n_step
         self.use_double = use_double
         self.use_tiles = use_tiles
@@ -139,8 +137,8 @@ class EnhancedQTable:
         # Tile coding for state abstraction
         self.tile_coder = TileCoding() if use_tiles else None
         
-        # N-step buffer
-        self.n_step_buffer = deque(maxlen=n_step)
+        # N-step windows, one per trajectory (game and player) updates come from
+        self.n_step_buffers: Dict[Hashable, deque] = {}
         
         # Prioritized replay
         self.replay_buffer = PrioritizedReplayBuffer()
@@ -156,17 +154,29 @@ class EnhancedQTable:
         
         # Adaptive learning rate
         self.base_lr = learning_rate
+        
+        # state_to_key memo (tiles depend only on the state and the offsets)
+        self._key_cache = {}
     
     def state_to_key(self, state: List[float]) -> str:
         """Convert state to hashable key with tile coding or discretization."""
+        # Replay and n-step updates look the same states up many times
+        cache_key = tuple(state)
+        key = self._key_cache.get(cache_key)
+        if key is not None:
+            return key
         if self.use_tiles and self.tile_coder:
             tiles = self.tile_coder.get_tiles(state)
-            return str(tiles)
+            key = str(tiles)
         else:
             # Simple discretization (5 bins per feature)
             bins = 5
             discrete = tuple(min(int(s * bins), bins - 1) for s in state)
-            return str(discrete)
+            key = str(discrete)
+        if len(self._key_cache) >= self.KEY_CACHE_SIZE:
+            self._key_cache.clear()
+        self._key_cache[cache_key] = key
+        return key
     
     def get_q_values(self, state: List[float], use_b: bool = False) -> List[float]:
         """Get Q-values for state."""
@@ -210,40 +220,43 @@ class EnhancedQTable:
         return random.choice(best_actions)
     
     def update_n_step(self, state: List[float], action: int, reward: float,
-                      next_state: List[float], done: bool):
+                      next_state: List[float], done: bool, trajectory: Hashable = None):
         """
         N-step TD update for better credit assignment.
+
+        Rewards are only summed within one trajectory: interleaved updates
+        from several games or players must each name theirs.
         """
-        # Add to n-step buffer
-        self.n_step_buffer.append((state, action, reward, next_state, done))
+        buffer = self.n_step_buffers.get(trajectory)
+        if buffer is None:
+            buffer = self.n_step_buffers[trajectory] = deque(maxlen=self.n_step)
+        buffer.append((state, action, reward, next_state, done))
         
         # Only update when buffer is full or episode ends
-        if len(self.n_step_buffer) < self.n_step and not done:
+        if len(buffer) < self.n_step and not done:
             return
         
-        # Calculate n-step return
+        if not done:
+            self._update_window(buffer, bootstrap=buffer[-1][3])
+            return
+        
+        # Episode over: every state still in the window gets its (shorter) return
+        while buffer:
+            self._update_window(buffer, bootstrap=None)
+            buffer.popleft()
+        del self.n_step_buffers[trajectory]
+    
+    def _update_window(self, buffer: deque, bootstrap: Optional[List[float]]):
+        """Update the first state of buffer with the discounted rewards after it (plus bootstrap's value)."""
         n_step_return = 0.0
         n_step_gamma = 1.0
-        
-        for _, _, r, _, d in self.n_step_buffer:
+        for _, _, r, _, _ in buffer:
             n_step_return += n_step_gamma * r
             n_step_gamma *= self.gamma
-            if d:
-                break
-        
-        # Add bootstrap value if not terminal
-        if not done:
-            _, _, _, last_state, _ = self.n_step_buffer[-1]
-            next_q_values = self.get_combined_q_values(last_state)
-            n_step_return += n_step_gamma * max(next_q_values)
-        
-        # Update first state in buffer
-        first_state, first_action, _, _, _ = self.n_step_buffer[0]
+        if bootstrap is not None:
+            n_step_return += n_step_gamma * max(self.get_combined_q_values(bootstrap))
+        first_state, first_action, _, _, _ = buffer[0]
         self._update_q_value(first_state, first_action, n_step_return)
-        
-        # If done, flush buffer
-        if done:
-            self.n_step_buffer.clear()
     
     def _update_q_value(self, state: List[float], action: int, target: float):
         """Update Q-value with adaptive learning rate."""
@@ -265,20 +278,24 @@ class EnhancedQTable:
             self.q_table_a[key][action] += adaptive_lr * (target - current_q)
         
         self.updates += 1
-        
-        # Decay epsilon
-        if self.updates % 10 == 0:
-            self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
+    
+    def decay_epsilon(self):
+        """
+        One epsilon decay step: callers make one per finished game (the
+        self-play pool one per second of training). Per update it followed
+        the learner's throughput, and the pool hit epsilon_min in a minute.
+        """
+        self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
     
     def update(self, state: List[float], action: int, reward: float,
-               next_state: List[float], done: bool):
-        """Main update function (uses n-step by default)."""
+               next_state: List[float], done: bool, trajectory: Hashable = None):
+        """Main update function (uses n-step by default); trajectory keys the n-step window."""
         # Store in replay buffer
         td_error = abs(reward)  # Simplified priority
         self.replay_buffer.add((state, action, reward, next_state, done), td_error)
         
         # N-step update
-        self.update_n_step(state, action, reward, next_state, done)
+        self.update_n_step(state, action, reward, next_state, done, trajectory)
         
         # Batch update from replay buffer
         if len(self.replay_buffer) >= 32:
@@ -312,14 +329,15 @@ class EnhancedQTable:
             'total_moves': self.random_moves + self.qtable_moves + self.new_state_moves
         }
     
-    def save(self, filepath: str):
-        """Save Q-tables to JSON."""
-        data = {
+    def to_dict(self) -> Dict:
+        """Q-tables and settings as plain data (what save() writes)."""
+        return {
             'q_table_a': {k: list(v) for k, v in self.q_table_a.items()},
             'q_table_b': {k: list(v) for k, v in self.q_table_b.items()} if self.use_double else {},
             'epsilon': self.epsilon,
             'updates': self.updates,
             'state_visits': dict(self.state_visits),
+            'tile_offsets': self.tile_coder.offsets if self.tile_coder else None,
             'config': {
                 'num_actions': self.num_actions,
                 'use_double': self.use_double,
@@ -327,9 +345,45 @@ class EnhancedQTable:
                 'n_step': self.n_step,
             }
         }
+    
+    def load_dict(self, data: Dict) -> bool:
+        """Load to_dict() data (or the old simple format). Returns False if the format is unknown."""
+        # Check if it's the old simple format or new enhanced format
+        if 'q_table_a' in data:
+            # New enhanced format
+            for k, v in data['q_table_a'].items():
+                self.q_table_a[k] = v
+            
+            if self.use_double and 'q_table_b' in data:
+                for k, v in data['q_table_b'].items():
+                    self.q_table_b[k] = v
+        elif 'q_table' in data:
+            # Old simple format - migrate to enhanced
+            print(f"[Enhanced Q-Table] Migrating from simple Q-table format...")
+            for k, v in data['q_table'].items():
+                self.q_table_a[k] = v
+                if self.use_double:
+                    self.q_table_b[k] = v  # Copy to both tables
+        else:
+            return False
+        
+        # Tile keys only mean something with the offsets they were made with
+        if self.tile_coder and data.get('tile_offsets'):
+            self.tile_coder.offsets = [list(o) for o in data['tile_offsets']]
+            self._key_cache.clear()
         
+        # Load metadata
+        self.epsilon = data.get('epsilon', self.epsilon)
+        self.updates = data.get('updates', 0)
+        
+        if 'state_visits' in data:
+            self.state_visits = defaultdict(int, data['state_visits'])
+        return True
+    
+    def save(self, filepath: str):
+        """Save Q-tables to JSON."""
         with open(filepath, 'w') as f:
-            json.dump(data, f)
+            json.dump(self.to_dict(), f)
         
         print(f"[Enhanced Q-Table] Saved {len(self.q_table_a)} states to {filepath}")
     
@@ -339,33 +393,10 @@ class EnhancedQTable:
             with open(filepath, 'r') as f:
                 data = json.load(f)
             
-            # Check if it's the old simple format or new enhanced format
-            if 'q_table_a' in data:
-                # New enhanced format
-                for k, v in data['q_table_a'].items():
-                    self.q_table_a[k] = v
-                
-                if self.use_double and 'q_table_b' in data:
-                    for k, v in data['q_table_b'].items():
-                        self.q_table_b[k] = v
-            elif 'q_table' in data:
-                # Old simple format - migrate to enhanced
-                print(f"[Enhanced Q-Table] Migrating from simple Q-table format...")
-                for k, v in data['q_table'].items():
-                    self.q_table_a[k] = v
-                    if self.use_double:
-                        self.q_table_b[k] = v  # Copy to both tables
-            else:
+            if not self.load_dict(data):
                 print(f"[Enhanced Q-Table] Unknown format, starting fresh")
                 return
             
-            # Load metadata
-            self.epsilon = data.get('epsilon', self.epsilon)
-            self.updates = data.get('updates', 0)
-            
-            if 'state_visits' in data:
-                self.state_visits = defaultdict(int, data['state_visits'])
-            
             print(f"[Enhanced Q-Table] Loaded {len(self.q_table_a)} states from {filepath}")
             
         except FileNotFoundError:
@@ -0,0 +1,74 @@
+"""
+Farm sites of one province, kept up to date while farms are bought.
+
+A farm goes on an empty hex next to the province's castle or one of its
+farms (Hexagon::possiblePlacements for FARM), and the RL bot keeps farms
+off the perimeter. AiRL.action_farm used to rescan the whole province for
+a site before every farm and re-check the perimeter of each pick.
+
+FarmSites indexes the province once: every eligible site in a heap scored
+by the castle / farm hexes around it (sites deeper in a farm cluster
+first, random among equals like findGoodHexForFarm). place() updates only
+the hexes around the new farm (a neighbour may become a site or score
+higher); stale heap entries are skipped when they surface. The farm count
+for the price stays with the receiver's Province (add_farm).
+
+    sites = FarmSites(board.get_grid(), province_hexes, board.get_perimeter_mask(player))
+    i = sites.pop()           # best site, or None
+    sites.place(i)            # a farm was bought on it
+"""
+
+import heapq
+import random
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .engine import CASTLE, EMPTY, FARM
+from .propagation import PropagationGrid
+
+
+class FarmSites:
+    """Priority queue of the hexes a province can put a farm on."""
+
+    def __init__(self, grid: PropagationGrid, province: Iterable[int], perimeter: Sequence[bool],
+                 rng: Optional[random.Random] = None):
+        self.neighbors = grid.neighbors
+        self.resident = grid.resident
+        self.perimeter = perimeter
+        self.rng = rng or random
+        self.members = set(province)
+        self.anchors = {i for i in self.members if self.resident[i] == CASTLE or self.resident[i] == FARM}
+        self.score: Dict[int, int] = {}  # site -> castle / farm hexes around it (0 = not a site)
+        self.taken = set()  # Sites handed out by pop(), never offered again
+        self._heap: List[Tuple[int, float, int]] = []
+        candidates = {n for i in self.anchors for n in self.neighbors[i]}
+        for i in candidates:
+            self._rescore(i)
+
+    def _rescore(self, i: int):
+        if (i not in self.members or i in self.anchors or i in self.taken
+                or self.resident[i] != EMPTY or self.perimeter[i]):
+            return
+        score = sum(1 for n in self.neighbors[i] if n in self.anchors)
+        if score != self.score.get(i, 0):
+            self.score[i] = score
+            heapq.heappush(self._heap, (-score, self.rng.random(), i))
+
+    def pop(self) -> Optional[int]:
+        """Best remaining site, taken out of the queue; None when there is none."""
+        heap = self._heap
+        while heap:
+            neg, _, i = heapq.heappop(heap)
+            if self.score.get(i) == -neg:
+                del self.score[i]
+                self.taken.add(i)
+                return i
+        return None
+
+    def place(self, i: int):
+        """A farm was bought on i: it anchors its neighbours."""
+        self.score.pop(i, None)
+        if i in self.anchors:
+            return
+        self.anchors.add(i)
+        for n in self.neighbors[i]:
+            self._rescore(n)
@@ -3,6 +3,7 @@ Game utilities for hexagon math and board operations.
 """
 
 from enum import IntEnum
+from functools import lru_cache
 from typing import List, Optional, Tuple, Set
 
 
@@ -183,6 +184,19 @@ class GameUtils:
         
         return neighbors
     
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_neighbor_table(width: int, height: int) -> Tuple[Tuple[int, ...], ...]:
+        """
+        Neighbors of every hex as flat indices (y * width + x).
+        Built once per board size, so hot loops can skip coordinate math.
+        """
+        table = []
+        for y in range(height):
+            for x in range(width):
+                table.append(tuple(ny * width + nx for nx, ny in GameUtils.get_hex_neighbors(x, y, width, height)))
+        return tuple(table)
+    
     @staticmethod
     def get_defense_level(hex_obj, board) -> int:
         """
@@ -0,0 +1,195 @@
+"""
+Hex geometry for the board layout used by board.cpp.
+
+The board is "odd-q": columns are vertical, odd columns are shifted down
+half a hex (see evenDirections/oddDirections). Offset (x, y) coordinates
+are converted to cube (q, r, s) coordinates, where q + r + s == 0 and the
+hex distance is max(|dq|, |dr|, |ds|).
+
+HexGrid holds per-board-size lookup tables (cube coordinates, neighbors,
+disks, rings), so hot code does array lookups instead of BFS.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from .game_utils import GameUtils
+
+MOVE_LIMIT = 4  # Units move at most 4 hexes (Hexagon::possibleMovements)
+
+Cube = Tuple[int, int, int]
+
+# Cube directions in the same order as board.cpp (top, left-top, left-bottom, bottom, right-bottom, right-top)
+CUBE_DIRECTIONS: Tuple[Cube, ...] = (
+    (0, -1, 1),
+    (-1, 0, 1),
+    (-1, 1, 0),
+    (0, 1, -1),
+    (1, 0, -1),
+    (1, -1, 0),
+)
+
+
+def offset_to_cube(x: int, y: int) -> Cube:
+    """Offset (column x, row y) to cube coordinates."""
+    q = x
+    r = y - (x - (x & 1)) // 2
+    return q, r, -q - r
+
+
+def cube_to_offset(q: int, r: int, s: int = None) -> Tuple[int, int]:
+    """Cube coordinates back to offset (x, y)."""
+    return q, r + (q - (q & 1)) // 2
+
+
+def cube_distance(a: Cube, b: Cube) -> int:
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]), abs(a[2] - b[2]))
+
+
+def hex_distance(x1: int, y1: int, x2: int, y2: int) -> int:
+    """Exact number of hex steps between two offset coordinates."""
+    return cube_distance(offset_to_cube(x1, y1), offset_to_cube(x2, y2))
+
+
+def cube_round(fq: float, fr: float, fs: float) -> Cube:
+    """Round fractional cube coordinates to the hex that contains them."""
+    q, r, s = round(fq), round(fr), round(fs)
+    dq, dr, ds = abs(q - fq), abs(r - fr), abs(s - fs)
+    if dq > dr and dq > ds:
+        q = -r - s
+    elif dr > ds:
+        r = -q - s
+    else:
+        s = -q - r
+    return q, r, s
+
+
+def cube_line(a: Cube, b: Cube) -> List[Cube]:
+    """Hexes on the straight line from a to b, both ends included."""
+    n = cube_distance(a, b)
+    if n == 0:
+        return [a]
+    # Tiny nudge so lines running exactly along hex edges round consistently
+    aq, ar, as_ = a[0] + 1e-6, a[1] + 1e-6, a[2] - 2e-6
+    bq, br, bs = b[0] + 1e-6, b[1] + 1e-6, b[2] - 2e-6
+    result = []
+    for i in range(n + 1):
+        t = i / n
+        result.append(cube_round(aq + (bq - aq) * t, ar + (br - ar) * t, as_ + (bs - as_) * t))
+    return result
+
+
+def cube_ring(center: Cube, radius: int) -> List[Cube]:
+    """Hexes at exactly `radius` steps from center (unbounded board)."""
+    if radius == 0:
+        return [center]
+    # Start at the hex `radius` steps in direction 4 and walk the six sides
+    q = center[0] + CUBE_DIRECTIONS[4][0] * radius
+    r = center[1] + CUBE_DIRECTIONS[4][1] * radius
+    result = []
+    for side in range(6):
+        dq, dr, _ = CUBE_DIRECTIONS[side]
+        for _ in range(radius):
+            result.append((q, r, -q - r))
+            q += dq
+            r += dr
+    return result
+
+
+def cube_disk(center: Cube, radius: int) -> List[Cube]:
+    """Hexes within `radius` steps of center, nearest rings first."""
+    result = []
+    for k in range(radius + 1):
+        result.extend(cube_ring(center, k))
+    return result
+
+
+class HexGrid:
+    """
+    Lookup tables for one board size. Get instances through get_grid() so
+    every board of the same size shares them.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.q: List[int] = []
+        self.r: List[int] = []
+        for y in range(height):
+            for x in range(width):
+                q, r, _ = offset_to_cube(x, y)
+                self.q.append(q)
+                self.r.append(r)
+        self.neighbors = GameUtils.get_neighbor_table(width, height)
+        self._disks: Dict[int, Tuple[Tuple[int, ...], ...]] = {}
+        self._rings: Dict[int, Tuple[Tuple[int, ...], ...]] = {}
+
+    # ==================== COORDINATES ====================
+
+    def index(self, x: int, y: int) -> int:
+        return y * self.width + x
+
+    def coords(self, i: int) -> Tuple[int, int]:
+        return i % self.width, i // self.width
+
+    def contains(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def cube(self, i: int) -> Cube:
+        q, r = self.q[i], self.r[i]
+        return q, r, -q - r
+
+    def _cubes_to_indices(self, cubes: List[Cube]) -> Tuple[int, ...]:
+        result = []
+        for q, r, s in cubes:
+            x, y = cube_to_offset(q, r, s)
+            if 0 <= x < self.width and 0 <= y < self.height:
+                result.append(y * self.width + x)
+        return tuple(result)
+
+    # ==================== DISTANCES ====================
+
+    def distance(self, i: int, j: int) -> int:
+        """Hex distance between two flat indices."""
+        dq = self.q[i] - self.q[j]
+        dr = self.r[i] - self.r[j]
+        ds = dq + dr  # s = -q - r, so ds = -(dq + dr)
+        if dq < 0:
+            dq = -dq
+        if dr < 0:
+            dr = -dr
+        if ds < 0:
+            ds = -ds
+        return max(dq, dr, ds)
+
+    def hex_distance(self, a, b) -> int:
+        """Distance between two hex objects (anything with x and y)."""
+        return self.distance(a.y * self.width + a.x, b.y * self.width + b.x)
+
+    # ==================== AREAS ====================
+
+    def disk(self, i: int, radius: int = MOVE_LIMIT) -> Tuple[int, ...]:
+        """Indices within `radius` steps of i (clipped to the board), nearest first."""
+        table = self._disks.get(radius)
+        if table is None:
+            table = tuple(self._cubes_to_indices(cube_disk(self.cube(k), radius)) for k in range(self.size))
+            self._disks[radius] = table
+        return table[i]
+
+    def ring(self, i: int, radius: int) -> Tuple[int, ...]:
+        """Indices exactly `radius` steps from i (clipped to the board)."""
+        table = self._rings.get(radius)
+        if table is None:
+            table = tuple(self._cubes_to_indices(cube_ring(self.cube(k), radius)) for k in range(self.size))
+            self._rings[radius] = table
+        return table[i]
+
+    def line(self, i: int, j: int) -> Tuple[int, ...]:
+        """Indices on the straight line from i to j (clipped to the board)."""
+        return self._cubes_to_indices(cube_line(self.cube(i), self.cube(j)))
+
+
+@lru_cache(maxsize=None)
+def get_grid(width: int, height: int) -> HexGrid:
+    """Shared HexGrid for a board size."""
+    return HexGrid(width, height)
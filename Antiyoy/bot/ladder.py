@@ -0,0 +1,833 @@
+"""
+The Java AI difficulty ladder (ai/*.java), ported onto the rules engine.
+
+The game's own bots are AiEasy, AiNormalGenericRules, AiHardGenericRules,
+AiExpertGenericRules and AiBalancerGenericRules, picked per player by
+AiFactory from a Difficulty. The classes here follow them method by
+method, but decide on an Engine (flat owner / resident arrays, see
+engine.py) instead of the game's Hex objects: every decision is played on
+the engine at once, the way GameController runs it for the Java bots, and
+recorded as a PLACE / MOVE action tuple for the server.
+
+    ai = make_ladder_ai(HARD, player)        # or make_ladder_ai('hard', player)
+    actions = ai.plan(Engine.from_board(board, current_player=player))
+    for action in actions:
+        add_to_builder(action_builder, action)
+
+Where the game differs from the Java one:
+- towers, strong towers and farms are bought with PLACE from the castle
+  (the game has no BUILD action);
+- a province is known by its castle; castle-less land is nobody's province;
+- Expert's mass march of an idle unit is one step along our own land
+  towards the chosen perimeter hex;
+- a power-1 attack on enemy land whose castle the engine had to guess
+  after a split is not made (the server may have put the castle right
+  there and refuse the whole batch, see KnownCastles);
+- MASTER (ai/master) is not ported, make_ladder_ai gives the Expert for it.
+"""
+
+import random
+from typing import Dict, List, Optional, Union
+
+from .beam_search import KnownCastles
+from .engine import (ACTION_MOVE, ACTION_PLACE, CASTLE, EMPTY, FARM, HEX_INCOME, PALM, POWER, STRONG_TOWER,
+                     TOWER, WARRIOR1, WATER, Engine, is_tree, is_unmoved, is_warrior)
+
+# ai/Difficulty.java
+EASY, NORMAL, HARD, EXPERT, BALANCER, MASTER = range(6)
+DIFFICULTY_NAMES = ('easy', 'normal', 'hard', 'expert', 'balancer', 'master')
+
+PRICE_UNIT = 10
+PRICE_TOWER = 15
+PRICE_STRONG_TOWER = 35
+TAX_STRONG_TOWER = HEX_INCOME[EMPTY] - HEX_INCOME[STRONG_TOWER]
+MAX_EXTRA_FARM_COST = 80  # ArtificialIntelligenceGeneric
+TURNS_TO_SURVIVE = 5  # Province.canAiAffordUnit: turns the money must last with the new tax
+AFK_PROVINCE_SIZE = 20  # Idle units of bigger provinces get moved (moveAfkUnits)
+
+
+def warrior(strength: int) -> int:
+    return WARRIOR1 - 1 + strength
+
+
+def unit_tax(strength: int) -> int:
+    """Income lost by putting a warrior of strength on an empty hex."""
+    return HEX_INCOME[EMPTY] - HEX_INCOME[warrior(strength)]
+
+
+class LadderAi:
+    """ArtificialIntelligence.java: unit moves, spending and merges shared by the ladder."""
+
+    difficulty = EASY
+
+    def __init__(self, player: int, seed: Optional[int] = None):
+        self.player = player
+        self.random = random.Random(seed)
+        self.engine: Optional[Engine] = None
+        self.known: Optional[KnownCastles] = None
+        self.actions: List[tuple] = []
+        self.units_built = 0
+
+    def plan(self, engine: Engine) -> List[tuple]:
+        """The turn's actions; engine ends up with all of them applied."""
+        self.engine = engine
+        self.known = KnownCastles(engine, self.player)
+        self.actions = []
+        self.units_built = 0
+        self.make_move()
+        return self.actions
+
+    def make_move(self):
+        self.move_units()
+        self.spend_money_and_merge_units()
+
+    # ==================== ACTIONS ====================
+
+    def move_unit(self, src: int, dst: int) -> bool:
+        engine = self.engine
+        if not self.known.certain(engine, dst, POWER[engine.resident[src]]) or not engine.move(src, dst):
+            return False
+        self.known.invalidate()
+        width = engine.width
+        self.actions.append((ACTION_MOVE, src % width, src // width, dst % width, dst // width))
+        return True
+
+    def buy(self, castle: int, resident: int, dst: int) -> bool:
+        engine = self.engine
+        if not self.known.certain(engine, dst, POWER[resident]) or not engine.place(castle, resident, dst):
+            return False
+        self.known.invalidate()
+        width = engine.width
+        self.actions.append((ACTION_PLACE, resident, castle % width, castle // width, dst % width, dst // width))
+        return True
+
+    def build_unit(self, castle: int, hex: int, strength: int) -> bool:
+        if not self.is_allowed_to_build_new_unit(castle):
+            return False
+        if not self.buy(castle, warrior(strength), hex):
+            return False
+        self.units_built += 1
+        return True
+
+    # ==================== PROVINCES ====================
+
+    def provinces(self) -> List[int]:
+        """Castles of our provinces, the way fieldManager.provinces lists them."""
+        return sorted(self.engine.castles[self.player])
+
+    def is_alive(self, castle: int) -> bool:
+        """Still a castle of ours (a capture that joins provinces keeps only one)."""
+        engine = self.engine
+        return engine.owner[castle] == self.player and engine.resident[castle] == CASTLE
+
+    def money(self, castle: int) -> int:
+        return self.engine.castles[self.player].get(castle, 0)
+
+    def profit(self, castle: int) -> int:
+        return self.engine.province_income(self.engine.province(castle))
+
+    def can_build_unit(self, castle: int, strength: int) -> bool:
+        """Province.canBuildUnit and isAllowedToBuildNewUnit"""
+        return self.money(castle) >= PRICE_UNIT * strength and self.is_allowed_to_build_new_unit(castle)
+
+    def can_ai_afford_unit(self, castle: int, strength: int, turns_to_survive: int = TURNS_TO_SURVIVE) -> bool:
+        """Province.canAiAffordUnit: the new tax keeps the province out of debt for a few turns."""
+        new_profit = self.profit(castle) - unit_tax(strength)
+        if new_profit >= 0:
+            return True
+        return self.money(castle) + turns_to_survive * new_profit >= 0
+
+    def is_allowed_to_build_new_unit(self, castle: int) -> bool:
+        return True  # Only diplomacy limits units per turn, and the game has none
+
+    def units_in_province(self, castle: int) -> int:
+        resident = self.engine.resident
+        return sum(1 for h in self.engine.province(castle) if is_warrior(resident[h]))
+
+    def army_strength(self, castle: int) -> int:
+        resident = self.engine.resident
+        return sum(POWER[resident[h]] for h in self.engine.province(castle) if is_warrior(resident[h]))
+
+    # ==================== HEXES ====================
+
+    def is_free(self, h: int) -> bool:
+        return self.engine.resident[h] == EMPTY
+
+    def is_own(self, h: int) -> bool:
+        return self.engine.owner[h] == self.player
+
+    def is_in_perimeter(self, h: int) -> bool:
+        """Next to land of anyone else, neutral included."""
+        engine = self.engine
+        owner = engine.owner[h]
+        for n in engine.neighbors[h]:
+            if engine.resident[n] != WATER and engine.owner[n] != owner:
+                return True
+        return False
+
+    def enemy_hexes_near(self, h: int) -> int:
+        engine = self.engine
+        owner = engine.owner[h]
+        return sum(1 for n in engine.neighbors[h]
+                   if engine.resident[n] != WATER and engine.owner[n] != owner and engine.owner[n] != 0)
+
+    def is_defended_by_tower(self, h: int) -> bool:
+        engine = self.engine
+        owner = engine.owner[h]
+        for n in engine.neighbors[h]:
+            if engine.owner[n] == owner and engine.resident[n] in (TOWER, STRONG_TOWER):
+                return True
+        return False
+
+    def defense_number(self, h: int, excluded: int = -1) -> int:
+        """Hex.getDefenseNumber: strongest defender on h or our neighbours, ignoring the unit on excluded."""
+        engine = self.engine
+        owner = engine.owner[h]
+        resident = engine.resident
+        defense = POWER[resident[h]] if h != excluded else 0
+        for n in engine.neighbors[h]:
+            if n != excluded and engine.owner[n] == owner:
+                defense = max(defense, POWER[resident[n]])
+        return max(defense, 0)
+
+    def nearby_provinces(self, hexes: List[int], wide: bool = False) -> List[int]:
+        """
+        updateNearbyProvinces: castles of the enemy provinces touching hexes;
+        wide also looks two steps out along each direction and the next one.
+        """
+        engine = self.engine
+        directions = engine.directions
+        found: List[int] = []
+
+        def check(src: int, h: int):
+            if h < 0 or engine.resident[h] == WATER:
+                return
+            owner = engine.owner[h]
+            if owner == 0 or owner == engine.owner[src]:
+                return
+            castle = engine.province_castle(h)
+            if castle >= 0 and castle not in found:
+                found.append(castle)
+
+        for src in hexes:
+            around = directions[src]
+            for k in range(6):
+                h = around[k]
+                check(src, h)
+                if wide and h >= 0 and engine.resident[h] != WATER:
+                    check(src, directions[h][k])
+                    check(src, directions[h][(k + 1) % 6])
+        return found
+
+    # ==================== MOVE ZONES ====================
+
+    def move_zone(self, unit: int) -> List[int]:
+        """detectMoveZone without our own units and buildings."""
+        engine = self.engine
+        resident = engine.resident
+        return [h for h in engine.possible_movements(unit)
+                if not (engine.owner[h] == self.player and is_warrior(resident[h]))]
+
+    def find_attackable_hexes(self, zone: List[int]) -> List[int]:
+        owner = self.engine.owner
+        return [h for h in zone if owner[h] != self.player]
+
+    def get_attack_allure(self, h: int) -> int:
+        owner = self.engine.owner
+        return sum(1 for n in self.engine.neighbors[h] if owner[n] == self.player)
+
+    def find_hex_attractive_to_baron(self, hexes: List[int], strength: int) -> int:
+        resident = self.engine.resident
+        for h in hexes:
+            if resident[h] == TOWER:
+                return h
+            if strength == 4 and resident[h] == STRONG_TOWER:
+                return h
+        for h in hexes:
+            if self.is_defended_by_tower(h):
+                return h
+        return -1
+
+    def find_most_attractive_hex(self, hexes: List[int], strength: int) -> int:
+        if strength == 3 or strength == 4:
+            h = self.find_hex_attractive_to_baron(hexes, strength)
+            if h >= 0:
+                return h
+        result = -1
+        best = -1
+        for h in hexes:
+            allure = self.get_attack_allure(h)
+            if allure > best:
+                best = allure
+                result = h
+        return result
+
+    # ==================== UNITS ====================
+
+    def units_ready_to_move(self) -> List[int]:
+        engine = self.engine
+        units = []
+        for castle in self.provinces():
+            for h in reversed(engine.province(castle)):
+                if is_unmoved(engine.resident[h]):
+                    units.append(h)
+        return units
+
+    def move_units(self):
+        engine = self.engine
+        for unit in self.units_ready_to_move():
+            if not is_unmoved(engine.resident[unit]):
+                continue
+            zone = self.move_zone(unit)
+            if not zone:
+                continue
+            castle = engine.province_castle(unit)
+            if castle < 0:
+                continue
+            self.decide_about_unit(unit, zone, castle)
+
+    def decide_about_unit(self, unit: int, zone: List[int], castle: int):
+        strength = POWER[self.engine.resident[unit]]
+        # Cleaning palms has highest priority
+        if strength <= 2 and self.check_to_clean_some_palms(unit, zone):
+            return
+        attackable = self.find_attackable_hexes(zone)
+        if attackable:
+            self.move_unit(unit, self.find_most_attractive_hex(attackable, strength))
+        elif not self.check_to_clean_some_trees(unit, zone) and self.is_in_perimeter(unit):
+            self.push_unit_to_better_defense(unit)
+
+    def check_to_clean_some_trees(self, unit: int, zone: List[int]) -> bool:
+        resident = self.engine.resident
+        for h in zone:
+            if is_tree(resident[h]) and self.is_own(h):
+                return self.move_unit(unit, h)
+        return False
+
+    def check_to_clean_some_palms(self, unit: int, zone: List[int]) -> bool:
+        resident = self.engine.resident
+        for h in zone:
+            if resident[h] == PALM and self.is_own(h):
+                return self.move_unit(unit, h)
+        return False
+
+    def push_unit_to_better_defense(self, unit: int):
+        for h in self.engine.neighbors[unit]:
+            if self.is_own(h) and self.is_free(h) and self.enemy_hexes_near(h) == 0:
+                self.move_unit(unit, h)
+                break
+
+    def move_afk_units(self):
+        engine = self.engine
+        for unit in self.units_ready_to_move():
+            if not is_unmoved(engine.resident[unit]):
+                continue
+            castle = engine.province_castle(unit)
+            if castle >= 0 and len(engine.province(castle)) > AFK_PROVINCE_SIZE:
+                self.move_afk_unit(castle, unit)
+
+    def move_afk_unit(self, castle: int, unit: int):
+        zone = [h for h in self.move_zone(unit) if POWER[self.engine.resident[h]] < 0]
+        if zone:
+            self.move_unit(unit, zone[self.random.randrange(len(zone))])
+
+    # ==================== MERGES ====================
+
+    def merge_units(self, castle: int):
+        engine = self.engine
+        for h in engine.province(castle):
+            if is_unmoved(engine.resident[h]):
+                self.try_to_merge_with_someone(castle, h)
+
+    def try_to_merge_with_someone(self, castle: int, unit: int):
+        for h in self.engine.possible_movements(unit):
+            if self.merge_conditions(castle, unit, h):
+                self.move_unit(unit, h)
+                break
+
+    def merge_conditions(self, castle: int, unit: int, h: int) -> bool:
+        resident = self.engine.resident
+        if not self.is_own(h) or h == unit or not is_unmoved(resident[h]):
+            return False
+        merged = POWER[resident[unit]] + POWER[resident[h]]
+        return merged <= 4 and self.can_ai_afford_unit(castle, merged)
+
+    # ==================== SPENDING ====================
+
+    def spend_money_and_merge_units(self):
+        for castle in self.provinces():
+            if not self.is_alive(castle):
+                continue
+            self.spend_money(castle)
+            if self.is_alive(castle):
+                self.merge_units(castle)
+
+    def spend_money(self, castle: int):
+        self.try_to_build_towers(castle)
+        self.try_to_build_units(castle)
+
+    def try_to_build_towers(self, castle: int):
+        while self.money(castle) >= PRICE_TOWER:
+            h = self.find_hex_that_needs_tower(castle)
+            if h < 0 or not self.buy(castle, TOWER, h):
+                return
+
+    def find_hex_that_needs_tower(self, castle: int) -> int:
+        for h in self.engine.province(castle):
+            if self.need_tower_on_hex(h):
+                return h
+        return -1
+
+    def need_tower_on_hex(self, h: int) -> bool:
+        return self.is_free(h) and self.get_predicted_defense_gain_by_new_tower(h) >= 5
+
+    def get_predicted_defense_gain_by_new_tower(self, h: int) -> int:
+        engine = self.engine
+        gain = 0 if self.is_defended_by_tower(h) else 1
+        owner = engine.owner[h]
+        for n in engine.neighbors[h]:
+            if engine.owner[n] == owner and engine.resident[n] != WATER and not self.is_defended_by_tower(n):
+                gain += 1
+            if engine.resident[n] in (TOWER, STRONG_TOWER):
+                gain -= 1
+        return gain
+
+    def try_to_build_units(self, castle: int):
+        self.try_to_build_units_on_palms(castle)
+        for strength in range(1, 5):
+            if not self.can_ai_afford_unit(castle, strength):
+                break
+            while self.can_build_unit(castle, strength):
+                if not self.try_to_attack_with_strength(castle, strength):
+                    break
+        self.kick_start(castle)
+
+    def kick_start(self, castle: int):
+        """One Spearman for a province with (almost) no army."""
+        if self.can_build_unit(castle, 1) and self.units_in_province(castle) <= 1:
+            self.try_to_attack_with_strength(castle, 1)
+
+    def try_to_build_unit_inside_province(self, castle: int, strength: int) -> bool:
+        resident = self.engine.resident
+        for h in self.engine.province(castle):
+            if POWER[resident[h]] < 0 and self.is_allowed_to_build_new_unit(castle):  # Nothing blocks the way
+                return self.build_unit(castle, h, strength)
+        return False
+
+    def try_to_attack_with_strength(self, castle: int, strength: int) -> bool:
+        if not self.is_allowed_to_build_new_unit(castle):
+            return False
+        attackable = self.find_attackable_hexes(self.engine.possible_placements(castle, warrior(strength)))
+        if not attackable:
+            return False
+        return self.build_unit(castle, self.find_most_attractive_hex(attackable, strength), strength)
+
+    def try_to_build_units_on_palms(self, castle: int):
+        if not self.can_ai_afford_unit(castle, 1):
+            return
+        resident = self.engine.resident
+        while self.can_build_unit(castle, 1):
+            palms = [h for h in self.engine.possible_placements(castle, warrior(1))
+                     if resident[h] == PALM and self.is_own(h)]
+            if not any([self.build_unit(castle, h, 1) for h in palms]):
+                break
+
+
+class EasyAi(LadderAi):
+    """AiEasy.java: random moves, units built inside the province, no towers, rare merges."""
+
+    difficulty = EASY
+
+    def decide_about_unit(self, unit: int, zone: List[int], castle: int):
+        if not self.check_to_clean_some_trees(unit, zone):
+            self.move_unit(unit, zone[self.random.randrange(len(zone))])
+
+    def try_to_build_units(self, castle: int):
+        for strength in range(1, 5):
+            if not self.can_ai_afford_unit(castle, strength):
+                break
+            while self.can_build_unit(castle, strength):
+                if not self.try_to_build_unit_inside_province(castle, strength):
+                    break
+        self.kick_start(castle)
+
+    def try_to_build_towers(self, castle: int):
+        pass  # Easy AI can't build towers
+
+    def merge_conditions(self, castle: int, unit: int, h: int) -> bool:
+        resident = self.engine.resident
+        return (super().merge_conditions(castle, unit, h) and
+                POWER[resident[unit]] == 1 and POWER[resident[h]] == 1)
+
+    def merge_units(self, castle: int):
+        if self.random.random() < 0.25:
+            super().merge_units(castle)
+
+
+class GenericRulesAi(LadderAi):
+    """ArtificialIntelligenceGeneric.java: towers, farms, then units."""
+
+    def spend_money(self, castle: int):
+        self.try_to_build_towers(castle)
+        self.try_to_build_farms(castle)
+        self.try_to_build_units(castle)
+
+    def try_to_build_farms(self, castle: int):
+        engine = self.engine
+        if 2 * engine.count_farms(castle) > MAX_EXTRA_FARM_COST:
+            return
+        while self.money(castle) >= engine.price(castle, FARM):
+            if not self.is_ok_to_build_new_farm(castle):
+                return
+            h = self.find_good_hex_for_farm(castle)
+            if h < 0 or not self.buy(castle, FARM, h):
+                return
+
+    def is_ok_to_build_new_farm(self, castle: int) -> bool:
+        if self.money(castle) > 2 * self.engine.price(castle, FARM):
+            return True
+        return self.find_hex_that_needs_tower(castle) < 0
+
+    def find_good_hex_for_farm(self, castle: int) -> int:
+        good = [h for h in self.engine.province(castle) if self.is_hex_good_for_farm(h)]
+        if not good:
+            return -1
+        return good[self.random.randrange(len(good))]
+
+    def is_hex_good_for_farm(self, h: int) -> bool:
+        if not self.is_free(h):
+            return False
+        engine = self.engine
+        owner = engine.owner[h]
+        for n in engine.neighbors[h]:
+            if engine.owner[n] == owner and engine.resident[n] in (CASTLE, FARM):
+                return True
+        return False
+
+
+class NormalAi(GenericRulesAi):
+    """AiNormalGenericRules.java: leaves half of its units idle, builds inside the province."""
+
+    difficulty = NORMAL
+
+    def decide_about_unit(self, unit: int, zone: List[int], castle: int):
+        if self.random.random() < 0.5:
+            return
+        super().decide_about_unit(unit, zone, castle)
+
+    def try_to_build_units(self, castle: int):
+        self.try_to_build_units_on_palms(castle)
+        for strength in range(1, 5):
+            if not self.can_ai_afford_unit(castle, strength):
+                break
+            while self.can_build_unit(castle, strength):
+                if not self.try_to_build_unit_inside_province(castle, strength):
+                    break
+        self.kick_start(castle)
+
+
+class HardAi(GenericRulesAi):
+    """AiHardGenericRules.java: attacks with what it buys, strong towers, moves idle units."""
+
+    difficulty = HARD
+
+    def make_move(self):
+        self.move_units()
+        self.spend_money_and_merge_units()
+        self.move_afk_units()
+
+    def try_to_build_towers(self, castle: int):
+        while self.money(castle) >= PRICE_TOWER:
+            h = self.find_hex_that_needs_tower(castle)
+            if h < 0:
+                return
+            tower = STRONG_TOWER if self.money(castle) >= PRICE_STRONG_TOWER else TOWER
+            if not self.buy(castle, tower, h):
+                return
+
+
+class ExpertAi(GenericRulesAi):
+    """AiExpertGenericRules.java: keeps the front manned, marches idle units to it."""
+
+    difficulty = EXPERT
+
+    def make_move(self):
+        self.move_units()
+        self.spend_money_and_merge_units()
+        self.move_afk_units()
+
+    def decide_about_unit(self, unit: int, zone: List[int], castle: int):
+        strength = POWER[self.engine.resident[unit]]
+        if strength <= 2 and self.check_to_clean_some_palms(unit, zone):
+            return
+        attackable = self.find_attackable_hexes(zone)
+        if attackable:
+            self.try_to_attack_something(unit, attackable)
+        elif not self.check_to_clean_some_trees(unit, zone) and self.is_in_perimeter(unit):
+            self.push_unit_to_better_defense(unit)
+
+    def is_hex_defended_by_something_else(self, h: int, unit: int) -> bool:
+        engine = self.engine
+        owner = engine.owner[h]
+        for n in engine.neighbors[h]:
+            if engine.owner[n] == owner and n != unit:
+                r = engine.resident[n]
+                if is_warrior(r) or POWER[r] >= 0:  # A unit or a building
+                    return True
+        return False
+
+    def unit_can_move_safely(self, unit: int) -> bool:
+        engine = self.engine
+        owner = engine.owner[unit]
+        left_behind = 0
+        for n in engine.neighbors[unit]:
+            if (engine.owner[n] == owner and not self.is_hex_defended_by_something_else(n, unit)
+                    and self.is_in_perimeter(n)):
+                left_behind += 1
+        return left_behind <= 3
+
+    def try_to_attack_something(self, unit: int, attackable: List[int]):
+        if not self.unit_can_move_safely(unit):
+            return
+        target = self.find_most_attractive_hex(attackable, POWER[self.engine.resident[unit]])
+        if target >= 0:
+            self.move_unit(unit, target)
+
+    def move_afk_unit(self, castle: int, unit: int):
+        target = self.find_random_hex_in_perimeter(castle)
+        if target < 0:
+            return
+        if not self.march_towards(unit, target):
+            super().move_afk_unit(castle, unit)  # To prevent an infinite loop
+
+    def find_random_hex_in_perimeter(self, castle: int) -> int:
+        perimeter = [h for h in self.engine.province(castle) if self.is_in_perimeter(h)]
+        if not perimeter:
+            return -1
+        return perimeter[self.random.randrange(len(perimeter))]
+
+    def march_towards(self, unit: int, target: int) -> bool:
+        """Step to the reachable free hex of ours closest to target along our land."""
+        engine = self.engine
+        owner = engine.owner[unit]
+        distance: Dict[int, int] = {target: 0}
+        frontier = [target]
+        for h in frontier:  # grows while iterating (BFS)
+            for n in engine.neighbors[h]:
+                if n not in distance and engine.owner[n] == owner:
+                    distance[n] = distance[h] + 1
+                    frontier.append(n)
+        best = -1
+        best_distance = distance.get(unit, len(frontier))
+        for h in self.move_zone(unit):
+            d = distance.get(h)
+            if d is not None and d < best_distance and POWER[engine.resident[h]] < 0:
+                best = h
+                best_distance = d
+        return best >= 0 and self.move_unit(unit, best)
+
+    def try_to_build_units(self, castle: int):
+        self.try_to_build_units_on_palms(castle)
+        strength = 1
+        while strength <= 4:
+            if not self.can_ai_afford_unit(castle, strength):
+                break
+            if self.can_build_unit(castle, strength) and self.try_to_attack_with_strength(castle, strength):
+                strength = 1
+            else:
+                strength += 1
+        self.kick_start(castle)
+
+    def try_to_build_towers(self, castle: int):
+        while self.money(castle) >= PRICE_TOWER:
+            h = self.find_hex_that_needs_tower(castle)
+            if h < 0 or not self.buy(castle, TOWER, h):
+                break
+        while self.province_can_afford_strong_tower(castle):
+            h = self.find_hex_for_strong_tower(castle)
+            if h < 0 or not self.buy(castle, STRONG_TOWER, h):
+                break
+
+    def find_hex_for_strong_tower(self, castle: int) -> int:
+        resident = self.engine.resident
+        for h in self.engine.province(castle):
+            if resident[h] == TOWER and self.needs_strong_tower_on_hex(castle, h):
+                return h
+        return -1
+
+    def needs_strong_tower_on_hex(self, castle: int, h: int) -> bool:
+        size = len(self.engine.province(castle))
+        return any(len(self.engine.province(other)) > size // 2 for other in self.nearby_provinces([h], wide=True))
+
+    def province_can_afford_strong_tower(self, castle: int) -> bool:
+        return (self.money(castle) >= PRICE_STRONG_TOWER and
+                self.profit(castle) - TAX_STRONG_TOWER >= PRICE_UNIT // 2)
+
+    def need_tower_on_hex(self, h: int) -> bool:
+        return self.is_free(h) and self.get_predicted_defense_gain_by_new_tower(h) >= 4
+
+
+class BalancerAi(ExpertAi):
+    """AiBalancerGenericRules.java: hits the biggest player first, towers only at the front."""
+
+    difficulty = BALANCER
+
+    def make_move(self):
+        self.move_units()
+        self.spend_money_and_merge_units()
+        self.check_to_kill_redundant_units()
+        self.move_afk_units()
+
+    def check_to_kill_redundant_units(self):
+        engine = self.engine
+        for castle in self.provinces():
+            if not self.is_alive(castle):
+                continue
+            detected_strong = False
+            idle = True
+            for h in engine.province(castle):
+                r = engine.resident[h]
+                if is_warrior(r):
+                    if not is_unmoved(r):
+                        idle = False
+                        break
+                    if POWER[r] >= 3:
+                        detected_strong = True
+            if idle and detected_strong:
+                # So the units are not doing anything; time to kill them
+                self.kill_redundant_units(castle)
+
+    def kill_redundant_units(self, castle: int):
+        while self.money(castle) >= PRICE_UNIT and self.profit(castle) >= 0:
+            unit = self.find_unit_with_max_strength_except_knight(castle)
+            if unit < 0 or not self.can_build_unit(castle, 1) or not self.build_unit(castle, unit, 1):
+                break
+
+    def find_unit_with_max_strength_except_knight(self, castle: int) -> int:
+        resident = self.engine.resident
+        result = -1
+        for h in self.engine.province(castle):
+            r = resident[h]
+            if is_warrior(r) and POWER[r] != 4 and (result < 0 or POWER[r] > POWER[resident[result]]):
+                result = h
+        return result
+
+    def is_ok_to_build_new_farm(self, castle: int) -> bool:
+        if self.money(castle) > 2 * self.engine.price(castle, FARM):
+            return True
+        strength = self.army_strength(castle)
+        for other in self.nearby_provinces(self.engine.province(castle)):
+            if strength < self.army_strength(other) // 2:
+                return False
+        return self.find_hex_that_needs_tower(castle) < 0
+
+    def decide_about_unit(self, unit: int, zone: List[int], castle: int):
+        strength = POWER[self.engine.resident[unit]]
+        if strength <= 2 and self.check_to_clean_some_palms(unit, zone):
+            return
+        if self.check_to_clean_some_trees(unit, zone):
+            return
+        attackable = self.find_attackable_hexes(zone)
+        if attackable:
+            self.try_to_attack_something(unit, attackable)
+        elif self.is_in_perimeter(unit):
+            self.push_unit_to_better_defense(unit)
+
+    def push_unit_to_better_defense(self, unit: int):
+        for h in self.engine.neighbors[unit]:
+            if self.is_own(h) and self.is_free(h) and self.predict_defense_gain_with_unit(h, unit) >= 3:
+                self.move_unit(unit, h)
+                break
+
+    def predict_defense_gain_with_unit(self, h: int, unit: int) -> int:
+        # Like the Java bot, the neighbours counted are the unit's, not h's
+        engine = self.engine
+        strength = POWER[engine.resident[unit]]
+        gain = strength - self.defense_number(h)
+        owner = engine.owner[unit]
+        for n in engine.neighbors[unit]:
+            if engine.owner[n] == owner:
+                gain += strength - self.defense_number(n)
+        return gain
+
+    def is_hex_defended_by_something_else(self, h: int, unit: int) -> bool:
+        without = self.defense_number(h, unit)
+        if without == 0:
+            return False
+        return self.defense_number(h) - without < 2
+
+    def get_attack_allure(self, h: int) -> int:
+        engine = self.engine
+        allure = 0
+        for n in engine.neighbors[h]:
+            if engine.owner[n] == self.player:
+                allure += 6 if engine.resident[n] == CASTLE else 1
+        if engine.resident[h] == FARM:
+            allure *= 2
+        return allure
+
+    def find_attackable_hexes(self, zone: List[int]) -> List[int]:
+        # Top players are attacked first. The Java comparator also counts our
+        # units-and-towers around each hex first, which no hex ever has.
+        engine = self.engine
+        counts = [0] * (engine.num_players + 1)
+        for owner in engine.owner:
+            counts[owner] += 1
+        counts[0] = 0
+        attackable = super().find_attackable_hexes(zone)
+        attackable.sort(key=lambda h: -counts[engine.owner[h]])
+        return attackable
+
+    def try_to_build_units(self, castle: int):
+        self.try_to_build_units_on_palms(castle)
+        self.try_to_reinforce_units(castle)
+        for strength in range(1, 5):
+            if not self.can_ai_afford_unit(castle, strength, 5):
+                break
+            while self.can_build_unit(castle, strength):
+                if not self.try_to_attack_with_strength(castle, strength):
+                    break
+        self.kick_start(castle)
+
+    def try_to_reinforce_units(self, castle: int):
+        resident = self.engine.resident
+        for h in self.engine.province(castle):
+            r = resident[h]
+            if (is_warrior(r) and self.unit_has_to_be_reinforced(h) and
+                    self.can_ai_afford_unit(castle, POWER[r] + 1)):
+                self.build_unit(castle, h, 1)
+
+    def unit_has_to_be_reinforced(self, unit: int) -> bool:
+        # A unit stuck in front of hexes it can't take. Its move zone only
+        # holds foreign hexes it can take, so as in the Java bot this never fires.
+        if POWER[self.engine.resident[unit]] == 4:
+            return False
+        zone = self.engine.possible_movements(unit)
+        if all(self.is_own(h) for h in zone):
+            return False
+        return not self.find_attackable_hexes(zone)
+
+    def need_tower_on_hex(self, h: int) -> bool:
+        if not self.is_free(h):
+            return False
+        if not self.nearby_provinces([h], wide=True):
+            return False  # Towers only at the front line
+        return self.get_predicted_defense_gain_by_new_tower(h) >= 3
+
+
+LADDER = {
+    EASY: EasyAi,
+    NORMAL: NormalAi,
+    HARD: HardAi,
+    EXPERT: ExpertAi,
+    BALANCER: BalancerAi,
+    MASTER: ExpertAi,
+}
+
+
+def make_ladder_ai(difficulty: Union[int, str], player: int, seed: Optional[int] = None) -> LadderAi:
+    """AiFactory.addAiToList: the bot of a Difficulty (or its name), unknown ones get Easy."""
+    if isinstance(difficulty, str):
+        name = difficulty.lower()
+        difficulty = DIFFICULTY_NAMES.index(name) if name in DIFFICULTY_NAMES else EASY
+    return LADDER.get(difficulty, EasyAi)(player, seed)
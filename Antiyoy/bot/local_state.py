@@ -0,0 +1,134 @@
+"""
+Optimistic client-side state for the actions of one turn.
+
+The server runs a whole ACTION batch atomically: one illegal action and
+nothing of the batch happens (the receiver then ends the turn). But the
+bots plan many actions per turn on the board they received, which stays
+as it was: a unit that moved still looks unmoved, conquered land still
+looks foreign, money is only tracked by hand where a bot remembers to, and
+every later move zone is computed from that stale picture.
+
+LocalState plays every queued PLACE / MOVE on an Engine built from the
+received board (Hexagon::place / move with merges, conquests, money and
+province splits / merges) and writes the changed hexes back into the
+board's own Hex objects, so the rest of the turn plans on the board as it
+will be. Actions the engine refuses are not queued at all, and neither
+are attacks with power below 2 on enemy land whose castle the engine had
+to guess after a split (the server picks another random hex, see
+KnownCastles): a batch is only as good as its worst action.
+
+    local = LocalState(board, player)
+    builder = TrackedActionBuilder(action_builder, local)
+    ai.make_move(board, builder)           # board follows every queued action
+    ...
+    local.undone(next_board)               # next board of the turn is the one we started from
+
+The server only re-sends the board in the middle of a turn after it
+rejected a batch, and then it has undone the whole batch: that board says
+nothing about the hexes our actions would have changed, only that none of
+them happened. undone() checks exactly that against the board as it was
+received, before any action was played on it; when it fails the receiver
+forgets the plan it stored for the old board and plans on the new one.
+"""
+
+from typing import Dict, Tuple
+
+from .beam_search import KnownCastles, apply_action
+from .engine import ACTION_MOVE, ACTION_PLACE, POWER, Engine
+from .snapshot import board_to_bytes
+
+
+class LocalState:
+    """Engine copy of a received board that every queued action is played on first."""
+
+    def __init__(self, board, player: int):
+        self.board = board
+        self.player = player
+        self.received = board_to_bytes(board)  # Snapshot from before any of our actions
+        self.engine = Engine.from_board(board, current_player=player)
+        self.known = KnownCastles(self.engine, player)
+        self._residents = type(board.hexes[0].resident) if board.hexes else None
+        self.applied = 0
+        self.refused = 0
+
+    def apply(self, action: tuple) -> bool:
+        """Play a PLACE / MOVE tuple (engine layout); False, and nothing changes, when it should not be sent."""
+        engine = self.engine
+        if not self._certain(action):
+            self.refused += 1
+            return False
+        mark = engine.begin()
+        if not apply_action(engine, action):
+            engine.rollback(mark)
+            self.refused += 1
+            return False
+        changes = engine.changes_since(mark)
+        engine.commit(mark)
+        self.applied += 1
+        self.known.invalidate()
+        self._write_back(changes)
+        return True
+
+    def _certain(self, action: tuple) -> bool:
+        engine = self.engine
+        if action[0] == ACTION_PLACE:
+            power = POWER[action[1]] if 0 <= action[1] < len(POWER) else 0
+            dst = engine.index(action[4], action[5])
+        else:
+            src = engine.index(action[1], action[2])
+            power = POWER[engine.resident[src]] if src >= 0 else 0
+            dst = engine.index(action[3], action[4])
+        return self.known.certain(engine, dst, power)
+
+    def _write_back(self, changes: Dict[int, Tuple[int, int]]):
+        engine = self.engine
+        hexes = self.board.hexes
+        for i in changes:
+            h = hexes[i]
+            h.owner_id = engine.owner[i]
+            h.resident = self._residents(engine.resident[i])
+        # Castle money shows on the whole province; splits and merges move it around
+        for h, money in zip(hexes, engine.hex_money()):
+            h.money = money
+        self.board.touch()
+
+    def undone(self, board) -> bool:
+        """Whether board (re-sent by the server after a rejection) is the one this state was built from."""
+        return board_to_bytes(board) == self.received
+
+
+class TrackedActionBuilder:
+    """
+    ActionBuilder stand-in that plays PLACE / MOVE on a LocalState before
+    queuing them on the real builder. Refused actions (and BUILD, which the
+    game does not have) are dropped; add_* return whether it was queued.
+    """
+
+    def __init__(self, builder, local: LocalState):
+        self.builder = builder
+        self.local = local
+
+    def add_place(self, resident: int, x_from: int, y_from: int, x_to: int, y_to: int) -> bool:
+        if not self.local.apply((ACTION_PLACE, int(resident), x_from, y_from, x_to, y_to)):
+            return False
+        self.builder.add_place(resident, x_from, y_from, x_to, y_to)
+        return True
+
+    def add_move(self, x_from: int, y_from: int, x_to: int, y_to: int) -> bool:
+        if not self.local.apply((ACTION_MOVE, x_from, y_from, x_to, y_to)):
+            return False
+        self.builder.add_move(x_from, y_from, x_to, y_to)
+        return True
+
+    def add_build(self, resident: int, x: int, y: int) -> bool:
+        self.local.refused += 1
+        return False
+
+    def add_end_turn(self):
+        self.builder.add_end_turn()
+
+    def send(self):
+        self.builder.send()
+
+    def __getattr__(self, name):
+        return getattr(self.builder, name)
@@ -0,0 +1,261 @@
+"""
+Monte Carlo tree search over the strategic RLAction choices.
+
+Each tree level is one player's turn: the player to move picks one of the
+five RLActions (applied to all of its provinces), the turn is played out
+on an Engine by a bot that executes that action, and play moves on to the
+next player, whose choices form the next level. Below the tree, rollouts
+play whole turns with a default bot (e.g. AiEasy) up to a fixed depth, and
+the final position is scored per player.
+
+Simulations run on the real engine state inside an undo-journal
+transaction, so nothing is copied and every iteration starts from the
+same position. The tree is open-loop (nodes are action sequences) because
+turns are random (tree spread, castle placement); each node remembers
+the positions it led to, which is how a subtree is found again on the
+next turn and reused.
+
+Multi-player values are vectors (one entry per player, max^n style);
+every node picks the child that is best for the player choosing there.
+Selection is PUCT, with an optional prior over the five actions (e.g.
+softmax of the Q-table).
+"""
+
+import math
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from .engine import Engine, play_turn
+
+NUM_ACTIONS = 5  # RLAction: ATTACK, DEFEND, FARM, EXPAND, WAIT
+MAX_REMEMBERED_KEYS = 16
+
+
+def state_key(engine: Engine) -> int:
+    """Hash of the position (land, residents, castle money, player to move)."""
+    money = tuple(tuple(sorted(c.items())) for c in engine.castles)
+    return hash((bytes(engine.owner), bytes(engine.resident), money, engine.current_player))
+
+
+def land_value(engine: Engine) -> List[float]:
+    """
+    Default position score per player (index = player id, 0 unused), in
+    [0, 1]: 1/0 when the game is over, otherwise share of owned land with
+    a small bonus for positive income.
+    """
+    n = engine.num_players
+    values = [0.0] * (n + 1)
+    if engine.is_game_over():
+        values[engine.leaderboard[0]] = 1.0
+        return values
+    land = [0] * (n + 1)
+    for o in engine.owner:
+        land[o] += 1
+    total = sum(land[1:]) or 1
+    for player in range(1, n + 1):
+        income = 0
+        for castle in engine.castles[player]:
+            income += engine.province_income(engine.province(castle))
+        values[player] = 0.9 * land[player] / total + (0.1 if income > 0 else 0.0)
+    return values
+
+
+class TurnModel:
+    """
+    Forward model: how a turn is played for a given RLAction.
+
+    planned_bot(player, action) and rollout_bot(player) return objects with
+    make_move(board, action_builder) (AiRL with a fixed action, AiEasy, ...);
+    board_factory(engine) builds the board they get.
+    prior(engine, player) may return NUM_ACTIONS probabilities.
+    """
+
+    def __init__(self, board_factory: Callable[[Engine], object], planned_bot: Callable, rollout_bot: Callable,
+                 prior: Optional[Callable] = None, evaluate: Callable[[Engine], List[float]] = land_value):
+        self.board_factory = board_factory
+        self.planned_bot = planned_bot
+        self.rollout_bot = rollout_bot
+        self.prior = prior
+        self.evaluate = evaluate
+
+    def play(self, engine: Engine, action: Optional[int]):
+        """Play the whole turn of the player to move (action None = rollout bot)."""
+        player = engine.current_player
+        bot = self.rollout_bot(player) if action is None else self.planned_bot(player, action)
+        play_turn(engine, lambda pid, board, builder: bot.make_move(board, builder), self.board_factory)
+
+
+def q_prior(policy, features: Callable, temperature: float = 1.0) -> Callable:
+    """
+    Prior from a Q-table: softmax of its Q-values for features(engine, player)
+    (a state vector, or None when there is nothing to decide).
+    """
+    q_values = getattr(policy, 'get_combined_q_values', None) or policy.get_q_values
+
+    def prior(engine: Engine, player: int) -> Optional[List[float]]:
+        state = features(engine, player)
+        if state is None:
+            return None
+        q = q_values(state)
+        top = max(q)
+        weights = [math.exp((v - top) / temperature) for v in q]
+        total = sum(weights)
+        return [w / total for w in weights]
+
+    return prior
+
+
+class Node:
+    __slots__ = ('player', 'children', 'visits', 'value', 'prior', 'keys')
+
+    def __init__(self):
+        self.player = 0  # Player choosing at this node (set when first reached)
+        self.children: Dict[int, 'Node'] = {}
+        self.visits = 0
+        self.value: List[float] = []  # Summed values per player
+        self.prior: Optional[List[float]] = None
+        self.keys: List[int] = []  # Positions this node was reached in
+
+    def remember(self, key: int):
+        if key not in self.keys:
+            if len(self.keys) >= MAX_REMEMBERED_KEYS:
+                self.keys.pop(0)
+            self.keys.append(key)
+
+    def mean(self, player: int) -> float:
+        return self.value[player] / self.visits if self.visits else 0.0
+
+
+class MCTSPlanner:
+    """
+    Picks an RLAction for the player to move.
+
+    iterations:  simulations per decision (upper bound), None = until the deadline
+    time_budget: seconds per decision (upper bound), None = no limit
+    depth:       turns simulated per iteration (tree + rollout), default one round
+    c_puct:      exploration constant
+    reuse:       keep the matching subtree between decisions
+
+    The search is anytime: whenever it is stopped, the most visited action
+    so far is returned.
+    """
+
+    def __init__(self, model: TurnModel, num_players: int, iterations: Optional[int] = 100,
+                 time_budget: Optional[float] = None, depth: Optional[int] = None,
+                 c_puct: float = 1.4, reuse: bool = True):
+        self.model = model
+        self.num_players = num_players
+        self.iterations = iterations
+        self.time_budget = time_budget
+        self.depth = depth or num_players
+        self.c_puct = c_puct
+        self.reuse = reuse
+        self.root: Optional[Node] = None
+        self.last_stats: Dict = {}
+
+    def plan(self, engine: Engine, deadline: Optional[float] = None) -> int:
+        """
+        Search from the engine's position and return the most visited action.
+        engine is left unchanged. deadline (time.perf_counter() value) ends
+        the search early, on top of iterations and time_budget.
+        """
+        started = time.perf_counter()
+        if self.time_budget is not None:
+            budget_end = started + self.time_budget
+            deadline = budget_end if deadline is None else min(deadline, budget_end)
+        if deadline is None and self.iterations is None:
+            raise ValueError("plan() needs an iteration limit, a time budget or a deadline")
+        key = state_key(engine)
+        root = self._find_subtree(key) if self.reuse else None
+        reused = root is not None
+        if root is None:
+            root = Node()
+        root.remember(key)
+        start_visits = root.visits
+
+        limit = self.iterations if self.iterations is not None else math.inf
+        done = 0
+        while done < limit:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            self._simulate(engine, root)
+            done += 1
+
+        self.root = root
+        action = max(range(NUM_ACTIONS), key=lambda a: (root.children[a].visits if a in root.children else -1,
+                                                        -a))
+        self.last_stats = {
+            'iterations': done,
+            'reused': reused,
+            'reused_visits': start_visits,
+            'elapsed': time.perf_counter() - started,
+            'visits': {a: c.visits for a, c in root.children.items()},
+            'values': {a: round(c.mean(root.player), 3) for a, c in root.children.items()},
+        }
+        return action
+
+    def _find_subtree(self, key: int) -> Optional[Node]:
+        """The node the previous search reached this position in (one round below the old root)."""
+        if self.root is None:
+            return None
+        layer = [self.root]
+        for _ in range(self.num_players + 1):
+            for node in layer:
+                if key in node.keys and node is not self.root:
+                    return node
+            layer = [child for node in layer for child in node.children.values()]
+        return None
+
+    def _simulate(self, engine: Engine, root: Node):
+        model = self.model
+        mark = engine.begin()
+        try:
+            path = [root]
+            node = root
+            depth = 0
+            while depth < self.depth and not engine.is_game_over():
+                if node.prior is None:
+                    node.player = engine.current_player
+                    node.prior = (model.prior(engine, node.player) if model.prior else None) or [1.0 / NUM_ACTIONS] * NUM_ACTIONS
+                action = self._select(node)
+                child = node.children.get(action)
+                if child is None:
+                    child = node.children[action] = Node()
+                model.play(engine, action)
+                depth += 1
+                child.remember(state_key(engine))
+                path.append(child)
+                node = child
+                if child.visits == 0:
+                    break  # New leaf: continue with a rollout
+            while depth < self.depth and not engine.is_game_over():
+                model.play(engine, None)
+                depth += 1
+            values = model.evaluate(engine)
+        finally:
+            engine.rollback(mark)
+
+        for n in path:
+            if not n.value:
+                n.value = [0.0] * len(values)
+            n.visits += 1
+            for i, v in enumerate(values):
+                n.value[i] += v
+
+    def _select(self, node: Node) -> int:
+        """PUCT: mean value for the choosing player plus prior-weighted exploration."""
+        player = node.player
+        scale = self.c_puct * math.sqrt(node.visits + 1)
+        parent_mean = node.mean(player)
+        best, best_score = 0, -math.inf
+        for a in range(NUM_ACTIONS):
+            child = node.children.get(a)
+            if child is None or not child.visits:
+                q, n = parent_mean, 0
+            else:
+                q, n = child.mean(player), child.visits
+            score = q + scale * node.prior[a] / (1 + n) + random.random() * 1e-6  # Tiny noise breaks ties
+            if score > best_score:
+                best, best_score = a, score
+        return best
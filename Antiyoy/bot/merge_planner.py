@@ -0,0 +1,97 @@
+"""
+Merge candidates of one board, after mergeWarriors() in board.cpp.
+
+Two of our unmoved warriors merge when one moves onto the other and their
+strengths add up to at most 4; the merged warrior costs more upkeep than
+the two did, and the hex left behind earns again. AiEasy looked for
+partners unit by unit, with a move-zone BFS and a pass over it for every
+unit. MergePlanner indexes the unmoved warriors by hex and strength, casts
+the reach of all of them through our land in one PropagationGrid.cast()
+batch (MOVE_LIMIT steps, like possibleMovements), and lists every feasible
+merge with its income change in one pass over those reaches:
+
+    src, dst     the warrior that moves and the one it moves onto
+    strength     strength of the merged warrior
+    upkeep       change of the province's income per turn (<= 0)
+
+plan() picks disjoint merges, cheapest first, that the caller accepts:
+
+    planner = MergePlanner(PropagationGrid.from_board(board), player)
+    for merge in planner.plan(lambda m: m.strength == 2):
+        ...   # MOVE merge.src -> merge.dst
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .engine import EMPTY, HEX_INCOME, POWER, WARRIOR1, is_unmoved
+from .hex_geometry import MOVE_LIMIT
+from .propagation import Caster, PropagationGrid
+
+
+class Merge:
+    """One warrior moving onto another."""
+
+    __slots__ = ('src', 'dst', 'strength', 'upkeep')
+
+    def __init__(self, src: int, dst: int, strength: int, upkeep: int):
+        self.src = src
+        self.dst = dst
+        self.strength = strength
+        self.upkeep = upkeep
+
+    def __repr__(self):
+        return f"Merge({self.src} -> {self.dst}, strength={self.strength}, upkeep={self.upkeep})"
+
+
+def merge_upkeep(a: int, b: int) -> int:
+    """Income change of merging warriors of strength a and b (the vacated hex earns again)."""
+    return (HEX_INCOME[WARRIOR1 - 1 + a + b] + HEX_INCOME[EMPTY]
+            - HEX_INCOME[WARRIOR1 - 1 + a] - HEX_INCOME[WARRIOR1 - 1 + b])
+
+
+class MergePlanner:
+    """Every merge player's unmoved warriors can make this turn, for one board."""
+
+    def __init__(self, grid: PropagationGrid, player: int):
+        self.grid = grid
+        self.player = player
+        resident = grid.resident
+        own = grid.owner_mask(player)
+
+        # Index: hex -> strength of the unmoved warrior on it, and hexes by strength
+        self.strength: Dict[int, int] = {i: POWER[resident[i]] for i in range(grid.size)
+                                         if own[i] and is_unmoved(resident[i])}
+        self.by_strength: Dict[int, List[int]] = {s: [] for s in range(1, 5)}
+        for i, s in self.strength.items():
+            self.by_strength[s].append(i)
+
+        # Only warriors that have a partner strength at all need a reach
+        weakest = min((s for s, units in self.by_strength.items() if units), default=4)
+        movers = [i for i, s in self.strength.items() if s + weakest <= 4]
+        reaches = grid.cast([Caster([u], MOVE_LIMIT, into=own, through=own) for u in movers])
+        strength = self.strength
+        self.merges: List[Merge] = []
+        for u, reach in zip(movers, reaches):
+            s = strength[u]
+            for i in reach.reached():
+                t = strength.get(i)
+                if t is not None and s + t <= 4:
+                    self.merges.append(Merge(u, i, s + t, merge_upkeep(s, t)))
+
+    def plan(self, accept: Optional[Callable[[Merge], bool]] = None,
+             exclude: Iterable[int] = ()) -> List[Merge]:
+        """Disjoint accepted merges, cheapest upkeep first (ties: unit order); no hex in exclude is used."""
+        used = set(exclude)
+        result = []
+        for merge in sorted(self.merges, key=lambda m: -m.upkeep):
+            if merge.src in used or merge.dst in used:
+                continue
+            if accept is not None and not accept(merge):
+                continue
+            used.add(merge.src)
+            used.add(merge.dst)
+            result.append(merge)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {'units': len(self.strength), 'merges': len(self.merges)}
@@ -0,0 +1,70 @@
+"""
+Exact move generation for the Hex-object bots.
+
+ProvinceManager's planners (ImprovedAI, RLReadyAI) work with the board's
+Hex objects, but whether the server accepts a move is decided by
+Hexagon::possibleMovements and Hexagon::allows in board.cpp: own hexes up
+to 4 steps away through own land plus the foreign hexes touching the
+first 3 layers (addNeighboursLayerWithBorder), filtered by allows() (merge
+rules on own land, defenders around the target elsewhere, Warrior4 beats
+all).
+
+Engine implements exactly that over flat owner / resident arrays with
+layered stamp-marked BFS. MoveGenerator builds one Engine per board and
+answers every query of the turn from it, memoized by source hex, and hands
+back the board's own Hex objects:
+
+    moves = MoveGenerator(board)
+    for target in moves.movements(unit_hex):   # where the unit may go
+        ...
+    moves.placements(castle_hex, 2)            # where a bought Spearman may go
+    moves.placement_strengths(castle_hex)      # [(hex, weakest, strongest)] for all warriors
+
+Placements of all four strengths come from one pass over the province and
+its border (Engine.placement_strengths), kept per hex asked from (the castle).
+"""
+
+from typing import Dict, List, Tuple
+
+from .engine import Engine
+from .game_utils import GameUtils
+
+
+class MoveGenerator:
+    """possibleMovements / possiblePlacements of one board, as Hex objects."""
+
+    def __init__(self, board):
+        self.board = board
+        self.width = board.width
+        self.engine = Engine.from_board(board)
+        self._movements: Dict[int, List] = {}
+        self._placements: Dict[int, List[Tuple[object, int, int]]] = {}
+
+    def index(self, hex_obj) -> int:
+        return hex_obj.y * self.width + hex_obj.x
+
+    def movements(self, unit_hex) -> List:
+        """Hexes the unmoved warrior on unit_hex may move to ([] for anything else)."""
+        i = self.index(unit_hex)
+        result = self._movements.get(i)
+        if result is None:
+            hexes = self.board.hexes
+            result = self._movements[i] = [hexes[h] for h in self.engine.possible_movements(i)]
+        return result
+
+    def placement_strengths(self, province_hex) -> List[Tuple[object, int, int]]:
+        """(hex, weakest, strongest) for every hex a warrior bought by province_hex's province may go to."""
+        i = self.index(province_hex)
+        result = self._placements.get(i)
+        if result is None:
+            hexes = self.board.hexes
+            result = self._placements[i] = [(hexes[h], lo, hi) for h, (lo, hi) in self.engine.placement_strengths(i).items()]
+        return result
+
+    def placements(self, province_hex, strength: int) -> List:
+        """Hexes a warrior of strength bought by province_hex's province may be placed on."""
+        return [h for h, lo, hi in self.placement_strengths(province_hex) if lo <= strength <= hi]
+
+    def allows(self, hex_obj, strength: int, owner: int) -> bool:
+        """Hexagon::allows for an unmoved warrior of strength and owner entering hex_obj."""
+        return self.engine.allows(self.index(hex_obj), int(GameUtils.strength_to_warrior(strength)), owner)
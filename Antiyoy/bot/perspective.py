@@ -0,0 +1,161 @@
+"""
+Player-relative views of a board without rewriting it.
+
+The AI is written as if it were always player 1. Instead of swapping owner
+ids on every hex (Board.swap_players), PerspectiveView wraps the board and
+translates owner ids through a small remap table when they are read.
+Hex wrappers are created lazily and kept, so identity-based code (sets,
+dicts, `is`) keeps working on the view.
+
+Two remaps are provided:
+- swap:     the bot and player 1 trade places, everyone else is unchanged
+            (same result as swap_players(1, player_id));
+- rotation: owners are renumbered in turn order starting from the bot,
+            so every seat maps to the same canonical state. Bots that
+            share one policy should use this one.
+"""
+
+from typing import List, Optional, Sequence
+
+NEUTRAL = 0
+MAX_OWNER = 255  # Owner ids travel as one byte on the wire
+
+
+def swap_remap(player_id: int, target: int = 1) -> List[int]:
+    """Remap table exchanging player_id and target."""
+    remap = list(range(MAX_OWNER + 1))
+    remap[player_id], remap[target] = target, player_id
+    return remap
+
+
+def rotation_remap(player_id: int, num_players: int) -> List[int]:
+    """Remap table rotating seats so player_id becomes 1, the next player 2, ..."""
+    remap = list(range(MAX_OWNER + 1))
+    for owner in range(1, num_players + 1):
+        remap[owner] = (owner - player_id) % num_players + 1
+    return remap
+
+
+def invert_remap(remap: Sequence[int]) -> List[int]:
+    inverse = list(range(len(remap)))
+    for raw, seen in enumerate(remap):
+        inverse[seen] = raw
+    return inverse
+
+
+class HexView:
+    """One hex of the underlying board, with owner_id seen through the remap."""
+
+    __slots__ = ('_hex', '_view')
+
+    def __init__(self, hex_obj, view: 'PerspectiveView'):
+        self._hex = hex_obj
+        self._view = view
+
+    @property
+    def x(self) -> int:
+        return self._hex.x
+
+    @property
+    def y(self) -> int:
+        return self._hex.y
+
+    @property
+    def owner_id(self) -> int:
+        return self._view.remap[self._hex.owner_id]
+
+    @owner_id.setter
+    def owner_id(self, value: int):
+        self._hex.owner_id = self._view.inverse[value]
+
+    @property
+    def resident(self):
+        return self._hex.resident
+
+    @resident.setter
+    def resident(self, value):
+        self._hex.resident = value
+
+    @property
+    def money(self) -> int:
+        return self._hex.money
+
+    @money.setter
+    def money(self, value: int):
+        self._hex.money = value
+
+    def __repr__(self):
+        return f"HexView(x={self.x}, y={self.y}, owner={self.owner_id}, resident={self.resident}, money={self.money})"
+
+
+class _HexSequence:
+    """List-like access to the view's hexes, wrapping each one on first use."""
+
+    __slots__ = ('_view',)
+
+    def __init__(self, view: 'PerspectiveView'):
+        self._view = view
+
+    def __len__(self) -> int:
+        return len(self._view.board.hexes)
+
+    def __getitem__(self, i: int) -> HexView:
+        return self._view.wrap(i)
+
+    def __iter__(self):
+        wrap = self._view.wrap
+        for i in range(len(self._view.board.hexes)):
+            yield wrap(i)
+
+
+class PerspectiveView:
+    """
+    Board as seen by one player. Reads go through to the real board, so the
+    view stays valid while the board is updated in place.
+    """
+
+    def __init__(self, board, remap: Sequence[int]):
+        self.board = board
+        self.width = board.width
+        self.height = board.height
+        self.remap = list(remap)
+        self.inverse = invert_remap(self.remap)
+        self.hexes = _HexSequence(self)
+        self._wrapped: List[Optional[HexView]] = [None] * len(board.hexes)
+
+    @classmethod
+    def swapped(cls, board, player_id: int) -> 'PerspectiveView':
+        """View where player_id sees itself as player 1 (like swap_players)."""
+        return cls(board, swap_remap(player_id))
+
+    @classmethod
+    def canonical(cls, board, player_id: int, num_players: int) -> 'PerspectiveView':
+        """Seat-independent view: player_id is 1, the others follow in turn order."""
+        return cls(board, rotation_remap(player_id, num_players))
+
+    def wrap(self, i: int) -> HexView:
+        h = self._wrapped[i]
+        if h is None:
+            h = HexView(self.board.hexes[i], self)
+            self._wrapped[i] = h
+        return h
+
+    def get_hex(self, x: int, y: int) -> Optional[HexView]:
+        """Get hex at coordinates, or None if out of bounds."""
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            return None
+        return self.wrap(y * self.width + x)
+
+    def to_view_owner(self, owner_id: int) -> int:
+        return self.remap[owner_id]
+
+    def to_board_owner(self, owner_id: int) -> int:
+        return self.inverse[owner_id]
+
+    def owner_key(self) -> tuple:
+        """Owners of all hexes as this player sees them (for hashing canonical states)."""
+        remap = self.remap
+        return tuple(remap[h.owner_id] for h in self.board.hexes)
+
+    def __repr__(self):
+        return f"PerspectiveView({self.width}x{self.height}, {len(self.board.hexes)} hexes)"
@@ -0,0 +1,176 @@
+"""
+Per-phase timing of bot turns.
+
+Every bot turn is a fixed sequence of phases (move units, clear palms,
+extract the RL state, execute the chosen action, update the Q-table...).
+PhaseTimer records how long each call of each phase took and reports
+p50 / p95 / max per phase over the games since the last report, so a slow
+turn can be pinned on the phase that spent the time.
+
+Each phase keeps its call count, total and max exactly, and a uniform
+reservoir of at most RESERVOIR_SIZE durations for the percentiles, so a
+long training run never grows it. PHASES starts disabled; a runner that
+reports it turns it on (PHASE_TIMING in receiver.py, --phase-timing in
+train_headless.py).
+
+Phases are marked with a decorator (named after the method by default) or
+a with-block; both go through the module's PHASES timer:
+
+    @timed
+    def move_units(self, province, board, action_builder): ...
+
+    with PHASES.phase('q_update'):
+        policy.update(...)
+
+    PHASES.end_game()
+    print(PHASES.summary())   # with the [STATS] line, then PHASES.reset()
+
+Disabled (PHASES.enabled = False), the decorator costs one flag check per
+call and phase() returns a shared no-op context, so the marks stay in.
+"""
+
+import functools
+import math
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+REPORT_PHASES = 8  # Slowest phases (by total time) shown in summary()
+RESERVOIR_SIZE = 1024  # Durations kept per phase for the percentiles
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ('timer', 'name', 'started')
+
+    def __init__(self, timer: 'PhaseTimer', name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def percentile(ordered: List[float], share: float) -> float:
+    """Nearest-rank percentile of an ascending list (0.0 when empty)."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(share * len(ordered)))
+    return ordered[rank - 1]
+
+
+class _PhaseSamples:
+    """Exact calls / total / max, and a reservoir sample (algorithm R) of the durations."""
+
+    __slots__ = ('calls', 'total', 'max', 'reservoir')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.reservoir: List[float] = []
+
+    def add(self, seconds: float, rng: random.Random):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if len(self.reservoir) < RESERVOIR_SIZE:
+            self.reservoir.append(seconds)
+        else:
+            k = rng.randrange(self.calls)
+            if k < RESERVOIR_SIZE:
+                self.reservoir[k] = seconds
+
+
+class PhaseTimer:
+    """Call durations per phase, for the games since the last reset()."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.samples: Dict[str, _PhaseSamples] = {}
+        self.games = 0
+        self._rng = random.Random(0)  # Reservoir replacement, kept apart from the game's random
+
+    def phase(self, name: str):
+        """Context manager timing one call of phase `name`."""
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def record(self, name: str, seconds: float):
+        samples = self.samples.get(name)
+        if samples is None:
+            self.samples[name] = samples = _PhaseSamples()
+        samples.add(seconds, self._rng)
+
+    def end_game(self):
+        self.games += 1
+
+    def reset(self):
+        self.samples.clear()
+        self.games = 0
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """name -> calls, total, p50, p95, max (seconds)."""
+        stats = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples.reservoir)
+            stats[name] = {
+                'calls': samples.calls,
+                'total': samples.total,
+                'p50': percentile(ordered, 0.50),
+                'p95': percentile(ordered, 0.95),
+                'max': samples.max,
+            }
+        return stats
+
+    def summary(self, limit: int = REPORT_PHASES) -> str:
+        stats = self.get_stats()
+        if not stats:
+            return "Phases: no samples"
+        slowest = sorted(stats.items(), key=lambda item: item[1]['total'], reverse=True)[:limit]
+        parts = [f"{name} p50 {s['p50'] * 1000:.1f}ms p95 {s['p95'] * 1000:.1f}ms max {s['max'] * 1000:.1f}ms "
+                 f"({s['calls']} calls)" for name, s in slowest]
+        return f"Phases over {self.games} games: " + "; ".join(parts)
+
+
+PHASES = PhaseTimer()
+
+
+def timed(func: Optional[Callable] = None, *, name: Optional[str] = None):
+    """Time every call of func as a phase of PHASES (default name: Class.method)."""
+    def decorate(f: Callable) -> Callable:
+        phase_name = name or f.__qualname__
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if not PHASES.enabled:
+                return f(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                PHASES.record(phase_name, time.perf_counter() - started)
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
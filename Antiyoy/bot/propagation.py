@@ -0,0 +1,221 @@
+"""
+Depth-limited propagation maps, after PropagationCaster.java (AiMaster).
+
+A caster starts at one or more hexes with a value of `depth`. It spreads
+breadth-first, and each step lowers the value by one. Hexes at value 0 do
+not spread further. A step from src to dst only happens if the caster
+allows it. Water is never entered (null hexes in Java). As in Java:
+- every source starts at the full depth;
+- a hex keeps the first (highest) value that reaches it;
+- the hexes reached, apart from the sources, are what onHexReached saw.
+
+Java asks an isPropagationAllowed(src, dst) callback on every step.
+Here the common predicates are data:
+- into:       hexes that may be entered (e.g. "currently owned")
+- through:    hexes that may be left (e.g. "enemy land", for unit reach)
+- same_owner: only step between hexes of one owner (src.sameFraction(dst))
+
+PropagationGrid.cast() runs a list of casters in one call, each as a
+layered multi-source frontier over the shared neighbour table (a list per
+layer instead of Java's ArrayList.remove(0) queue), with the masks shared
+between casters built once by the caller. Results (values and parents)
+are the same as Java's FIFO order gives.
+
+    grid = PropagationGrid.from_board(board)
+    threat, support = grid.cast([Caster(enemy_units, 4, through=enemy_land),
+                                 Caster(my_units, 4, through=my_land)])
+    threat.values[i]   # 4 - steps from the nearest source, -1 if not reached
+
+InfluenceMaps bundles the casters the bots use every turn.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .engine import WATER, is_warrior
+from .game_utils import GameUtils
+from .hex_geometry import MOVE_LIMIT
+
+UNREACHED = -1
+
+
+class Caster:
+    """
+    One propagation.
+
+    sources:    hex indices that start with value `depth`
+    into/through: optional per-hex bool sequences (None = every land hex)
+    same_owner: only step to hexes with the owner of the hex stepped from
+    allow:      optional allow(src, dst) -> bool on top of the masks
+    """
+
+    __slots__ = ('sources', 'depth', 'into', 'through', 'same_owner', 'allow')
+
+    def __init__(self, sources: Sequence[int], depth: int, into: Optional[Sequence[bool]] = None,
+                 through: Optional[Sequence[bool]] = None, same_owner: bool = False,
+                 allow: Optional[Callable[[int, int], bool]] = None):
+        self.sources = list(sources)
+        self.depth = depth
+        self.into = into
+        self.through = through
+        self.same_owner = same_owner
+        self.allow = allow
+
+
+class CastResult:
+    """values[i]: depth minus steps from the nearest source (-1 = not reached); parents[i]: hex it was reached from."""
+
+    __slots__ = ('values', 'parents', 'depth', 'sources')
+
+    def __init__(self, values: List[int], parents: List[int], depth: int, sources: List[int]):
+        self.values = values
+        self.parents = parents
+        self.depth = depth
+        self.sources = sources
+
+    def steps(self, i: int) -> int:
+        """Steps from the nearest source, or -1 when not reached."""
+        v = self.values[i]
+        return self.depth - v if v >= 0 else UNREACHED
+
+    def reached(self) -> List[int]:
+        """Hexes reached from a source, sources excluded (Java's onHexReached calls)."""
+        sources = set(self.sources)
+        return [i for i, v in enumerate(self.values) if v >= 0 and i not in sources]
+
+    def path(self, i: int) -> List[int]:
+        """Hexes from i back to its source (empty when i was not reached)."""
+        if self.values[i] < 0:
+            return []
+        result = [i]
+        while self.parents[result[-1]] >= 0:
+            result.append(self.parents[result[-1]])
+        return result
+
+
+class PropagationGrid:
+    """Board layout (owners, land) that casters run on."""
+
+    def __init__(self, width: int, height: int, owner: Sequence[int], resident: Sequence[int]):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.owner = list(owner)
+        self.land = [int(r) != WATER for r in resident]
+        self.resident = [int(r) for r in resident]
+        self.neighbors = GameUtils.get_neighbor_table(width, height)
+
+    @classmethod
+    def from_board(cls, board) -> 'PropagationGrid':
+        return cls(board.width, board.height, [h.owner_id for h in board.hexes], [h.resident for h in board.hexes])
+
+    @classmethod
+    def from_engine(cls, engine) -> 'PropagationGrid':
+        return cls(engine.width, engine.height, engine.owner, engine.resident)
+
+    def owner_mask(self, player: int) -> List[bool]:
+        return [o == player for o in self.owner]
+
+    def cast(self, casters: Sequence[Caster]) -> List[CastResult]:
+        """Run every caster; results are in the same order."""
+        return [self._cast(c) for c in casters]
+
+    def _cast(self, caster: Caster) -> CastResult:
+        size = self.size
+        values = [UNREACHED] * size
+        parents = [UNREACHED] * size
+        neighbors = self.neighbors
+        enter = self.land
+        if caster.into is not None:
+            enter = [a and b for a, b in zip(self.land, caster.into)]
+        through = caster.through
+        owner = self.owner
+        same_owner = caster.same_owner
+        allow = caster.allow
+
+        value = caster.depth
+        frontier = []
+        for s in caster.sources:
+            if values[s] == UNREACHED:
+                values[s] = value
+                if through is None or through[s]:
+                    frontier.append(s)
+        while frontier and value > 0:
+            value -= 1
+            next_frontier = []
+            for h in frontier:
+                for n in neighbors[h]:
+                    if values[n] != UNREACHED or not enter[n]:
+                        continue
+                    if same_owner and owner[n] != owner[h]:
+                        continue
+                    if allow is not None and not allow(h, n):
+                        continue
+                    values[n] = value
+                    parents[n] = h
+                    if through is None or through[n]:
+                        next_frontier.append(n)
+            frontier = next_frontier
+        return CastResult(values, parents, caster.depth, caster.sources)
+
+
+class InfluenceMaps:
+    """
+    The per-turn casters of the Python bots for one player, cast in one batch:
+
+    threats[p]:     reach of enemy p's units this turn (through p's land, MOVE_LIMIT steps)
+    support:        our units' reach this turn (through our land)
+    expansion:      up to 3 steps out from our land into neutral land
+    enemy_distance: steps through our land to the nearest enemy hex (like DistanceField)
+    """
+
+    def __init__(self, grid: PropagationGrid, player: int):
+        self.grid = grid
+        self.player = player
+        owner = grid.owner
+        resident = grid.resident
+        size = grid.size
+        own = grid.owner_mask(player)
+        enemies = sorted({o for o in owner if o != 0 and o != player})
+        casters = []
+        for p in enemies:
+            land = grid.owner_mask(p)
+            units = [i for i in range(size) if land[i] and is_warrior(resident[i])]
+            casters.append(Caster(units, MOVE_LIMIT, through=land))
+        casters.append(Caster([i for i in range(size) if own[i] and is_warrior(resident[i])], MOVE_LIMIT, through=own))
+        casters.append(Caster([i for i in range(size) if own[i]], 3, into=[o == 0 or o == player for o in owner]))
+        casters.append(Caster([i for i in range(size) if owner[i] != 0 and not own[i]], size, into=own))
+
+        results = grid.cast(casters)
+        self.threats: Dict[int, CastResult] = dict(zip(enemies, results))
+        self.support, self.expansion, self.enemy_distance = results[len(enemies):]
+
+    def threat_level(self, i: int) -> int:
+        """Highest threat value on hex i (MOVE_LIMIT = next to an enemy unit), -1 if safe."""
+        owner = self.grid.owner[i]
+        return max((t.values[i] for p, t in self.threats.items() if p != owner), default=UNREACHED)
+
+    def threatened(self, i: int) -> bool:
+        """An enemy unit can reach hex i this turn."""
+        return self.threat_level(i) >= 0
+
+    def covered_threats(self, i: int) -> int:
+        """Hexes a tower on i would cover (i and its neighbours of the same owner) that an enemy unit can reach."""
+        owner = self.grid.owner
+        return sum(1 for j in (i, *self.grid.neighbors[i]) if owner[j] == owner[i] and self.threatened(j))
+
+    def supported(self, i: int) -> bool:
+        """One of our units can reach hex i this turn."""
+        return self.support.values[i] >= 0
+
+    def enemy_steps(self, i: int) -> int:
+        """Steps through our land to enemy land, -1 if there is no way."""
+        return self.enemy_distance.steps(i)
+
+    def stats(self) -> Dict[str, int]:
+        size = self.grid.size
+        own = self.grid.owner_mask(self.player)
+        return {
+            'threatened': sum(1 for i in range(size) if own[i] and self.threatened(i)),
+            'supported': sum(1 for v in self.support.values if v >= 0),
+            'expansion': sum(1 for v in self.expansion.values if v >= 0),
+        }
@@ -5,6 +5,7 @@ A province is a connected group of hexes owned by the same player.
 
 from typing import List, Optional, Set, Tuple, Dict
 from .game_utils import GameUtils, Resident, UNIT_PRICES, INCOME_TABLE, UNIT_STRENGTH
+from .movegen import MoveGenerator
 
 
 class Province:
@@ -171,6 +172,7 @@ class ProvinceManager:
         self.my_player_id = my_player_id
         self.my_provinces: List[Province] = []
         self.enemy_provinces: List[Province] = []
+        self._moves: Optional[MoveGenerator] = None
         self._detect_provinces()
     
     def _detect_provinces(self):
@@ -222,83 +224,35 @@ class ProvinceManager:
     
     def get_attackable_hexes(self, from_hex, strength: int) -> List:
         """
-        Get hexes that can be attacked from a position with given strength.
-        Returns enemy/neutral hexes adjacent to our territory that we can defeat.
+        Get hexes that the unit on from_hex (of this strength) can attack this turn.
+        Returns enemy/neutral hexes that Hexagon::possibleMovements accepts for it.
         """
-        attackable = []
-        
-        # Get all hexes reachable with this strength
-        reachable = self._get_move_zone(from_hex, strength)
-        
-        for h in reachable:
-            # Skip our own hexes
-            if h.owner_id == self.my_player_id:
-                continue
-            # Skip water
-            if GameUtils.is_water(h.resident):
-                continue
-            # Check if we can defeat the defense
-            if GameUtils.can_attack(strength, h, self.board):
-                attackable.append(h)
-        
-        return attackable
+        return [h for h in self.get_movements(from_hex) if h.owner_id != self.my_player_id]
     
-    def _get_move_zone(self, from_hex, strength: int) -> List:
-        """
-        Get all hexes a unit can move to.
-        Units can move to adjacent hexes they own, or attack adjacent enemy hexes.
-        """
-        reachable = []
-        visited = set()
-        
-        # BFS from starting position through owned territory
-        queue = [(from_hex.x, from_hex.y, 0)]  # x, y, distance
-        visited.add((from_hex.x, from_hex.y))
-        
-        while queue:
-            x, y, dist = queue.pop(0)
-            
-            neighbors = GameUtils.get_hex_neighbors(x, y, self.board.width, self.board.height)
-            for nx, ny in neighbors:
-                if (nx, ny) in visited:
-                    continue
-                
-                neighbor = self.board.get_hex(nx, ny)
-                if neighbor is None:
-                    continue
-                
-                visited.add((nx, ny))
-                
-                # Can always reach adjacent hexes
-                reachable.append(neighbor)
-                
-                # Continue BFS through our own territory (for multi-hop moves)
-                if neighbor.owner_id == self.my_player_id and not GameUtils.is_water(neighbor.resident):
-                    # Continue through friendly territory
-                    queue.append((nx, ny, dist + 1))
-        
-        return reachable
+    def get_movements(self, unit_hex) -> List:
+        """All hexes the unmoved warrior on unit_hex may move to (bot/movegen.py)."""
+        return self.moves.movements(unit_hex)
+    
+    @property
+    def moves(self) -> MoveGenerator:
+        """Move generator over this board, built on first use."""
+        if self._moves is None:
+            self._moves = MoveGenerator(self.board)
+        return self._moves
     
     def get_placeable_hexes(self, province: Province, strength: int) -> List:
         """
         Get hexes where we can place a new unit from the castle.
-        Must be reachable from castle and either empty friendly hex or attackable enemy hex.
+        Empty (or tree) friendly hexes, merges, and foreign hexes next to the
+        province that a warrior of this strength can take (Hexagon::possiblePlacements).
         """
         if not province.castle_hex:
             return []
-        
-        placeable = []
-        reachable = self._get_move_zone(province.castle_hex, strength)
-        
-        for h in reachable:
-            if h.owner_id == self.my_player_id:
-                # Can place on empty friendly hex or tree
-                if h.resident == Resident.Empty or GameUtils.is_tree(h.resident):
-                    placeable.append(h)
-            else:
-                # Can attack enemy hex if strong enough
-                if not GameUtils.is_water(h.resident) and GameUtils.can_attack(strength, h, self.board):
-                    placeable.append(h)
-        
-        return placeable
+        return self.moves.placements(province.castle_hex, strength)
+    
+    def get_placement_strengths(self, province: Province) -> List:
+        """(hex, weakest, strongest warrior that can be placed there) for all placements of the province."""
+        if not province.castle_hex:
+            return []
+        return self.moves.placement_strengths(province.castle_hex)
 
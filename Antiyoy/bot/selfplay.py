@@ -0,0 +1,182 @@
+"""
+Multiprocess self-play.
+
+Worker processes each run a BatchSimulator with a frozen copy of the
+policy (choose_action only) and stream batches of
+(state, action, reward, next_state, done) transitions to the learner,
+the process that owns the real policy. The learner applies
+EnhancedQTable.update to every transition, with the n-step window keyed
+by (worker, game, player) so batches that interleave many games never mix
+their returns, decays epsilon once per decay_every seconds (a
+per-game decay would still follow the workers' throughput), and every
+sync_every updates sends each worker a fresh snapshot
+(EnhancedQTable.to_dict) to play with.
+
+    pool = SelfPlayPool(policy, workers=7)
+    stats = pool.train(seconds=600)
+
+Simulation scales with the number of workers; the learner is a single
+process, so past a few workers its update rate is the limit.
+"""
+
+import multiprocessing
+import os
+import queue
+import time
+from typing import Callable, Dict, Optional
+
+from .batch_sim import BatchSimulator, SelfPlayCollector
+from .enhanced_qtable import EnhancedQTable
+
+
+def _policy_from_snapshot(snapshot: Dict) -> EnhancedQTable:
+    config = snapshot.get('config', {})
+    policy = EnhancedQTable(num_actions=config.get('num_actions', 5),
+                            n_step=config.get('n_step', 3),
+                            use_double=config.get('use_double', True),
+                            use_tiles=config.get('use_tiles', True))
+    policy.load_dict(snapshot)
+    return policy
+
+
+def _worker_main(worker_id: int, settings: Dict, snapshot: Dict, inbox, outbox, stop):
+    """Play, send transitions, pick up new snapshots; until stop is set."""
+    policy = _policy_from_snapshot(snapshot)
+    sim = BatchSimulator(settings['games'], settings['width'], settings['height'], settings['players'],
+                         seed=settings['seed'] + 7919 * worker_id, max_rounds=settings['max_rounds'])
+    batch = []
+    # Epsilon is the learner's (decay_every); the snapshot keeps the one it was sent with
+    collector = SelfPlayCollector(sim, policy, sink=lambda *t: batch.append(t), decay=False)
+    while not stop.is_set():
+        stats = collector.run(settings['chunk_turns'])
+        message = (worker_id, batch, stats['turns'], stats['games'])
+        while not stop.is_set():
+            try:
+                outbox.put(message, timeout=0.5)  # Blocks while the learner is behind
+                break
+            except queue.Full:
+                continue
+        batch = []  # The queued list is pickled later by the feeder thread, so don't reuse it
+
+        latest = None
+        while True:
+            try:
+                latest = inbox.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            collector.policy = _policy_from_snapshot(latest)
+
+
+class SelfPlayPool:
+    """
+    Self-play workers feeding one learner (the calling process).
+
+    policy:           EnhancedQTable to train (updated in place)
+    workers:          worker processes (default: all cores but one)
+    games_per_worker: size of each worker's BatchSimulator
+    chunk_turns:      lockstep turns per batch a worker sends
+    sync_every:       learner updates between snapshot broadcasts
+    decay_every:      seconds of training per epsilon decay step
+    """
+
+    def __init__(self, policy: EnhancedQTable, workers: Optional[int] = None, games_per_worker: int = 32,
+                 width: int = 14, height: int = 14, num_players: int = 2, chunk_turns: int = 4,
+                 sync_every: int = 5000, decay_every: float = 1.0, max_rounds: int = 200, seed: int = 0):
+        self.policy = policy
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.sync_every = sync_every
+        self.decay_every = decay_every
+        self.settings = {
+            'games': games_per_worker, 'width': width, 'height': height, 'players': num_players,
+            'chunk_turns': chunk_turns, 'max_rounds': max_rounds, 'seed': seed,
+        }
+        self.transitions = 0
+        self.turns = 0
+        self.games = 0
+        self.snapshots = 0
+
+    def train(self, transitions: Optional[int] = None, seconds: Optional[float] = None,
+              report_every: float = 10.0, on_report: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Run workers until `transitions` updates were applied or `seconds`
+        passed (at least one must be given). Returns the final stats.
+        """
+        if transitions is None and seconds is None:
+            raise ValueError("train() needs a transition count or a time limit")
+        # spawn: same behaviour on Windows (where the game runs) and Linux
+        ctx = multiprocessing.get_context("spawn")
+        stop = ctx.Event()
+        outbox = ctx.Queue(maxsize=2 * self.workers)
+        inboxes = [ctx.Queue() for _ in range(self.workers)]
+        snapshot = self.policy.to_dict()
+        processes = [ctx.Process(target=_worker_main, daemon=True,
+                                 args=(i, self.settings, snapshot, inboxes[i], outbox, stop))
+                     for i in range(self.workers)]
+        for p in processes:
+            p.start()
+
+        started = time.perf_counter()
+        last_report = started
+        last_decay = started
+        since_sync = 0
+        target = self.transitions + transitions if transitions is not None else None
+        update = self.policy.update
+        try:
+            while True:
+                now = time.perf_counter()
+                if seconds is not None and now - started >= seconds:
+                    break
+                if target is not None and self.transitions >= target:
+                    break
+                while now - last_decay >= self.decay_every:
+                    self.policy.decay_epsilon()
+                    last_decay += self.decay_every
+                try:
+                    worker_id, batch, turns, games = outbox.get(timeout=1.0)
+                except queue.Empty:
+                    if not any(p.is_alive() for p in processes):
+                        raise RuntimeError("All self-play workers died")
+                    continue
+                for state, action, reward, next_state, done, (game, player) in batch:
+                    update(state, action, reward, next_state, done, (worker_id, game, player))
+                self.transitions += len(batch)
+                self.turns += turns
+                self.games += games
+                since_sync += len(batch)
+                if since_sync >= self.sync_every:
+                    snapshot = self.policy.to_dict()
+                    for inbox in inboxes:
+                        inbox.put(snapshot)
+                    self.snapshots += 1
+                    since_sync = 0
+                if on_report and now - last_report >= report_every:
+                    on_report(self.stats(now - started))
+                    last_report = now
+        finally:
+            stop.set()
+            # Drain so workers blocked on put() can see the stop flag and exit
+            deadline = time.perf_counter() + 10.0
+            while any(p.is_alive() for p in processes) and time.perf_counter() < deadline:
+                try:
+                    outbox.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            for p in processes:
+                if p.is_alive():
+                    p.terminate()
+                p.join()
+        return self.stats(time.perf_counter() - started)
+
+    def stats(self, elapsed: float) -> Dict:
+        elapsed = max(elapsed, 1e-9)
+        return {
+            'workers': self.workers,
+            'transitions': self.transitions,
+            'transitions_per_sec': self.transitions / elapsed,
+            'turns': self.turns,
+            'turns_per_sec': self.turns / elapsed,
+            'games': self.games,
+            'snapshots': self.snapshots,
+            'elapsed': elapsed,
+        }
@@ -0,0 +1,94 @@
+"""
+One pass of situation analysis per province and turn.
+
+ImprovedAI and RLReadyAI look at the same things every turn: which of our
+hexes touch enemy land (the front line), which neutral hexes we could grab,
+which enemy warriors stand next to us and which front hexes nothing
+defends. SituationReport finds all of them in one walk over the province
+and its neighbours (flat indices, sets for membership), and the bots keep
+one report per province for the whole turn, for their moves, their
+spending and the RL state features.
+
+    report = SituationReport(board, province, player)
+    report.front_line        # our hexes next to enemy land, in province order
+    report.neutral_lands     # neutral land next to us, first seen first
+    report.enemy_threats     # (enemy warrior, strength) per hex of ours it touches
+    report.threat_level      # their summed strength
+    report.undefended_front  # front hexes with defense level 0
+"""
+
+from typing import Dict, List, Set, Tuple
+
+from .game_utils import GameUtils, Resident
+
+# Defense a building gives its hex and the hexes of its owner around it (GameUtils.get_defense_level)
+BUILDING_DEFENSE = {Resident.Castle: 1, Resident.Tower: 2, Resident.StrongTower: 3}
+
+
+class SituationReport:
+    """Front line, neutral land, threats and undefended front of one province."""
+
+    def __init__(self, board, province, player_id: int):
+        self.board = board
+        self.player_id = player_id
+        width = board.width
+        neighbors = GameUtils.get_neighbor_table(width, board.height)
+        cells: Dict[int, object] = {}
+
+        def cell(i: int):
+            h = cells.get(i)
+            if h is None:
+                h = cells[i] = board.get_hex(i % width, i // width)
+            return h
+
+        self.front_line: List = []
+        self.front: Set[int] = set()
+        self.neutral_lands: List = []
+        self.neutral: Set[int] = set()
+        self.enemy_threats: List[Tuple[object, int]] = []
+        self.threats: Set[int] = set()  # Enemy warriors next to us, each once
+        self.threat_level = 0
+        self.undefended_front: List = []
+
+        for h in province.hexes:
+            i = h.y * width + h.x
+            cells[i] = h
+            on_front = False
+            defense = BUILDING_DEFENSE.get(h.resident, 0)
+            if GameUtils.is_warrior(h.resident):
+                defense = GameUtils.get_warrior_strength(h.resident)
+            for n in neighbors[i]:
+                neighbor = cell(n)
+                owner = neighbor.owner_id
+                if GameUtils.is_water(neighbor.resident):
+                    continue
+                if owner == h.owner_id:
+                    defense = max(defense, BUILDING_DEFENSE.get(neighbor.resident, 0))
+                elif owner == 0:
+                    if n not in self.neutral:
+                        self.neutral.add(n)
+                        self.neutral_lands.append(neighbor)
+                elif owner != player_id:
+                    on_front = True
+                    if GameUtils.is_warrior(neighbor.resident):
+                        strength = GameUtils.get_warrior_strength(neighbor.resident)
+                        self.enemy_threats.append((neighbor, strength))
+                        self.threats.add(n)
+                        self.threat_level += strength
+            if on_front:
+                self.front_line.append(h)
+                self.front.add(i)
+                if defense == 0:
+                    self.undefended_front.append(h)
+
+    def undefended_share(self) -> float:
+        """Share of the front line with defense level 0 (0.0 without a front)."""
+        if not self.front_line:
+            return 0.0
+        return len(self.undefended_front) / len(self.front_line)
+
+    def on_front(self, hex_obj) -> bool:
+        return hex_obj.y * self.board.width + hex_obj.x in self.front
+
+    def is_neutral_target(self, hex_obj) -> bool:
+        return hex_obj.y * self.board.width + hex_obj.x in self.neutral
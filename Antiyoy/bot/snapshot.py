@@ -0,0 +1,225 @@
+"""
+Binary board snapshots and snapshot archives.
+
+A snapshot is exactly the BOARD socket message without its tag byte:
+
+    width (uint16), height (uint16)                       network byte order
+    width * height cells of 4 bytes, row by row:
+        ownerId (uint8), resident (uint8), money (uint16)
+
+so a board received from the game can be stored as-is, and anything that
+can decode the wire format can decode a snapshot.
+
+SnapshotArchive packs many snapshots into one file that is read through
+mmap, so a dataset of millions of positions is opened instantly and single
+boards are sliced out without unpickling anything:
+
+    magic "AYSNAP01"
+    records     snapshot bytes, back to back
+    index       per record: offset (uint64), tag (uint32)
+    footer      index offset (uint64), record count (uint64), magic
+"""
+
+import mmap
+import struct
+from typing import Iterator, List, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+BOARD_HEADER = struct.Struct("!HH")
+CELL_SIZE = 4
+ARCHIVE_MAGIC = b"AYSNAP01"
+INDEX_ENTRY = struct.Struct("!QI")
+FOOTER = struct.Struct("!QQ8s")
+
+
+# ==================== SINGLE BOARDS ====================
+
+def wire_money(money: int) -> int:
+    """money as Board::sendBoard stores it in the uint16: capped at 65535, negative amounts wrap like the C++ cast."""
+    return min(money, 0xFFFF) & 0xFFFF
+
+
+def board_to_bytes(board) -> bytes:
+    """Encode a board (anything with width, height and hexes) as a snapshot."""
+    data = bytearray(BOARD_HEADER.size + CELL_SIZE * len(board.hexes))
+    BOARD_HEADER.pack_into(data, 0, board.width, board.height)
+    offset = BOARD_HEADER.size
+    for h in board.hexes:
+        money = wire_money(h.money)
+        data[offset] = h.owner_id
+        data[offset + 1] = int(h.resident)
+        data[offset + 2] = money >> 8
+        data[offset + 3] = money & 0xFF
+        offset += CELL_SIZE
+    return bytes(data)
+
+
+def read_header(data, offset: int = 0) -> Tuple[int, int]:
+    """(width, height) of the snapshot starting at offset."""
+    return BOARD_HEADER.unpack_from(data, offset)
+
+
+def snapshot_size(width: int, height: int) -> int:
+    return BOARD_HEADER.size + CELL_SIZE * width * height
+
+
+def board_from_bytes(data, board_cls, hex_cls, resident_cls, offset: int = 0):
+    """
+    Decode a snapshot into board_cls(width, height) filled with
+    hex_cls(x, y, owner_id, resident_cls(resident), money).
+    """
+    width, height = BOARD_HEADER.unpack_from(data, offset)
+    if len(data) - offset < snapshot_size(width, height):
+        raise ValueError(f"Snapshot truncated: {width}x{height} board needs {snapshot_size(width, height)} bytes")
+
+    board = board_cls(width, height)
+    residents = [resident_cls(r) for r in range(len(resident_cls))]
+    pos = offset + BOARD_HEADER.size
+    for y in range(height):
+        for x in range(width):
+            money = (data[pos + 2] << 8) | data[pos + 3]
+            board.add_hex(hex_cls(x, y, data[pos], residents[data[pos + 1]], money))
+            pos += CELL_SIZE
+    return board
+
+
+# ==================== ARCHIVES ====================
+
+class SnapshotWriter:
+    """
+    Appends snapshots to an archive file. Records are buffered and written
+    in chunks; the index is written by close().
+    """
+
+    def __init__(self, path: str, chunk_size: int = 1 << 20):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._file = open(path, "wb")
+        self._file.write(ARCHIVE_MAGIC)
+        self._offset = len(ARCHIVE_MAGIC)
+        self._chunk = bytearray()
+        self._index = bytearray()
+        self.count = 0
+
+    def add(self, snapshot: bytes, tag: int = 0):
+        """Append one snapshot (board_to_bytes output or a raw BOARD payload). tag is free for the caller."""
+        self._index += INDEX_ENTRY.pack(self._offset + len(self._chunk), tag)
+        self._chunk += snapshot
+        self.count += 1
+        if len(self._chunk) >= self.chunk_size:
+            self._flush()
+
+    def add_board(self, board, tag: int = 0):
+        self.add(board_to_bytes(board), tag)
+
+    def _flush(self):
+        self._file.write(self._chunk)
+        self._offset += len(self._chunk)
+        self._chunk.clear()
+
+    def close(self):
+        if self._file is None:
+            return
+        self._flush()
+        self._file.write(self._index)
+        self._file.write(FOOTER.pack(self._offset, self.count, ARCHIVE_MAGIC))
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SnapshotArchive:
+    """
+    Read-only, memory-mapped view of an archive written by SnapshotWriter.
+    Slices and arrays returned by it point into the mapping, so drop them
+    before close().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a snapshot archive")
+        self._index_offset, self.count, magic = FOOTER.unpack_from(self._mm, len(self._mm) - FOOTER.size)
+        if magic != ARCHIVE_MAGIC:
+            self.close()
+            raise ValueError(f"{path} has no footer (writer not closed?)")
+        self._data = memoryview(self._mm)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def offset(self, i: int) -> int:
+        return INDEX_ENTRY.unpack_from(self._mm, self._index_offset + i * INDEX_ENTRY.size)[0]
+
+    def tag(self, i: int) -> int:
+        return INDEX_ENTRY.unpack_from(self._mm, self._index_offset + i * INDEX_ENTRY.size)[1]
+
+    def __getitem__(self, i: int) -> memoryview:
+        """Snapshot i as a zero-copy slice of the mapped file."""
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        start = self.offset(i)
+        width, height = BOARD_HEADER.unpack_from(self._mm, start)
+        return self._data[start:start + snapshot_size(width, height)]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        for i in range(self.count):
+            yield self[i]
+
+    def board(self, i: int, board_cls, hex_cls, resident_cls):
+        return board_from_bytes(self[i], board_cls, hex_cls, resident_cls)
+
+    def as_arrays(self):
+        """
+        All boards as one numpy structured array of shape (count, height, width)
+        with fields owner, resident, money. Zero-copy over the mapped file;
+        needs every board to have the same size.
+        """
+        if not HAS_NUMPY:
+            raise RuntimeError("as_arrays() needs numpy")
+        if self.count == 0:
+            return np.zeros((0, 0, 0), dtype=[('owner', 'u1'), ('resident', 'u1'), ('money', '>u2')])
+        first = self.offset(0)
+        width, height = BOARD_HEADER.unpack_from(self._mm, first)
+        record = snapshot_size(width, height)
+        for i in range(self.count):
+            if self.offset(i) != first + i * record or read_header(self._mm, first + i * record) != (width, height):
+                raise ValueError("as_arrays() needs boards of one size stored back to back")
+        cell = np.dtype([('owner', 'u1'), ('resident', 'u1'), ('money', '>u2')])
+        return np.ndarray((self.count, height, width), dtype=cell, buffer=self._mm,
+                          offset=first + BOARD_HEADER.size, strides=(record, CELL_SIZE * width, CELL_SIZE))
+
+    def tags(self) -> List[int]:
+        return [self.tag(i) for i in range(self.count)]
+
+    def close(self):
+        if getattr(self, '_data', None) is not None:
+            self._data.release()
+            self._data = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
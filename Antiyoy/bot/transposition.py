@@ -0,0 +1,105 @@
+"""
+Turn plans of positions seen before, keyed by (player, board hash).
+
+A board received from the game is the whole position (owners, residents,
+moved units and every province's money), so a bot that faced the same
+board before can send the plan it made then instead of calling make_move
+again. That happens on re-sent boards after a rejected batch (the plan
+stored for them is "end the turn", discarded once it was re-sent), in
+early-game provinces that look alike from game to game and on stalemate
+boards that repeat.
+
+TranspositionTable is a bounded LRU map from (player, board hash) to the
+plan (whatever the bot sends: ActionBuilder bytes in receiver.py) and its
+evaluation (None when the bot has none), with hit-rate stats:
+
+    table = TranspositionTable(4096)
+    key = position_key(player, board)
+    entry = table.get(key)
+    if entry is None:
+        plan = make_plan(board)
+        table.store(key, plan, evaluation)
+    else:
+        plan = entry.plan
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+DEFAULT_CAPACITY = 4096
+
+
+def position_key(player: int, board) -> Tuple[int, int]:
+    """(player, hash of the board's snapshot bytes, see bot/snapshot.py)"""
+    return player, hash(board.to_bytes())
+
+
+class TranspositionEntry:
+    __slots__ = ('plan', 'evaluation', 'hits')
+
+    def __init__(self, plan: Any, evaluation: Optional[float]):
+        self.plan = plan
+        self.evaluation = evaluation
+        self.hits = 0
+
+
+class TranspositionTable:
+    """Bounded LRU map of position keys to plans; the least recently used entry goes first."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._entries: 'OrderedDict[Hashable, TranspositionEntry]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[TranspositionEntry]:
+        """Entry stored under key (now the most recently used), None on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        entry.hits += 1
+        self.hits += 1
+        return entry
+
+    def store(self, key: Hashable, plan: Any, evaluation: Optional[float] = None):
+        """Store (or replace) the plan of key, evicting the least recently used entry when full."""
+        if self.capacity <= 0:
+            return
+        self._entries[key] = TranspositionEntry(plan, evaluation)
+        self._entries.move_to_end(key)
+        self.stores += 1
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+        }
+
+    def summary(self) -> str:
+        stats = self.get_stats()
+        return (f"Transpositions: {stats['hits']} hits / {stats['misses']} misses "
+                f"({stats['hit_rate'] * 100:.1f}%), {stats['entries']} stored")
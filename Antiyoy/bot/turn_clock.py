@@ -0,0 +1,111 @@
+"""
+Turn deadlines from the game's move time limit.
+
+The game gives every player maxMoveTimes[player] seconds per turn (sent in
+the configuration; a bot's timer starts right after its first board is
+sent) and ends the turn by itself when the time is up, dropping whatever
+the bot had not sent yet. TurnDeadline is that limit as seen by the bot,
+minus a safety margin for building and sending the actions; planners take
+deadline.end (or a share of what is left, deadline.at()) and return the best
+plan found so far when it passes.
+
+    clock = TurnClock()
+    deadline = clock.start(max_move_times[player - 1])   # on TURN_CHANGE
+    best = planner.plan(engine, deadline=deadline.at(0.8))
+    ...
+    clock.finish(deadline)                               # after END_TURN
+    print(clock.summary())
+"""
+
+import time
+from typing import Dict, Optional
+
+UNLIMITED = 2 ** 31  # The game sends -1 (as unsigned) for no limit
+DEFAULT_MOVE_TIME = 10  # BotPlayer default, seconds
+SAFETY_MARGIN = 0.5  # Seconds kept back for sending the actions
+SAFETY_SHARE = 0.1  # ... plus this share of the move time
+
+
+def turn_budget(max_move_time: Optional[int], margin: float = SAFETY_MARGIN,
+                share: float = SAFETY_SHARE) -> Optional[float]:
+    """Seconds the bot may plan for, or None when the game sets no limit."""
+    if max_move_time is None or max_move_time >= UNLIMITED:
+        return None
+    return max(0.0, max_move_time * (1.0 - share) - margin)
+
+
+class TurnDeadline:
+    """Planning deadline of one turn (budget None = no limit)."""
+
+    __slots__ = ('budget', 'started', 'end', 'used')
+
+    def __init__(self, budget: Optional[float]):
+        self.budget = budget
+        self.started = time.perf_counter()
+        self.end = None if budget is None else self.started + budget
+        self.used: Optional[float] = None  # Set by TurnClock.finish()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def remaining(self) -> float:
+        if self.end is None:
+            return float('inf')
+        return max(0.0, self.end - time.perf_counter())
+
+    def expired(self) -> bool:
+        return self.end is not None and time.perf_counter() >= self.end
+
+    def at(self, share: float) -> Optional[float]:
+        """perf_counter() time when `share` of the remaining budget has passed (None = no limit)."""
+        if self.end is None:
+            return None
+        now = time.perf_counter()
+        return now + max(0.0, self.end - now) * share
+
+
+class TurnClock:
+    """Starts turn deadlines and records how much of each budget was used."""
+
+    def __init__(self, margin: float = SAFETY_MARGIN, share: float = SAFETY_SHARE):
+        self.margin = margin
+        self.share = share
+        self.turns = 0
+        self.total_used = 0.0
+        self.total_budget = 0.0
+        self.budgeted_used = 0.0  # Time used in turns that had a limit
+        self.max_fraction = 0.0
+        self.overruns = 0
+
+    def start(self, max_move_time: Optional[int]) -> TurnDeadline:
+        return TurnDeadline(turn_budget(max_move_time, self.margin, self.share))
+
+    def finish(self, deadline: TurnDeadline) -> float:
+        """Record the turn once (later calls for the same deadline are ignored); returns seconds used."""
+        if deadline.used is not None:
+            return deadline.used
+        deadline.used = deadline.elapsed()
+        self.turns += 1
+        self.total_used += deadline.used
+        if deadline.budget is not None:
+            self.total_budget += deadline.budget
+            self.budgeted_used += deadline.used
+            fraction = deadline.used / deadline.budget if deadline.budget else 1.0
+            self.max_fraction = max(self.max_fraction, fraction)
+            if deadline.used > deadline.budget:
+                self.overruns += 1
+        return deadline.used
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            'turns': self.turns,
+            'avg_used': self.total_used / self.turns if self.turns else 0.0,
+            'budget_used': self.budgeted_used / self.total_budget if self.total_budget else 0.0,
+            'max_fraction': self.max_fraction,
+            'overruns': self.overruns,
+        }
+
+    def summary(self) -> str:
+        stats = self.get_stats()
+        return (f"Turn time: {stats['avg_used']:.2f}s avg, {stats['budget_used'] * 100:.0f}% of budget "
+                f"(max {stats['max_fraction'] * 100:.0f}%), {stats['overruns']} overruns")
@@ -5,6 +5,10 @@ import select
 
 from enum import IntEnum
 
+from bot.board_render import BoardRenderer
+from bot.phase_timer import PHASES
+from bot.snapshot import board_to_bytes, board_from_bytes
+
 # Nazewnictwo i kolejność odpowiadają tym z gry, ich zmiana może uszkodzić rozczytywanie planszy
 class Resident(IntEnum):
     Water = 0 # Woda liczy się jako rezydent
@@ -59,6 +63,14 @@ class Board:
 
     def __repr__(self):
         return f"Board({self.width}x{self.height}, {len(self.hexes)} hexes)"
+
+    def to_bytes(self) -> bytes:
+        """Snapshot in the BOARD message layout (header + 4 bytes per hex), see bot/snapshot.py"""
+        return board_to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return board_from_bytes(data, cls, Hex, Resident)
     
     def print_owners(self):
         print("Owners:")
@@ -195,24 +207,8 @@ def receive_board() -> Board:
 
     data = recv_size(sock, data_size)
 
-    board = Board(width, height)
-
-    offset = 0
-    for y in range(height):
-        for x in range(width):
-            owner_id = data[offset]
-            resident_raw = data[offset + 1]
-            money_raw = struct.unpack_from("!H", data, offset + 2)[0]
-
-            resident = Resident(resident_raw)
-            money = money_raw
-
-            hexagon = Hex(x, y, owner_id, resident, money)
-            board.add_hex(hexagon)
-
-            offset += 4
-
-    return board
+    # Nagłówek + dane to dokładnie format snapshotu (bot/snapshot.py)
+    return Board.from_bytes(header + data)
 
 def receive_action():
     """
@@ -515,7 +511,9 @@ if len(sys.argv) >= 3:
 
 
 currentBotPlayer = 0
-
+board_renderer = BoardRenderer(every=1) # Zrzuty planszy do debugowania (every=N wypisuje co N-tą planszę)
+PHASE_TIMING = True # Czasy faz tury botów (bot/phase_timer.py), p50/p95/max wypisywane po każdej grze
+PHASES.enabled = PHASE_TIMING
 
 sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 try:
@@ -555,6 +553,7 @@ try:
 
         print("Configuration received:") # Można coś zrobić z konfiguracją
         print(payload)
+        numPlayers = len(payload["playerMarkers"])
 
         while True: # Pętla meczu
             tag, payload = receive_next()
@@ -573,18 +572,15 @@ try:
                 print(f"Playing as Player {payload}")
 
             elif tag == BOARD_SOCKET_TAG: # Kiedy otrzymamy planszę to wykonujemy ruch
-                print(payload)
-                payload.print_owners()
-                payload.print_residents()
-                payload.print_money()
+                board_renderer.maybe_dump(payload)
 
-                if currentBotPlayer != 1:
-                    payload.swap_players(1, currentBotPlayer) # Dla ułatwienia trenowania AI zawsze widzi siebie jako 1 
+                # Dla ułatwienia trenowania AI zawsze widzi siebie jako 1 (widok, plansza nie jest przepisywana)
+                from bot import SimpleAI, PerspectiveView
+                view = PerspectiveView.canonical(payload, currentBotPlayer, numPlayers)
 
                 # Run the AI
-                from bot import SimpleAI
                 ab = ActionBuilder()
-                ai = SimpleAI(payload, 1, ab, receive_func=receive_next, debug=True)  # Player 1 (after swap)
+                ai = SimpleAI(view, 1, ab, receive_func=receive_next, debug=True)  # Player 1 (in the view)
                 ai.make_move()
                 
                 # The AI sends end_turn at the end, we need to receive final confirmation
@@ -599,6 +595,10 @@ try:
                 print("Game over!\nLeaderboard:")
                 for p in payload:
                     print(f"Player {p}")
+                PHASES.end_game()
+                if PHASES.enabled:
+                    print(f"[STATS] {PHASES.summary()}")
+                    PHASES.reset()
                 break # Koniec gry wyciąga nas z tej pętli (zaczynamy nowy mecz, oczekujemy nowej konfiguracji)
 
 except Exception as e:
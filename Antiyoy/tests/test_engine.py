@@ -0,0 +1,228 @@
+"""
+Regression tests for the headless rules engine (bot/engine.py).
+
+Small hand-made boards pin the rules ported from board.cpp (allows,
+possibleMovements, nextTurn), fixed seeds pin whole generated games, and
+random action sequences check that begin() / rollback() leave no trace.
+
+    python -m pytest Antiyoy/tests
+"""
+
+import hashlib
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bot.engine import (ACTION_MOVE, ACTION_PLACE, CASTLE, EMPTY, FARM, GRAVESTONE, PALM, PINE,  # noqa: E402
+                        STRONG_TOWER, TOWER, WARRIOR1, WATER, Engine, is_unmoved, moved)
+
+CODES = {'~': WATER, '.': EMPTY, 'C': CASTLE, 'F': FARM, 'T': TOWER, 'S': STRONG_TOWER,
+         'P': PALM, 'p': PINE, 'G': GRAVESTONE, '1': WARRIOR1, '2': WARRIOR1 + 1,
+         '3': WARRIOR1 + 2, '4': WARRIOR1 + 3}
+
+
+def make_engine(rows, money=None, num_players=2):
+    """
+    Engine from rows of cells "<owner><code>" ("1C" castle of player 1,
+    "0." neutral land, "~~" water). money: {castle (x, y): money}, 10 by default.
+    """
+    cells = [row.split() for row in rows]
+    engine = Engine(len(cells[0]), len(cells), num_players, seed=0)
+    for y, row in enumerate(cells):
+        for x, cell in enumerate(row):
+            i = engine.index(x, y)
+            engine.resident[i] = CODES[cell[1]]
+            if cell[1] != '~':
+                engine.owner[i] = int(cell[0])
+            if engine.resident[i] == CASTLE:
+                engine.castles[engine.owner[i]][i] = (money or {}).get((x, y), 10)
+    return engine
+
+
+def state(engine):
+    return (engine.to_bytes(), [dict(c) for c in engine.castles], list(engine.temp_money),
+            engine.current_player, engine.round, engine.turn, engine.first_round,
+            list(engine.leaderboard), engine.rng.getstate())
+
+
+# ==================== RULES ====================
+
+# Row 0 is a chain of hexes (odd-q: (x, 0) touches (x + 1, 0)), row 1 is water
+LINE = [
+    "1C 1. 1. 1. 1. 1. 2. 2T 2C",
+    "~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~",
+]
+
+
+def test_allows_defended_hex_needs_one_more_than_its_defenders():
+    engine = make_engine(LINE)
+    target = engine.index(6, 0)  # Next to player 2's tower (power 2)
+    assert not engine.allows(target, WARRIOR1, 1)
+    assert not engine.allows(target, WARRIOR1 + 1, 1)
+    assert engine.allows(target, WARRIOR1 + 2, 1)
+    assert not engine.allows(engine.index(7, 0), WARRIOR1 + 1, 1)  # The tower itself
+    assert engine.allows(engine.index(7, 0), WARRIOR1 + 2, 1)
+    engine.resident[engine.index(7, 0)] = STRONG_TOWER
+    assert not engine.allows(target, WARRIOR1 + 2, 1)
+    assert engine.allows(target, WARRIOR1 + 3, 1)  # A Warrior4 beats every defender
+    assert not engine.allows(engine.index(0, 0), WARRIOR1 + 3, 1)  # Own castle
+
+
+def test_allows_merges_on_own_land_up_to_four():
+    engine = make_engine(["1C 13 11 1.", "~~ ~~ ~~ ~~"])
+    assert engine.allows(engine.index(1, 0), WARRIOR1, 1)
+    assert not engine.allows(engine.index(1, 0), WARRIOR1 + 1, 1)
+    assert engine.allows(engine.index(2, 0), WARRIOR1 + 2, 1)
+    assert not engine.allows(engine.index(0, 0), WARRIOR1, 1)  # Castle
+    assert not engine.allows(engine.index(3, 0), moved(WARRIOR1), 1)  # Moved warriors stay
+
+
+def test_possible_movements_walk_four_own_hexes_and_touch_the_border():
+    engine = make_engine([
+        "11 1. 1. 1. 1. 1. 0. 1C",
+        "~~ ~~ ~~ ~~ ~~ ~~ ~~ ~~",
+    ])
+    reach = sorted(engine.possible_movements(engine.index(0, 0)))
+    assert reach == [engine.index(x, 0) for x in range(1, 5)]  # (5, 0) is 5 steps away
+    engine = make_engine([
+        "1C 11 1. 1. 0. 2. 2C",
+        "~~ ~~ ~~ ~~ ~~ ~~ ~~",
+    ])
+    assert sorted(engine.possible_movements(engine.index(1, 0))) == [engine.index(x, 0) for x in (2, 3, 4)]
+    engine.resident[engine.index(1, 0)] = moved(WARRIOR1)
+    assert engine.possible_movements(engine.index(1, 0)) == []
+
+
+def test_next_turn_pays_income_and_wakes_units():
+    engine = make_engine([
+        "1C 1F 11 1. 2. 2C",
+        "~~ ~~ ~~ ~~ ~~ ~~",
+    ], money={(0, 0): 10, (5, 0): 3})
+    engine.first_round = False
+    engine.resident[engine.index(2, 0)] = moved(WARRIOR1)
+    engine.next_turn()  # Player 1 -> 2
+    assert engine.current_player == 2
+    assert engine.castles[2][engine.index(5, 0)] == 3 + 2
+    engine.next_turn()  # Player 2 -> 1, new round
+    assert engine.current_player == 1 and engine.round == 2
+    # Castle 1 + farm 5 + warrior -1 + empty 1
+    assert engine.castles[1][engine.index(0, 0)] == 10 + 1 + 5 - 1 + 1
+    assert is_unmoved(engine.resident[engine.index(2, 0)])
+
+
+def test_next_turn_bankrupt_army_becomes_gravestones_then_trees():
+    engine = make_engine([
+        "1C 14 1. 2. 2C",
+        "~~ ~~ ~~ ~~ ~~",
+    ], money={(0, 0): 0, (4, 0): 10})
+    engine.first_round = False
+    engine.current_player = 2
+    engine.next_turn()
+    unit = engine.index(1, 0)
+    assert engine.resident[unit] == GRAVESTONE
+    assert engine.castles[1][engine.index(0, 0)] == 0
+    engine.next_turn()
+    engine.next_turn()
+    assert engine.resident[unit] in (PALM, PINE)
+
+
+def test_move_conquers_and_leaves_the_unit_moved():
+    engine = make_engine([
+        "1C 13 2. 2. 2C",
+        "~~ ~~ ~~ ~~ ~~",
+    ])
+    assert engine.move(engine.index(1, 0), engine.index(2, 0))
+    assert engine.owner[engine.index(2, 0)] == 1
+    assert engine.resident[engine.index(2, 0)] == moved(WARRIOR1 + 2)
+    assert engine.resident[engine.index(1, 0)] == EMPTY
+    assert not engine.move(engine.index(2, 0), engine.index(3, 0))  # Already moved
+
+
+# ==================== FIXED SEEDS ====================
+
+def greedy_bot(engine):
+    """Deterministic turn: every castle buys Peasants onto foreign land, every unit attacks."""
+    player = engine.current_player
+    actions = []
+    for castle in sorted(engine.castles[player]):
+        for i in sorted(engine.possible_placements(castle, WARRIOR1)):
+            if engine.owner[i] != player and engine.castles[player].get(castle, 0) >= 10:
+                if engine.place(castle, WARRIOR1, i):
+                    actions.append((ACTION_PLACE, WARRIOR1, castle, i))
+                break
+    for i in range(engine.size):
+        if engine.owner[i] == player and is_unmoved(engine.resident[i]):
+            for t in sorted(engine.possible_movements(i)):
+                if engine.owner[t] != player and engine.move(i, t):
+                    actions.append((ACTION_MOVE, i, t))
+                    break
+    engine.next_turn()
+    return actions
+
+
+def play(seed, rounds=30):
+    engine = Engine.new_game(12, 12, 2, seed=seed)
+    actions = 0
+    while engine.round <= rounds and not engine.is_game_over():
+        actions += len(greedy_bot(engine))
+    return engine, actions
+
+
+# (seed) -> (sha1 of the final snapshot, actions played, leaderboard); update only on deliberate rule changes
+GOLDEN = {
+    1: ('eb8769f7ba2fe5187d2eb8cd81722e8e9d148bf0', 67, []),
+    2: ('aba8cab88d3147f9521780b0a63367c11dbd1093', 58, []),
+    3: ('e8e117f2fa8b773ea2c5525d25e294df03a850b4', 67, []),
+}
+
+
+def test_fixed_seeds_replay_the_same_games():
+    for seed, (digest, actions, leaderboard) in GOLDEN.items():
+        engine, played = play(seed)
+        assert (hashlib.sha1(engine.to_bytes()).hexdigest(), played, engine.leaderboard) == \
+            (digest, actions, leaderboard), seed
+
+
+def test_same_seed_same_map():
+    assert Engine.new_game(16, 16, 3, seed=7).to_bytes() == Engine.new_game(16, 16, 3, seed=7).to_bytes()
+
+
+# ==================== JOURNAL ====================
+
+def test_rollback_restores_state():
+    rng = random.Random(1)
+    for seed in range(5):
+        engine, _ = play(seed, rounds=3)
+        before = state(engine)
+        mark = engine.begin()
+        for _ in range(4):  # Random legal actions and whole turns, like the searches do
+            player = engine.current_player
+            for i in range(engine.size):
+                if engine.owner[i] == player and is_unmoved(engine.resident[i]):
+                    reach = engine.possible_movements(i)
+                    if reach:
+                        engine.move(i, rng.choice(reach))
+            for castle in list(engine.castles[player]):
+                spots = engine.possible_placements(castle, WARRIOR1)
+                if spots:
+                    engine.place(castle, WARRIOR1, rng.choice(spots))
+            engine.next_turn()
+        assert state(engine) != before
+        engine.rollback(mark)
+        assert state(engine) == before
+        assert engine._journal is None
+
+
+def test_nested_commit_keeps_inner_changes_until_outer_rollback():
+    engine, _ = play(3, rounds=2)
+    before = state(engine)
+    outer = engine.begin()
+    inner = engine.begin()
+    greedy_bot(engine)
+    engine.commit(inner)
+    after_inner = state(engine)
+    assert after_inner != before
+    engine.rollback(outer)
+    assert state(engine) == before
@@ -0,0 +1,45 @@
+"""
+N-step updates of EnhancedQTable (bot/enhanced_qtable.py) with interleaved trajectories.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bot.enhanced_qtable import EnhancedQTable  # noqa: E402
+
+
+def recording_policy():
+    policy = EnhancedQTable(num_actions=2, discount=0.5, n_step=2, use_tiles=False)
+    targets = []
+    policy._update_q_value = lambda state, action, target: targets.append((state[0], target))
+    policy._replay_update = lambda batch_size=32: None
+    return policy, targets
+
+
+def test_interleaved_trajectories_keep_their_own_returns():
+    policy, targets = recording_policy()
+    # Game A: rewards 1, 1, then done with 10; game B: rewards 100, then done with -10
+    policy.update([0.0], 0, 1.0, [0.1], False, trajectory='A')
+    policy.update([0.5], 0, 100.0, [0.6], False, trajectory='B')
+    policy.update([0.1], 0, 1.0, [0.2], False, trajectory='A')
+    policy.update([0.6], 0, -10.0, [0.6], True, trajectory='B')
+    policy.update([0.2], 0, 10.0, [0.2], True, trajectory='A')
+    assert targets == [
+        (0.0, 1.0 + 0.5 * 1.0),           # A's first window (Q of the bootstrap state is 0)
+        (0.5, 100.0 + 0.5 * -10.0),       # B ends: both of its states, never A's rewards
+        (0.6, -10.0),
+        (0.1, 1.0 + 0.5 * 10.0),          # A ends
+        (0.2, 10.0),
+    ]
+    assert policy.n_step_buffers == {}
+
+
+def test_done_of_one_trajectory_keeps_the_others_window():
+    policy, targets = recording_policy()
+    policy.update([0.0], 0, 1.0, [0.1], False, trajectory='A')
+    policy.update([0.5], 0, 5.0, [0.5], True, trajectory='B')
+    assert list(policy.n_step_buffers) == ['A']
+    policy.update([0.1], 0, 2.0, [0.2], False, trajectory='A')
+    assert targets[-1] == (0.0, 1.0 + 0.5 * 2.0)
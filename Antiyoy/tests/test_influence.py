@@ -0,0 +1,54 @@
+"""
+Influence maps (bot/propagation.py) in the RL bot's tower placement.
+"""
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, os.path.join(HERE, '..', '..'))
+
+import receiver as R  # noqa: E402
+from bot.engine import CASTLE, EMPTY, WARRIOR1, Engine  # noqa: E402
+
+
+def front_board(enemy_unit):
+    """
+    Our province in columns 1-7, neutral land in column 0, player 2's
+    province in column 8 (castle on top, a Peasant in the middle if enemy_unit).
+    """
+    engine = Engine(9, 5, 2, seed=0)
+    for y in range(5):
+        for x in range(9):
+            i = engine.index(x, y)
+            engine.resident[i] = EMPTY
+            engine.owner[i] = 0 if x == 0 else 2 if x == 8 else 1
+    engine.resident[engine.index(4, 2)] = CASTLE
+    engine.castles[1][engine.index(4, 2)] = 50
+    engine.resident[engine.index(8, 0)] = CASTLE
+    engine.castles[2][engine.index(8, 0)] = 10
+    if enemy_unit:
+        engine.resident[engine.index(8, 2)] = WARRIOR1
+    return engine.to_board(R.Board, R.Hex, R.Resident)
+
+
+def tower_location(board):
+    province = next(p for p in board.get_provinces(1) if p.capital)
+    h = R.AiRL(1, R.QTablePolicy(num_actions=5)).find_best_tower_location(province, board)
+    return h.x, h.y
+
+
+def test_covered_threats_counts_hexes_enemy_units_reach():
+    board = front_board(enemy_unit=True)
+    influence = board.get_influence(1)
+    assert influence.covered_threats(board.width * 3 + 7) > 0
+    assert influence.covered_threats(board.width * 1 + 1) == 0
+    assert front_board(enemy_unit=False).get_influence(1).covered_threats(board.width * 3 + 7) == 0
+
+
+def test_tower_goes_where_enemy_units_can_reach():
+    # Same defense gain on both fronts: without a unit the first candidate wins,
+    # with one the tower moves next to it
+    assert tower_location(front_board(enemy_unit=False))[0] == 1
+    assert tower_location(front_board(enemy_unit=True))[0] == 7
@@ -4,6 +4,7 @@ import struct
 import select
 import random
 import math
+import time
 from collections import deque
 
 from enum import IntEnum
@@ -18,6 +19,29 @@ except ImportError:
     HAS_ENHANCED_QTABLE = False
     print("[RL] Enhanced Q-table not available, using simple Q-table")
 
+# Shared board tools from the bot package (Antiyoy/bot)
+sys.path.insert(0, 'Antiyoy')
+from bot.distance_field import DistanceField
+from bot.propagation import InfluenceMaps, PropagationGrid
+from bot.defense import DefensePlanner
+from bot.attack import AttackTable
+from bot.movegen import MoveGenerator
+from bot.merge_planner import MergePlanner
+from bot.farm_sites import FarmSites
+from bot.board_cache import BoardCache
+from bot.board_render import BoardRenderer
+from bot.snapshot import board_to_bytes, board_from_bytes
+from bot.game_utils import GameUtils
+from bot.engine import Engine
+from bot.mcts import MCTSPlanner, TurnModel, q_prior
+from bot.turn_clock import TurnClock, DEFAULT_MOVE_TIME
+from bot.transposition import TranspositionTable, position_key
+from bot.phase_timer import PHASES, timed
+from bot.beam_search import BeamSearch, add_to_builder, plan_turn
+from bot.local_state import LocalState, TrackedActionBuilder
+from bot.assignment import assign
+from bot.ladder import make_ladder_ai
+
 # Force unbuffered output
 import functools
 _original_print = functools.partial(print, flush=True)
@@ -117,10 +141,16 @@ class Board:
         self.width = width
         self.height = height
         self.hexes = []
+        self.cache = BoardCache()  # Derived queries, dropped by touch()
 
     def add_hex(self, hexagon):
+        """While the board is built; the builder invalidates the cache once at the end"""
         self.hexes.append(hexagon)
 
+    def touch(self):
+        """Call after changing any hex so memoized queries get recomputed"""
+        self.cache.invalidate()
+
     def get_hex(self, x, y):
         if 0 <= x < self.width and 0 <= y < self.height:
             return self.hexes[y * self.width + x]
@@ -128,6 +158,16 @@ class Board:
 
     def __repr__(self):
         return f"Board({self.width}x{self.height}, {len(self.hexes)} hexes)"
+
+    def to_bytes(self) -> bytes:
+        """Snapshot in the BOARD message layout (header + 4 bytes per hex), see bot/snapshot.py"""
+        return board_to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        board = board_from_bytes(data, cls, Hex, Resident)
+        board.touch()  # Once for the whole board, not per add_hex()
+        return board
     
     def print_owners(self):
         print("Owners:")
@@ -165,8 +205,12 @@ class Board:
                 h.owner_id = id2
             elif h.owner_id == id2:
                 h.owner_id = id1
+        self.touch()
 
     def get_provinces(self, player_id):
+        return self.cache.memo(('provinces', player_id), lambda: self._find_provinces(player_id))
+
+    def _find_provinces(self, player_id):
         provinces = []
         visited = set()
         
@@ -186,6 +230,63 @@ class Board:
                 provinces.append(Province(province_hexes, self))
         return provinces
 
+    def get_perimeter_mask(self, player_id):
+        """For every hex (flat index): does it border land not owned by player_id"""
+        def compute():
+            hexes = self.hexes
+            neighbors = GameUtils.get_neighbor_table(self.width, self.height)
+            return [any(hexes[n].owner_id != player_id and hexes[n].resident != Resident.Water
+                        for n in neighbors[i])
+                    for i in range(len(hexes))]
+        return self.cache.memo(('perimeter', player_id), compute)
+
+    def get_tower_cover_mask(self):
+        """For every hex (flat index): is it next to a tower of its own owner"""
+        def compute():
+            hexes = self.hexes
+            neighbors = GameUtils.get_neighbor_table(self.width, self.height)
+            return [any(hexes[n].owner_id == h.owner_id and
+                        (hexes[n].resident == Resident.Tower or hexes[n].resident == Resident.StrongTower)
+                        for n in neighbors[i])
+                    for i, h in enumerate(hexes)]
+        return self.cache.memo(('tower_cover',), compute)
+
+    def get_grid(self):
+        """Flat owners / residents for the casters in bot/propagation.py"""
+        return self.cache.memo(('grid',), lambda: PropagationGrid.from_board(self))
+
+    def get_influence(self, player_id):
+        """Threat / support / expansion maps for player_id (bot/propagation.py), cast once per board version"""
+        return self.cache.memo(('influence', player_id), lambda: InfluenceMaps(self.get_grid(), player_id))
+
+    def get_defense(self, player_id):
+        """Enemy threat groups and ranked answers for player_id (bot/defense.py), once per board version"""
+        return self.cache.memo(('defense', player_id), lambda: DefensePlanner(self.get_grid(), player_id))
+
+    def get_move_generator(self):
+        """Exact possibleMovements / possiblePlacements of this board (bot/movegen.py)"""
+        return self.cache.memo(('movegen',), lambda: MoveGenerator(self))
+
+    def get_merge_planner(self, player_id):
+        """Every merge player_id's unmoved warriors can make, with its upkeep (bot/merge_planner.py)"""
+        return self.cache.memo(('merges', player_id), lambda: MergePlanner(self.get_grid(), player_id))
+
+    def get_attack_table(self, player_id):
+        """Capture strength, value and reachable attackers of every hex for player_id (bot/attack.py)"""
+        return self.cache.memo(('attack', player_id), lambda: AttackTable(self.get_grid(), player_id))
+
+    def get_owner_counts(self):
+        """owner_id -> [hexes, units], for the reward path and state features"""
+        def compute():
+            counts = {}
+            for h in self.hexes:
+                c = counts.setdefault(h.owner_id, [0, 0])
+                c[0] += 1
+                if h.resident.is_unit():
+                    c[1] += 1
+            return counts
+        return self.cache.memo(('owner_counts',), compute)
+
 
 class Province:
     def __init__(self, hex_list, board):
@@ -194,6 +295,7 @@ class Province:
         self.capital = self._find_capital()
         self.money = self.capital.money if self.capital else 0
         self.fraction = self.hex_list[0].owner_id if self.hex_list else 0
+        self._farm_count = None  # Counted once, then kept by add_farm()
 
     def _find_capital(self):
         for h in self.hex_list:
@@ -213,12 +315,11 @@ class Province:
     
     def get_current_farm_price(self):
         """Calculate current farm price - increases with each farm"""
-        farm_count = sum(1 for h in self.hex_list if h.resident == Resident.Farm)
-        return 15 + farm_count * 6
+        return 15 + self.get_farm_count() * 6
     
     def get_extra_farm_cost(self):
         """Calculate extra upkeep cost from farms - used to limit farm spam"""
-        farm_count = sum(1 for h in self.hex_list if h.resident == Resident.Farm)
+        farm_count = self.get_farm_count()
         if farm_count <= 1:
             return 0
         # Each farm beyond the first costs 6 extra upkeep
@@ -227,24 +328,72 @@ class Province:
     def get_units(self):
         return [h for h in self.hex_list if h.resident.is_unit()]
 
+    def _cache_key(self, name):
+        # Provinces don't overlap, so the first hex identifies one within a board version
+        first = self.hex_list[0]
+        return (name, first.x, first.y)
+
+    def get_farm_count(self):
+        if self._farm_count is None:
+            self._farm_count = sum(1 for h in self.hex_list if h.resident == Resident.Farm)
+        return self._farm_count
+
+    def add_farm(self, hexagon):
+        """A farm bought on hexagon this turn; the count follows without a recount"""
+        self._farm_count = self.get_farm_count() + 1
+        hexagon.resident = Resident.Farm
+        self.board.touch()
+
+    def get_income(self):
+        """Calculate province income (hexes - unit upkeep - trees)."""
+        def compute():
+            income = 0
+            for h in self.hex_list:
+                if h.resident == Resident.Farm:
+                    income += 4
+                elif h.resident.is_tree():
+                    income -= 1
+                elif h.resident.is_unit():
+                    strength = h.resident.get_strength()
+                    upkeep = [0, 2, 6, 18, 36][strength]  # Warrior1=2, Warrior2=6, etc.
+                    income -= upkeep
+                else:
+                    income += 1  # Empty hex
+            return income
+        return self.board.cache.memo(self._cache_key('income'), compute)
+
 
 class AiBase:
     def __init__(self, player_id):
         self.player_id = player_id
         self.targeted_hexes = set()  # Track hexes targeted this turn
+        self.moved_units = set()  # (x, y) of units given a move this turn
+        self.enemy_field = None  # Distance to enemy land, built lazily once per turn
+        self.deadline = None  # TurnDeadline of the current turn, set by the socket loop
+        self.last_evaluation = None  # Score of the last plan, for bots that search (stored with it in the transposition table)
+
+    def out_of_time(self):
+        """True once the turn's planning time is used up; what was planned so far gets sent."""
+        return self.deadline is not None and self.deadline.expired()
 
     def make_move(self, board, action_builder):
         pass
 
 class AiEasy(AiBase):
+    @timed
     def make_move(self, board, action_builder):
         debug_print("[AI] make_move started")
         # Clear targeted hexes at the start of turn
         self.targeted_hexes = set()
+        self.moved_units = set()
+        self.enemy_field = None
         
         provinces = board.get_provinces(self.player_id)
         debug_print(f"[AI] Found {len(provinces)} provinces for player {self.player_id}")
         for i, province in enumerate(provinces):
+            if self.out_of_time():
+                debug_print(f"[AI] Out of time, skipping {len(provinces) - i} provinces")
+                break
             if province.capital:
                 debug_print(f"[AI] Province {i}: {len(province.hex_list)} hexes, capital at ({province.capital.x}, {province.capital.y}) with money {province.money}")
             else:
@@ -259,9 +408,12 @@ class AiEasy(AiBase):
             # self.try_to_build_farms(province, board, action_builder)
             self.spend_money_and_merge(province, board, action_builder)
 
+    @timed
     def move_units(self, province, board, action_builder):
         units = [h for h in province.hex_list if h.resident.is_unit() and h.resident.is_ready_to_move()]
         debug_print(f"[AI] Found {len(units)} units ready to move in province")
+        if ASSIGN_UNIT_MOVES:
+            units = self.assign_unit_moves(units, province, board, action_builder)
         for unit_hex in units:
             debug_print(f"[AI] ========================================")
             debug_print(f"[AI] Processing unit at ({unit_hex.x}, {unit_hex.y}), strength={unit_hex.resident.get_strength()}")
@@ -286,6 +438,52 @@ class AiEasy(AiBase):
             
             self.decide_about_unit(unit_hex, move_zone, province, action_builder)
 
+    @timed
+    def assign_unit_moves(self, units, province, board, action_builder):
+        """
+        Attacks and palm clearing of all units at once (bot/assignment.py),
+        valued from the move generator's reach and the attack table.
+        Returns the units left for decide_about_unit.
+        """
+        moves = board.get_move_generator()
+        table = board.get_attack_table(self.player_id)
+        values = {}
+        for unit_hex in units:
+            strength = unit_hex.resident.get_strength()
+            row = {}
+            for h in moves.movements(unit_hex):
+                if (h.x, h.y) in self.targeted_hexes:
+                    continue
+                if h.owner_id != self.player_id:
+                    row[h] = self.get_target_value(h, strength, table, board)
+                elif strength <= 2 and h.resident == Resident.PalmTree:
+                    row[h] = PALM_TARGET_VALUE  # Cleaning palms comes first for weak units
+            if row:
+                values[unit_hex] = row
+        plan = assign(values)
+        debug_print(f"[AI] Assigned {len(plan)} of {len(units)} units")
+
+        left = []
+        for unit_hex in units:
+            target = plan.get(unit_hex)
+            if target is None or action_builder.add_move(unit_hex.x, unit_hex.y, target.x, target.y) is False:
+                left.append(unit_hex)
+                continue
+            self.moved_units.add((unit_hex.x, unit_hex.y))
+            self.targeted_hexes.add((target.x, target.y))
+        return left
+
+    def get_target_value(self, hexagon, strength, table, board):
+        """Attack allure, with Barons drawn to towers and tower-covered land first (find_most_attractive_hex)"""
+        i = hexagon.y * board.width + hexagon.x
+        value = table.value[i] + 1
+        if strength >= 3:
+            if hexagon.resident == Resident.Tower or hexagon.resident == Resident.StrongTower:
+                value += BARON_TOWER_VALUE
+            elif table.covered[i]:
+                value += BARON_COVERED_VALUE
+        return value
+
     def decide_about_unit(self, unit_hex, move_zone, province, action_builder):
         # Cleaning palms has highest priority (for weak units)
         strength = unit_hex.resident.get_strength()
@@ -294,8 +492,12 @@ class AiEasy(AiBase):
         
         # Find attackable hexes (enemy or neutral territory that we can actually conquer)
         # Also exclude hexes that have already been targeted this turn
-        attackable_hexes = [h for h in self.find_attackable_hexes(move_zone, strength, province.board)
-                           if (h.x, h.y) not in self.targeted_hexes]
+        # (the table knows which units can take anything at all; move_zone keeps the BFS order)
+        board = province.board
+        attackable_hexes = []
+        if board.get_attack_table(self.player_id).targets.get(unit_hex.y * board.width + unit_hex.x):
+            attackable_hexes = [h for h in self.find_attackable_hexes(move_zone, strength, board)
+                               if (h.x, h.y) not in self.targeted_hexes]
         
         debug_print(f"[AI] Unit at ({unit_hex.x}, {unit_hex.y}): {len(attackable_hexes)} attackable hexes")
         if attackable_hexes:
@@ -307,7 +509,9 @@ class AiEasy(AiBase):
             best_hex = self.find_most_attractive_hex(attackable_hexes, province, strength, province.board)
             if best_hex:
                 debug_print(f"[AI] ✓ Unit ATTACKING from ({unit_hex.x}, {unit_hex.y}) to ({best_hex.x}, {best_hex.y}) (owner={best_hex.owner_id})")
-                action_builder.add_move(unit_hex.x, unit_hex.y, best_hex.x, best_hex.y)
+                if action_builder.add_move(unit_hex.x, unit_hex.y, best_hex.x, best_hex.y) is False:
+                    return  # Refused by the local state: the unit stays
+                self.moved_units.add((unit_hex.x, unit_hex.y))
                 self.targeted_hexes.add((best_hex.x, best_hex.y))  # Mark as targeted
                 return
         else:
@@ -319,34 +523,37 @@ class AiEasy(AiBase):
             elif self.is_in_perimeter(unit_hex, province.board):
                 debug_print(f"[AI] Unit on perimeter, pushing to better defense")
                 self.push_unit_to_better_defense(unit_hex, move_zone, province, action_builder)
+            elif self.move_towards_enemy(unit_hex, move_zone, province, action_builder):
+                debug_print(f"[AI] ✓ Unit advancing towards enemy")
             else:
                 debug_print(f"[AI] Unit has nothing to do")
 
     def find_attackable_hexes(self, move_zone, strength, board):
         """Find all hexes that are not owned by us and that we can conquer"""
-        return [h for h in move_zone if h.owner_id != self.player_id and self.can_conquer(h, strength, board)]
+        required = board.get_attack_table(self.player_id).required
+        return [h for h in move_zone if required[h.y * board.width + h.x] <= strength]
 
     def check_to_clean_some_palms(self, unit_hex, move_zone, province, action_builder):
         for h in move_zone:
             if (h.resident == Resident.PalmTree and h.owner_id == self.player_id 
                 and (h.x, h.y) not in self.targeted_hexes):  # Check if not already targeted
                 debug_print(f"[AI] Unit cleaning palm from ({unit_hex.x}, {unit_hex.y}) to ({h.x}, {h.y})")
-                action_builder.add_move(unit_hex.x, unit_hex.y, h.x, h.y)
+                if action_builder.add_move(unit_hex.x, unit_hex.y, h.x, h.y) is False:
+                    continue
+                self.moved_units.add((unit_hex.x, unit_hex.y))
                 self.targeted_hexes.add((h.x, h.y))  # Mark as targeted
                 return True
         return False
 
     def is_in_perimeter(self, hex, board):
         """Check if hex is on the border of our territory"""
-        for n in hex.get_neighbors(board):
-            if n.owner_id != self.player_id and n.resident != Resident.Water:
-                return True
-        return False
+        return board.get_perimeter_mask(self.player_id)[hex.y * board.width + hex.x]
 
     def push_unit_to_better_defense(self, unit_hex, move_zone, province, action_builder):
         """Move unit to a safer position away from enemies"""
         for h in move_zone:
-            if h.owner_id == self.player_id and self.hex_is_free(h):
+            if (h.owner_id == self.player_id and self.hex_is_free(h)
+                and (h.x, h.y) not in self.targeted_hexes):  # Check if not already targeted
                 # Check if this hex has no enemy neighbors
                 enemy_neighbors = 0
                 for n in h.get_neighbors(province.board):
@@ -354,9 +561,12 @@ class AiEasy(AiBase):
                         enemy_neighbors += 1
                 if enemy_neighbors == 0:
                     debug_print(f"[AI] Unit retreating from ({unit_hex.x}, {unit_hex.y}) to ({h.x}, {h.y})")
-                    action_builder.add_move(unit_hex.x, unit_hex.y, h.x, h.y)
+                    if action_builder.add_move(unit_hex.x, unit_hex.y, h.x, h.y) is False:
+                        continue
+                    self.moved_units.add((unit_hex.x, unit_hex.y))
+                    self.targeted_hexes.add((h.x, h.y))  # Mark as targeted
                     return
-    
+
     def hex_is_free(self, hex):
         """Check if hex is free for movement"""
         return (hex.resident == Resident.Empty or 
@@ -367,7 +577,9 @@ class AiEasy(AiBase):
         for h in move_zone:
             if (h.resident.is_tree() and h.owner_id == self.player_id
                 and (h.x, h.y) not in self.targeted_hexes):  # Check if not already targeted
-                action_builder.add_move(unit_hex.x, unit_hex.y, h.x, h.y)
+                if action_builder.add_move(unit_hex.x, unit_hex.y, h.x, h.y) is False:
+                    continue
+                self.moved_units.add((unit_hex.x, unit_hex.y))
                 self.targeted_hexes.add((h.x, h.y))  # Mark as targeted
                 return True
         return False
@@ -375,47 +587,40 @@ class AiEasy(AiBase):
     def move_towards_enemy(self, unit_hex, move_zone, province, action_builder):
         """Move unit towards the nearest enemy territory"""
         board = province.board
+        if self.enemy_field is None:
+            self.enemy_field = DistanceField(
+                board, self.player_id,
+                lambda h: h.owner_id != self.player_id and h.owner_id != 0 and h.resident != Resident.Water)
+        field = self.enemy_field
         
-        # Find all enemy hexes on the board
-        enemy_hexes = [h for h in board.hexes if h.owner_id != self.player_id and h.owner_id != 0 and h.resident != Resident.Water]
-        if not enemy_hexes:
-            return False
+        current_dist = field.distance(unit_hex)
+        if current_dist <= 0:
+            return False  # No enemy reachable through our territory
         
-        # Find the best hex in move_zone that gets us closer to enemies
+        # Pick the hex in move_zone that is closest to the enemy along our own land
         best_hex = None
-        best_distance = float('inf')
-        
-        # Calculate current distance to nearest enemy
-        current_min_dist = float('inf')
-        for eh in enemy_hexes:
-            dist = abs(unit_hex.x - eh.x) + abs(unit_hex.y - eh.y)
-            current_min_dist = min(current_min_dist, dist)
-        
-        # Find hex in move_zone that minimizes distance to enemies
+        best_distance = current_dist
         for h in move_zone:
             if h.owner_id != self.player_id:
                 continue  # Only move within our territory
-            if not self.hex_is_free(h):
+            if not self.hex_is_free(h) or (h.x, h.y) in self.targeted_hexes:
                 continue
-            
-            # Calculate minimum distance from this hex to any enemy
-            min_dist = float('inf')
-            for eh in enemy_hexes:
-                dist = abs(h.x - eh.x) + abs(h.y - eh.y)
-                min_dist = min(min_dist, dist)
-            
-            # Only consider if it gets us closer
-            if min_dist < current_min_dist and min_dist < best_distance:
-                best_distance = min_dist
+            dist = field.distance(h)
+            if 0 < dist < best_distance:
+                best_distance = dist
                 best_hex = h
         
         if best_hex:
             debug_print(f"[AI] Unit moving towards enemy from ({unit_hex.x}, {unit_hex.y}) to ({best_hex.x}, {best_hex.y})")
-            action_builder.add_move(unit_hex.x, unit_hex.y, best_hex.x, best_hex.y)
+            if action_builder.add_move(unit_hex.x, unit_hex.y, best_hex.x, best_hex.y) is False:
+                return False
+            self.moved_units.add((unit_hex.x, unit_hex.y))
+            self.targeted_hexes.add((best_hex.x, best_hex.y))
             return True
         
         return False
 
+    @timed
     def spend_money_and_merge(self, province, board, action_builder):
         debug_print(f"[AI] spend_money_and_merge: money={province.money}")
         self.try_to_build_units_on_palms(province, board, action_builder)
@@ -454,11 +659,13 @@ class AiEasy(AiBase):
             if not hex_for_tower:
                 return
             debug_print(f"[AI] Building tower at ({hex_for_tower.x}, {hex_for_tower.y})")
-            action_builder.add_build(Resident.Tower, hex_for_tower.x, hex_for_tower.y)
+            if action_builder.add_build(Resident.Tower, hex_for_tower.x, hex_for_tower.y) is False:
+                return
             province.money -= 15
             if province.capital:
                 province.capital.money = province.money
             hex_for_tower.resident = Resident.Tower
+            board.touch()
     
     def find_hex_that_needs_tower(self, province, board):
         """Find a hex that would benefit from a tower - Java: ArtificialIntelligence.findHexThatNeedsTower"""
@@ -513,11 +720,13 @@ class AiEasy(AiBase):
                 return
             
             debug_print(f"[AI] Building farm at ({hex_for_farm.x}, {hex_for_farm.y})")
-            action_builder.add_build(Resident.Farm, hex_for_farm.x, hex_for_farm.y)
+            if action_builder.add_build(Resident.Farm, hex_for_farm.x, hex_for_farm.y) is False:
+                return
             province.money -= 15
             if province.capital:
                 province.capital.money = province.money
             hex_for_farm.resident = Resident.Farm
+            board.touch()
     
     def is_ok_to_build_new_farm(self, province, board):
         """Check if it's a good time to build a new farm - Java: ArtificialIntelligenceGeneric.isOkToBuildNewFarm"""
@@ -563,59 +772,42 @@ class AiEasy(AiBase):
         bottom = max(3, len(province.hex_list) // 4)
         return min(bottom, 10)
 
+    @timed
     def try_to_build_units_on_palms(self, province, board, action_builder):
         if not province.can_afford_unit(1): return
         if not province.capital: return
 
         max_iterations = 10  # Safety limit
-        iterations = 0
-        while self.can_province_build_unit(province, 1) and iterations < max_iterations:
-            iterations += 1
-            # Get move zone from capital to find reachable palms
-            move_zone = self.detect_move_zone(province.capital, 1, board)
-            killed_palm = False
-            for h in move_zone:
-                if h.resident == Resident.PalmTree and h.owner_id == self.player_id:
-                    debug_print(f"[AI] Building unit on palm at ({h.x}, {h.y})")
-                    action_builder.add_place(Resident.Warrior1, province.capital.x, province.capital.y, h.x, h.y)
-                    province.money -= 10
-                    if province.capital:  # Update the actual hex money
-                        province.capital.money = province.money
-                    h.resident = Resident.Warrior1Moved  # Mark as no longer a palm
-                    killed_palm = True
-                    break
-            if not killed_palm: break
-
-    def merge_units(self, province, board, action_builder):
-        for h in province.hex_list:
-            if h.resident.is_unit() and h.resident.is_ready_to_move():
-                self.try_to_merge_with_someone(province, h, board, action_builder)
-
-    def try_to_merge_with_someone(self, province, unit_hex, board, action_builder):
-        move_zone = self.detect_move_zone(unit_hex, unit_hex.resident.get_strength(), board)
-        if not move_zone: return
-        
-        for target in move_zone:
-            if self.merge_conditions(province, unit_hex, target):
-                action_builder.add_move(unit_hex.x, unit_hex.y, target.x, target.y)
+        # Palms a bought Peasant can be put on (possiblePlacements covers the whole province, bot/movegen.py)
+        palms = [h for h in board.get_move_generator().placements(province.capital, 1)
+                 if h.resident == Resident.PalmTree and h.owner_id == self.player_id]
+        for h in palms[:max_iterations]:
+            if not self.can_province_build_unit(province, 1):
                 break
+            debug_print(f"[AI] Building unit on palm at ({h.x}, {h.y})")
+            if action_builder.add_place(Resident.Warrior1, province.capital.x, province.capital.y, h.x, h.y) is False:
+                continue
+            province.money -= 10
+            province.capital.money = province.money
+            h.resident = Resident.Warrior1Moved  # Mark as no longer a palm
+            board.touch()
 
-    def merge_conditions(self, province, unit_hex, target_hex):
-        if target_hex.owner_id != self.player_id: return False
-        if not target_hex.resident.is_unit(): return False
-        if not target_hex.resident.is_ready_to_move(): return False
-        if unit_hex == target_hex: return False
-        
-        # Check if merge is possible (sum of strengths <= 4)
-        new_strength = unit_hex.resident.get_strength() + target_hex.resident.get_strength()
-        if new_strength > 4: return False
-        
+    def merge_units(self, province, board, action_builder):
+        """Merges of the province's ready units, all listed at once (bot/merge_planner.py)"""
+        width = board.width
+        members = {h.y * width + h.x for h in province.hex_list}
+        moved = [y * width + x for x, y in self.moved_units]
+        planner = board.get_merge_planner(self.player_id)
+        merges = planner.plan(lambda m: m.src in members and self.merge_conditions(province, m), exclude=moved)
+        for merge in merges:
+            x, y = merge.src % width, merge.src // width
+            if action_builder.add_move(x, y, merge.dst % width, merge.dst // width) is not False:
+                self.moved_units.add((x, y))
+
+    def merge_conditions(self, province, merge):
         # AiEasy specific: only merge 1+1
-        if unit_hex.resident.get_strength() != 1 or target_hex.resident.get_strength() != 1:
-            return False
-            
-        if not province.can_afford_unit(new_strength): return False
-        return True
+        if merge.strength != 2: return False
+        return province.can_afford_unit(merge.strength)
 
     def can_province_build_unit(self, province, strength):
         return province.can_afford_unit(strength)
@@ -625,22 +817,18 @@ class AiEasy(AiBase):
             if self.nothing_blocks_way_for_unit(h) and self.is_allowed_to_build_new_unit(province):
                 if province.capital:
                     resident = self.get_unit_resident(strength)
-                    action_builder.add_place(resident, province.capital.x, province.capital.y, h.x, h.y)
+                    if action_builder.add_place(resident, province.capital.x, province.capital.y, h.x, h.y) is False:
+                        continue
                     return True
         return False
 
     def try_to_attack_with_strength(self, province, strength, board, action_builder):
         if not province.capital: return False
         
-        #Find all hexes reachable from capital with this unit strength
-        move_zone = self.detect_move_zone(province.capital, strength, board)
-        
-        # Find attackable hexes (enemy/neutral that we can conquer)
-        attackable_hexes = [h for h in move_zone 
-                           if h.owner_id != self.player_id 
-                           and h.resident != Resident.Water
-                           and self.can_conquer(h, strength, board)
-                           and (h.x, h.y) not in self.targeted_hexes]
+        # Enemy / neutral hexes a bought warrior of this strength may be put on
+        # (possiblePlacements, all strengths from one pass in bot/movegen.py)
+        attackable_hexes = [h for h in board.get_move_generator().placements(province.capital, strength)
+                            if h.owner_id != self.player_id and (h.x, h.y) not in self.targeted_hexes]
         
         debug_print(f"[AI] try_to_attack_with_strength({strength}): province_hexes={len(province.hex_list)}, attackable={len(attackable_hexes)}, money={province.money}")
         if attackable_hexes and len(attackable_hexes) <= 5:
@@ -655,7 +843,8 @@ class AiEasy(AiBase):
         if best_hex and province.capital:
             resident = self.get_unit_resident(strength)
             debug_print(f"[AI] Placing unit {resident} from capital ({province.capital.x}, {province.capital.y}) to ({best_hex.x}, {best_hex.y})")
-            action_builder.add_place(resident, province.capital.x, province.capital.y, best_hex.x, best_hex.y)
+            if action_builder.add_place(resident, province.capital.x, province.capital.y, best_hex.x, best_hex.y) is False:
+                return False
             province.money -= 10 * strength
             if province.capital:  # Update the actual hex money to keep in sync
                 province.capital.money = province.money
@@ -663,23 +852,6 @@ class AiEasy(AiBase):
             return True
         return False
 
-    def get_possible_placements(self, province, strength, board):
-        valid = []
-        
-        # Check internal placements
-        for h in province.hex_list: 
-             if self.can_place_on(h, strength, board, self.player_id):
-                 valid.append(h)
-        
-        # Check border placements
-        for h in province.hex_list:
-            for n in h.get_neighbors(board):
-                if n.owner_id != self.player_id:
-                    if self.can_place_on(n, strength, board, self.player_id):
-                        valid.append(n)
-        
-        return list(set(valid))
-
     def can_place_on(self, hex, strength, board, owner_id):
         if hex.resident == Resident.Water: return False
         if hex.owner_id == owner_id:
@@ -789,22 +961,9 @@ class AiEasy(AiBase):
             power = self.get_defense_strength(hex)
             return power < 0 or hex.resident in [Resident.Empty, Resident.Gravestone, Resident.PalmTree, Resident.PineTree]
         
-        # Enemy or neutral hex - check combat rules
-        if strength == 4:
-            return True  # Warrior4 crushes everything
-        
-        # CRITICAL: Check target hex AND ALL its neighbors for defenders
-        # This matches C++'s allows() function exactly
-        neighbors = hex.get_neighbors(board)
-        all_hexes_to_check = neighbors + [hex]  # Include the hex itself
-        
-        for n in all_hexes_to_check:
-            if n.owner_id == hex.owner_id:  # Same owner as target (defender)
-                defender_power = self.get_defense_strength(n)
-                if defender_power >= strength:
-                    return False  # Defender blocks attack
-        
-        return True
+        # Enemy or neutral hex - the target and its owner's neighbours defend it,
+        # a Warrior4 crushes everything (precomputed per board in bot/attack.py)
+        return board.get_attack_table(self.player_id).required[hex.y * board.width + hex.x] <= strength
 
     def can_move_to(self, hex, strength, board, owner_id):
         """Check if unit can move to this hex (used for existing unit movement)"""
@@ -845,25 +1004,17 @@ class AiEasy(AiBase):
             if h.resident == Resident.Tower: return h
             if strength == 4 and h.resident == Resident.StrongTower: return h
         
+        covered = board.get_attack_table(self.player_id).covered
         for h in hexes:
-            if self.is_defended_by_tower(h, board): return h
+            if covered[h.y * board.width + h.x]: return h
         return None
 
     def is_defended_by_tower(self, hexagon, board):
-        for n in hexagon.get_neighbors(board):
-            if n.owner_id == hexagon.owner_id and (n.resident == Resident.Tower or n.resident == Resident.StrongTower):
-                return True
-        return False
+        return board.get_tower_cover_mask()[hexagon.y * board.width + hexagon.x]
 
     def get_attack_allure(self, hexagon, fraction, board):
-        c = 0
-        for n in hexagon.get_neighbors(board):
-            if n.owner_id == fraction:
-                c += 1
-        # Prioritize enemy hexes over neutral (owner_id > 0 means it's a player's hex)
-        if hexagon.owner_id > 0 and hexagon.owner_id != fraction:
-            c += 10  # Big bonus for attacking enemy territory
-        return c
+        # Our neighbours, +10 for enemy territory over neutral (bot/attack.py)
+        return board.get_attack_table(fraction).value[hexagon.y * board.width + hexagon.x]
 
 
 # ==================== RL COMPONENTS ====================
@@ -913,8 +1064,8 @@ class QTablePolicy:
         self.qtable_moves += 1
         return q_values.index(max(q_values))
     
-    def update(self, state, action, reward, next_state, done):
-        """Q-learning update rule."""
+    def update(self, state, action, reward, next_state, done, trajectory=None):
+        """Q-learning update rule (one-step, so trajectory changes nothing)."""
         q_values = self.get_q_values(state)
         next_q_values = self.get_q_values(next_state)
         
@@ -1029,17 +1180,23 @@ class AiRL(AiEasy):
         self.last_state = None
         self.last_action = None
     
+    @timed
     def make_move(self, board, action_builder):
         global TRAINING_MODE
         if not TRAINING_MODE:
             print("[RL-AI] make_move started")
         self.targeted_hexes = set()
+        self.moved_units = set()
+        self.enemy_field = None
         
         provinces = board.get_provinces(self.player_id)
         if not TRAINING_MODE:
             print(f"[RL-AI] Found {len(provinces)} provinces")
         
         for i, province in enumerate(provinces):
+            if self.out_of_time():
+                debug_print(f"[RL-AI] Out of time, skipping {len(provinces) - i} provinces")
+                break
             if not province.hex_list or not province.capital:
                 continue
             
@@ -1055,10 +1212,11 @@ class AiRL(AiEasy):
             # RL DECISION: How to spend remaining money
             state = self.extract_state(province, board)
             
-            if self.policy:
-                action = self.policy.choose_action(state)
-            else:
-                action = self.rule_based_fallback(province, board)
+            with PHASES.phase('AiRL.choose_action'):
+                if self.policy:
+                    action = self.policy.choose_action(state)
+                else:
+                    action = self.rule_based_fallback(province, board)
             
             if not TRAINING_MODE:
                 action_name = RLAction(action).name
@@ -1071,13 +1229,15 @@ class AiRL(AiEasy):
             self.last_state = state
             self.last_action = action
     
+    @timed
     def extract_state(self, province, board):
         """Extract 14 normalized features for RL model."""
         total_hexes = board.width * board.height
         my_hexes = len(province.hex_list)
         
         # Count enemies and neutral
-        enemy_hexes = sum(1 for h in board.hexes if h.owner_id != 0 and h.owner_id != self.player_id)
+        owner_counts = board.get_owner_counts()
+        enemy_hexes = sum(c[0] for owner, c in owner_counts.items() if owner != 0 and owner != self.player_id)
         neutral_hexes = sum(1 for h in board.hexes if h.owner_id == 0 and h.resident != Resident.Water)
         
         # Count my units
@@ -1112,7 +1272,7 @@ class AiRL(AiEasy):
         income = self.get_province_income(province)
         
         # Count farms
-        farm_count = sum(1 for h in province.hex_list if h.resident == Resident.Farm)
+        farm_count = province.get_farm_count()
         
         # Count undefended front line
         undefended = 0
@@ -1140,19 +1300,7 @@ class AiRL(AiEasy):
     
     def get_province_income(self, province):
         """Calculate province income (hexes - unit upkeep - trees)."""
-        income = 0
-        for h in province.hex_list:
-            if h.resident == Resident.Farm:
-                income += 4
-            elif h.resident.is_tree():
-                income -= 1
-            elif h.resident.is_unit():
-                strength = h.resident.get_strength()
-                upkeep = [0, 2, 6, 18, 36][strength]  # Warrior1=2, Warrior2=6, etc.
-                income -= upkeep
-            else:
-                income += 1  # Empty hex
-        return income
+        return province.get_income()
     
     def rule_based_fallback(self, province, board):
         """Fallback if no RL policy is set."""
@@ -1179,6 +1327,7 @@ class AiRL(AiEasy):
         # Default: Attack
         return RLAction.ATTACK
     
+    @timed
     def execute_rl_action(self, action, province, board, action_builder):
         """Execute the chosen RL action."""
         if action == RLAction.ATTACK:
@@ -1221,6 +1370,9 @@ class AiRL(AiEasy):
         if not TRAINING_MODE:
             print("[RL-AI] ACTION: DEFEND")
         
+        # Answer the enemy groups threatening the province first
+        self.answer_threats(province, board, action_builder)
+        
         # Build towers
         towers_built = 0
         while province.has_money_for_tower() and towers_built < 2:
@@ -1229,10 +1381,12 @@ class AiRL(AiEasy):
                 break
             if not TRAINING_MODE:
                 print(f"[RL-AI] Building tower at ({best_hex.x}, {best_hex.y})")
-            action_builder.add_place(Resident.Tower, province.capital.x, province.capital.y, 
-                                    best_hex.x, best_hex.y)
+            if action_builder.add_place(Resident.Tower, province.capital.x, province.capital.y,
+                                        best_hex.x, best_hex.y) is False:
+                break  # Refused by the local state; the next pick would be the same hex
             province.money -= 15
             best_hex.resident = Resident.Tower
+            board.touch()
             towers_built += 1
         
         # Build defensive units on front line
@@ -1245,16 +1399,53 @@ class AiRL(AiEasy):
             target = front_hexes[0]
             if not TRAINING_MODE:
                 print(f"[RL-AI] Building defender at ({target.x}, {target.y})")
-            action_builder.add_place(Resident.Warrior1, province.capital.x, province.capital.y,
-                                    target.x, target.y)
+            if action_builder.add_place(Resident.Warrior1, province.capital.x, province.capital.y,
+                                        target.x, target.y) is False:
+                break
             province.money -= 10
             target.resident = Resident.Warrior1Moved
+            board.touch()
             units_built += 1
     
+    @timed
+    def answer_threats(self, province, board, action_builder):
+        """Fight, merge, reinforce or buy against the most dangerous enemy groups (bot/defense.py)."""
+        width = board.width
+        spoken_for = {y * width + x for x, y in self.moved_units | self.targeted_hexes}
+        answers = board.get_defense(self.player_id).plan(
+            [h.y * width + h.x for h in province.hex_list], province.capital.y * width + province.capital.x,
+            province.money, self.get_province_income(province), spoken_for)
+        for answer in answers:
+            target = board.hexes[answer.target]
+            if not TRAINING_MODE:
+                print(f"[RL-AI] Defense: {answer.kind} against ({target.x}, {target.y})")
+            # Stop at the first refused action (LocalState has written back whatever was queued before it)
+            if not all(add_to_builder(action_builder, action) for action in answer.actions(width)):
+                province.money = province.capital.money
+                continue
+
+            # Keep the board in step with what was sent
+            strength = answer.strength
+            for i in (answer.partner, answer.unit):
+                if i >= 0:
+                    unit = board.hexes[i]
+                    strength += unit.resident.get_strength()
+                    unit.resident = Resident.Empty
+                    self.moved_units.add((unit.x, unit.y))
+            target.owner_id = self.player_id
+            target.resident = Resident(Resident.Warrior1Moved + strength - 1)
+            self.targeted_hexes.add((target.x, target.y))
+            province.money -= answer.cost
+            province.capital.money = province.money
+        if answers:
+            board.touch()
+    
     def find_best_tower_location(self, province, board):
-        """Find hex that would benefit most from a tower."""
+        """Find hex that would benefit most from a tower: most hexes enemy units can reach this turn, then defense gain."""
+        influence = board.get_influence(self.player_id)
+        width = board.width
         best = None
-        best_gain = 0
+        best_score = None
         
         for h in province.hex_list:
             if not self.hex_is_free(h):
@@ -1263,8 +1454,11 @@ class AiRL(AiEasy):
                 continue
             
             gain = self.get_predicted_defense_gain_by_new_tower(h, board)
-            if gain >= 4 and gain > best_gain:
-                best_gain = gain
+            if gain < 4:
+                continue
+            score = (influence.covered_threats(h.y * width + h.x), gain)
+            if best_score is None or score > best_score:
+                best_score = score
                 best = h
         
         return best
@@ -1277,25 +1471,24 @@ class AiRL(AiEasy):
         
         farms_built = 0
         max_farms = 2
-        checked_hexes = set()  # Track hexes we've already considered
-        
+        width = board.width
+        sites = FarmSites(board.get_grid(), [h.y * width + h.x for h in province.hex_list],
+                          board.get_perimeter_mask(self.player_id))  # No farms on the front line
+
         while province.has_money_for_farm() and farms_built < max_farms:
-            best_hex = self.find_good_hex_for_farm(province, board, exclude=checked_hexes)
-            if not best_hex:
+            site = sites.pop()
+            if site is None:
                 break
-            
-            checked_hexes.add((best_hex.x, best_hex.y))
-            
-            # Don't build on front line
-            if self.is_in_perimeter(best_hex, board):
-                continue  # Now safe - we track checked hexes
-            
+            best_hex = board.hexes[site]
+
             if not TRAINING_MODE:
                 print(f"[RL-AI] Building farm at ({best_hex.x}, {best_hex.y})")
-            action_builder.add_place(Resident.Farm, province.capital.x, province.capital.y,
-                                    best_hex.x, best_hex.y)
+            if action_builder.add_place(Resident.Farm, province.capital.x, province.capital.y,
+                                        best_hex.x, best_hex.y) is False:
+                continue
             province.money -= province.get_current_farm_price()
-            best_hex.resident = Resident.Farm
+            province.add_farm(best_hex)
+            sites.place(site)
             farms_built += 1
     
     def action_expand(self, province, board, action_builder):
@@ -1306,14 +1499,14 @@ class AiRL(AiEasy):
         
         units_built = 0
         max_units = 4  # More units for expansion
+        refused = set()  # Hexes the local state would not let a Peasant take
         
         while province.can_afford_unit(1) and units_built < max_units:
-            # Find neutral hexes we can reach
+            # Find neutral hexes we can reach (and a Peasant can take)
             move_zone = self.detect_move_zone(province.capital, 1, board)
-            neutral_hexes = [h for h in move_zone 
-                           if h.owner_id == 0 
-                           and h.resident != Resident.Water
-                           and (h.x, h.y) not in self.targeted_hexes]
+            neutral_hexes = [h for h in self.find_attackable_hexes(move_zone, 1, board)
+                           if h.owner_id == 0
+                           and (h.x, h.y) not in self.targeted_hexes and (h.x, h.y) not in refused]
             
             if not neutral_hexes:
                 break
@@ -1323,13 +1516,135 @@ class AiRL(AiEasy):
             
             if not TRAINING_MODE:
                 print(f"[RL-AI] Expanding to ({best.x}, {best.y})")
-            action_builder.add_place(Resident.Warrior1, province.capital.x, province.capital.y,
-                                    best.x, best.y)
+            if action_builder.add_place(Resident.Warrior1, province.capital.x, province.capital.y,
+                                        best.x, best.y) is False:
+                refused.add((best.x, best.y))
+                continue
             province.money -= 10
             self.targeted_hexes.add((best.x, best.y))
             units_built += 1
 
 
+class FixedChoice:
+    """Policy stand-in that always picks the same RLAction."""
+
+    def __init__(self, action):
+        self.action = action
+        self.epsilon = 0.0
+
+    def choose_action(self, state):
+        return self.action
+
+
+class AiMCTS(AiRL):
+    """
+    AiRL whose spending decision is searched instead of read off the
+    Q-table: MCTSPlanner (Antiyoy/bot/mcts.py) simulates the next turns on
+    the rules engine for each RLAction, with AiRL executing the planned
+    action and AiEasy playing the rollouts; the policy only supplies the
+    prior. One action is chosen per turn and applied to every province.
+
+    The tree is kept between turns; when the board we get was one of the
+    positions the last search reached, its subtree is searched further.
+
+    Search time: MCTS_DEADLINE_SHARE of what is left of the turn deadline
+    (see Antiyoy/bot/turn_clock.py), or MCTS_TIME_BUDGET seconds when the
+    turn has no limit.
+    """
+
+    def __init__(self, player_id, policy=None, num_players=2, iterations=None, time_budget=None):
+        super().__init__(player_id, policy)
+        self.num_players = num_players
+        board_factory = lambda e: e.to_board(Board, Hex, Resident)
+        prior = q_prior(policy, self._prior_features) if policy else None
+        model = TurnModel(board_factory,
+                          planned_bot=lambda pid, action: AiRL(pid, FixedChoice(action)),
+                          rollout_bot=AiEasy, prior=prior)
+        self.planner = MCTSPlanner(model, num_players, iterations=iterations or MCTS_ITERATIONS)
+        self.time_budget = time_budget if time_budget is not None else MCTS_TIME_BUDGET
+        self.turns_played = 0
+
+    def _prior_features(self, engine, player):
+        board = engine.to_board(Board, Hex, Resident)
+        provinces = [p for p in board.get_provinces(player) if p.hex_list and p.capital]
+        if not provinces:
+            return None
+        biggest = max(provinces, key=lambda p: len(p.hex_list))
+        return AiRL(player, None).extract_state(biggest, board)
+
+    def make_move(self, board, action_builder):
+        global TRAINING_MODE, _training_mode
+        engine = Engine.from_board(board, self.num_players, self.player_id, first_round=self.turns_played == 0)
+        self.turns_played += 1
+        modes = (TRAINING_MODE, _training_mode, PHASES.enabled)
+        TRAINING_MODE = _training_mode = True  # Simulated turns print nothing
+        if self.deadline is not None and self.deadline.end is not None:
+            search_end = self.deadline.at(MCTS_DEADLINE_SHARE)
+        else:
+            search_end = time.perf_counter() + self.time_budget
+        with PHASES.phase('AiMCTS.search'):
+            PHASES.enabled = False  # ... and don't count as phases of our turn
+            try:
+                best = self.planner.plan(engine, deadline=search_end)
+            finally:
+                TRAINING_MODE, _training_mode, PHASES.enabled = modes
+        stats = self.planner.last_stats
+        self.last_evaluation = stats['values'].get(best)
+        if not TRAINING_MODE:
+            print(f"[MCTS] {RLAction(best).name} after {stats['iterations']} iterations "
+                  f"({stats['elapsed']:.2f}s, reused {stats['reused_visits']} visits), visits: {stats['visits']}")
+
+        policy = self.policy
+        self.policy = FixedChoice(best)
+        try:
+            super().make_move(board, action_builder)
+        finally:
+            self.policy = policy
+
+
+class AiBeam(AiBase):
+    """
+    Plans each province's PLACE / MOVE actions with a beam search on the
+    rules engine (Antiyoy/bot/beam_search.py) instead of AiEasy's fixed
+    greedy order, so combinations like merging two units to break a tower
+    are found. Stops at the turn deadline and sends what was planned so far.
+    """
+
+    def __init__(self, player_id, width=None, depth=None):
+        super().__init__(player_id)
+        self.search = BeamSearch(width or BEAM_WIDTH, depth or BEAM_DEPTH)
+
+    @timed
+    def make_move(self, board, action_builder):
+        engine = Engine.from_board(board, current_player=self.player_id)
+        deadline = self.deadline.end if self.deadline is not None else None
+        actions = plan_turn(engine, self.player_id, self.search, deadline)
+        debug_print(f"[BEAM] Planned {len(actions)} actions")
+        for action in actions:
+            add_to_builder(action_builder, action)
+
+
+class AiLadder(AiBase):
+    """
+    A port of one of the game's own bots (the Java difficulty ladder,
+    Antiyoy/bot/ladder.py) as a graded opponent that needs no game bots:
+    'easy', 'normal', 'hard', 'expert' or 'balancer'.
+    """
+
+    def __init__(self, player_id, difficulty='expert'):
+        super().__init__(player_id)
+        self.difficulty = difficulty
+        self.ladder = make_ladder_ai(difficulty, player_id)
+
+    @timed
+    def make_move(self, board, action_builder):
+        engine = Engine.from_board(board, current_player=self.player_id)
+        actions = self.ladder.plan(engine)
+        debug_print(f"[LADDER] {self.difficulty} planned {len(actions)} actions")
+        for action in actions:
+            add_to_builder(action_builder, action)
+
+
 MAGIC_SOCKET_TAG = 0 # Magiczne numerki wysyłane na początku do socketa by mieć pewność że jesteśmy odpowiednio połączeni
 CONFIGURATION_SOCKET_TAG = 1 # Dane gry wysyłane przy rozpoczęciu nowej gry
 BOARD_SOCKET_TAG = 2 # Plansza (spłaszczona dwuwymiarowa tablica heksagonów)
@@ -1433,24 +1748,8 @@ def receive_board() -> Board:
 
     data = recv_size(sock, data_size)
 
-    board = Board(width, height)
-
-    offset = 0
-    for y in range(height):
-        for x in range(width):
-            owner_id = data[offset]
-            resident_raw = data[offset + 1]
-            money_raw = struct.unpack_from("!H", data, offset + 2)[0]
-
-            resident = Resident(resident_raw)
-            money = money_raw
-
-            hexagon = Hex(x, y, owner_id, resident, money)
-            board.add_hex(hexagon)
-
-            offset += 4
-
-    return board
+    # Nagłówek + dane to dokładnie format snapshotu (bot/snapshot.py)
+    return Board.from_bytes(header + data)
 
 def receive_action():
     """
@@ -1763,156 +2062,141 @@ class ActionBuilder:
 
 
 
-print("Started!")
-
-# Program odpalany przez std::system("start python receiver.py 127.0.0.1 2137"); (nazwa, adres i port pochodzą z config.txt)
-HOST = '127.0.0.1'
-PORT = 2137
-
-if len(sys.argv) >= 2:
-    HOST = sys.argv[1]
-if len(sys.argv) >= 3:
-    PORT = int(sys.argv[2])
-
-
 # ==================== RL SETUP ====================
 RL_SAVE_PATH = "rl_policy.json"
 USE_RL = True  # Set to False to use rule-based AiEasy instead
+USE_MCTS = False  # RL bots search their spending action (AiMCTS) instead of reading it off the Q-table
+MCTS_ITERATIONS = None  # Simulations per turn (upper bound), None = search until the deadline
+MCTS_TIME_BUDGET = 1.0  # Seconds of search per turn when the game sets no move time limit
+MCTS_DEADLINE_SHARE = 0.8  # Share of the remaining turn time spent searching; the rest executes the plan
+USE_BEAM_SEARCH = False  # Rule-based bots (USE_RL = False) plan with AiBeam instead of AiEasy
+BEAM_WIDTH = 6  # Action sequences kept per search layer
+BEAM_DEPTH = 4  # Actions per searched sequence
+PHASE_TIMING = True  # Time the phases of bot turns; p50/p95/max per phase printed with [STATS] (bot/phase_timer.py)
+TRANSPOSITION_SIZE = 4096  # Plans kept per (player, board); a board seen before gets its plan re-sent (bot/transposition.py)
+LADDER_PLAYERS = {}  # { player_id: 'easy' / 'normal' / 'hard' / 'expert' / 'balancer' }: these bots play a port of the game's own AI (AiLadder)
+ASSIGN_UNIT_MOVES = True  # Match all units of a province to attack / palm targets at once instead of one by one (bot/assignment.py)
+PALM_TARGET_VALUE = 100  # Unit assignment: a weak unit clearing our palm, above any attack
+BARON_TOWER_VALUE = 40  # Unit assignment: a Baron / Knight taking a tower
+BARON_COVERED_VALUE = 20  # Unit assignment: a Baron / Knight taking land next to a tower
+LOCAL_STATE = True  # Play queued actions on the received board as they are planned, drop the ones that would fail (bot/local_state.py)
 TRAINING_MODE = False  # Set to True for fast training (no print spam)
 TARGET_GAMES = 100  # Set by run_training.sh
 REPORT_MOVES_EVERY = 5  # Report random vs Q-table moves every X games
 MAX_TURNS_PER_GAME = 100  # Stalemate detection - start aggressive actions
 FORCE_END_AT_TURNS = 200  # Hard limit - force game end to prevent infinite loops
+BOARD_DUMP_EVERY = 1  # Debug dumps: print one board out of every N (non-training only)
+BOARD_DUMP_BOT_TURNS_ONLY = False  # Debug dumps: skip boards of human/other players
 
 # Set global training mode flag
 _training_mode = TRAINING_MODE
+board_renderer = BoardRenderer(every=BOARD_DUMP_EVERY, bot_turns_only=BOARD_DUMP_BOT_TURNS_ONLY)
+
+
+# Everything below talks to the game; importing this file (e.g. for headless
+# training, see train_headless.py) only defines the bots and the board.
+if __name__ == "__main__":
+    print("Started!")
+
+    # Program odpalany przez std::system("start python receiver.py 127.0.0.1 2137"); (nazwa, adres i port pochodzą z config.txt)
+    HOST = '127.0.0.1'
+    PORT = 2137
+
+    if len(sys.argv) >= 2:
+        HOST = sys.argv[1]
+    if len(sys.argv) >= 3:
+        PORT = int(sys.argv[2])
+
+
+
+    # Create RL policy (use enhanced if available)
+    if HAS_ENHANCED_QTABLE:
+        print("[RL] Using Enhanced Q-Table with tile coding and experience replay")
+        rl_policy = EnhancedQTable(
+            num_actions=5, 
+            epsilon=0.0,  # 0.0 for play mode (pure exploitation)
+            learning_rate=0.1,
+            discount=0.99,
+            n_step=3,
+            use_double=True,
+            use_tiles=True
+        )
+        reward_calc = ImprovedRewardShaping()
+    else:
+        print("[RL] Using Simple Q-Table")
+        rl_policy = QTablePolicy(num_actions=5, epsilon=0.5)
+        reward_calc = RewardCalculator()
+
+    rl_policy.load(RL_SAVE_PATH)  # Try to load existing policy
+
+    # Single state/action tracking is NOT sufficient for multiple bots
+    # We will use dictionaries keyed by Player ID (1, 2, 3...)
+    ai_instances = {}       # { player_id: AiRL_instance }
+    player_states = {}      # { player_id: {'prev_state': None, 'prev_action': None} }
+
+    # Global Training/Game Stats (still useful for general tracking)
+    turn_count = 0
+    game_count = 0
+    wins = 0
+    losses = 0
+    last_report_game = 0
+    last_report_game = 0  # Track when we last reported move stats
+    cache_hits = 0        # Board query cache, summed over all bot turns
+    cache_misses = 0
+    turn_clock = TurnClock()  # Planning deadlines from maxMoveTimes, and how much of them was used
+    transpositions = TranspositionTable(TRANSPOSITION_SIZE)  # (player, board hash) -> plan sent for it
+    local_states = {}  # { player_id: (turn, LocalState of the last batch planned, key of the board it was planned on) }
+    local_applied = 0  # Actions played on local states / dropped before sending
+    local_refused = 0
+    PHASES.enabled = PHASE_TIMING
+    move_times = []
+    turn_deadline = None
+
+    # Print policy info (handle both simple and enhanced Q-tables)
+    if HAS_ENHANCED_QTABLE and hasattr(rl_policy, 'q_table_a'):
+        num_states = len(rl_policy.q_table_a)
+    elif hasattr(rl_policy, 'q_table'):
+        num_states = len(rl_policy.q_table)
+    else:
+        num_states = 0
 
-# Create RL policy (use enhanced if available)
-if HAS_ENHANCED_QTABLE:
-    print("[RL] Using Enhanced Q-Table with tile coding and experience replay")
-    rl_policy = EnhancedQTable(
-        num_actions=5, 
-        epsilon=0.0,  # 0.0 for play mode (pure exploitation)
-        learning_rate=0.1,
-        discount=0.99,
-        n_step=3,
-        use_double=True,
-        use_tiles=True
-    )
-    reward_calc = ImprovedRewardShaping()
-else:
-    print("[RL] Using Simple Q-Table")
-    rl_policy = QTablePolicy(num_actions=5, epsilon=0.5)
-    reward_calc = RewardCalculator()
-
-rl_policy.load(RL_SAVE_PATH)  # Try to load existing policy
-
-# Single state/action tracking is NOT sufficient for multiple bots
-# We will use dictionaries keyed by Player ID (1, 2, 3...)
-ai_instances = {}       # { player_id: AiRL_instance }
-player_states = {}      # { player_id: {'prev_state': None, 'prev_action': None} }
-
-# Global Training/Game Stats (still useful for general tracking)
-turn_count = 0
-game_count = 0
-wins = 0
-losses = 0
-last_report_game = 0
-last_report_game = 0  # Track when we last reported move stats
-
-# Print policy info (handle both simple and enhanced Q-tables)
-if HAS_ENHANCED_QTABLE and hasattr(rl_policy, 'q_table_a'):
-    num_states = len(rl_policy.q_table_a)
-elif hasattr(rl_policy, 'q_table'):
-    num_states = len(rl_policy.q_table)
-else:
-    num_states = 0
-
-print(f"[RL] Policy: {num_states} states, ε={rl_policy.epsilon:.2f}")
-print(f"[RL] Using {'RL AI' if USE_RL else 'Rule-based AI'}")
-if TRAINING_MODE:
-    print(f"[RL] TRAINING MODE: Running {TARGET_GAMES} games" if TARGET_GAMES > 0 else "[RL] TRAINING MODE: Infinite games")
-
-
-currentBotPlayer = 0
-last_rejected_board_hash = None  # Track board hash where moves were rejected
-
-
-sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-try:
-    sock.connect((HOST, PORT))
+    print(f"[RL] Policy: {num_states} states, ε={rl_policy.epsilon:.2f}")
+    print(f"[RL] Using {'RL AI' if USE_RL else 'Rule-based AI'}")
+    if TRAINING_MODE:
+        print(f"[RL] TRAINING MODE: Running {TARGET_GAMES} games" if TARGET_GAMES > 0 else "[RL] TRAINING MODE: Infinite games")
 
-    tag, payload = receive_next() # Na początku oczekujemy magicznych numerków
 
-    if tag is None: # Jeśli nie otrzymamy danych
-        print("Server disconnected")
-        if not TRAINING_MODE:
-            input()
-        sys.exit(1)
-    
-    if tag != MAGIC_SOCKET_TAG: # Jeśli otrzymamy coś innego niż magiczne numerki
-        print(f"Unexpected content received. Tag: {tag}")
-        if not TRAINING_MODE:
-            input()
-        sys.exit(1)
+    currentBotPlayer = 0
 
-    if payload: # Czy numerki się zgadzają
-        print("Correct magic numbers!")
-    else:
-        print("Wrong magic numbers!")
-        if not TRAINING_MODE:
-            input()
-        sys.exit(1)
 
-    while True: # Pętla główna
-        tag, payload = receive_next() # Na początku każdej gry mamy otrzymać konfigurację
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.connect((HOST, PORT))
+
+        tag, payload = receive_next() # Na początku oczekujemy magicznych numerków
 
         if tag is None: # Jeśli nie otrzymamy danych
             print("Server disconnected")
             if not TRAINING_MODE:
                 input()
             sys.exit(1)
-    
-        if tag != CONFIGURATION_SOCKET_TAG: # Jeśli otrzymamy coś innego niż konfiguracja
+
+        if tag != MAGIC_SOCKET_TAG: # Jeśli otrzymamy coś innego niż magiczne numerki
             print(f"Unexpected content received. Tag: {tag}")
             if not TRAINING_MODE:
                 input()
             sys.exit(1)
 
-        if not _training_mode:
-            print("Configuration received:") # Można coś zrobić z konfiguracją
-            print(payload)
-        
-        # --- DYNAMIC BOT INITIALIZATION ---
-        ai_instances.clear()
-        player_states.clear()
-        player_markers = payload.get("playerMarkers", "")
-        print(f"Initializing bots for config: {player_markers}")
-        
-        for i, marker in enumerate(player_markers):
-            pid = i + 1  # Player IDs are 1-based
-            if marker == 'B':
-                print(f" -> Player {pid} is a BOT (AI)")
-                # Initialize AI instance
-                if USE_RL:
-                    # All 'B' players share the same policy (RL brain) but have separate state handlers
-                    # They will learn from playing against each other!
-                    print(f"    [ASSIGNMENT] Player {pid} = AiRL (RL Bot)")
-                    ai_instances[pid] = AiRL(pid, policy=rl_policy)
-                else:
-                    print(f"    [ASSIGNMENT] Player {pid} = AiEasy (Rule-based)")
-                    ai_instances[pid] = AiEasy(pid)
-                
-                # Initialize state tracking for this bot
-                player_states[pid] = {'prev_state': None, 'prev_action': None}
-            else:
-                print(f" -> Player {pid} is HUMAN/OTHER ({marker})")
-        
-        turn_count = 0 # Reset game turn counter
-
+        if payload: # Czy numerki się zgadzają
+            print("Correct magic numbers!")
+        else:
+            print("Wrong magic numbers!")
+            if not TRAINING_MODE:
+                input()
+            sys.exit(1)
 
-        while True: # Pętla meczu
-            tag, payload = receive_next()
+        while True: # Pętla główna
+            tag, payload = receive_next() # Na początku każdej gry mamy otrzymać konfigurację
 
             if tag is None: # Jeśli nie otrzymamy danych
                 print("Server disconnected")
@@ -1920,265 +2204,369 @@ try:
                     input()
                 sys.exit(1)
 
-            elif tag == ACTION_SOCKET_TAG: # Ruchy niebotowych graczy, botom raczej nie są one potrzebne
-                print("Received action")
+            if tag != CONFIGURATION_SOCKET_TAG: # Jeśli otrzymamy coś innego niż konfiguracja
+                print(f"Unexpected content received. Tag: {tag}")
+                if not TRAINING_MODE:
+                    input()
+                sys.exit(1)
 
-            elif tag == TURN_CHANGE_SOCKET_TAG: # Kiedy zaczynamy turę najpierw dostaniemy informację o zmianie tury
-                currentBotPlayer = payload
-                # Increment global turn counter roughly once per round (e.g. when Player 1 starts)
-                if currentBotPlayer == 1:
-                    turn_count += 1
-                    
-                if not _training_mode:
-                    print("\n-----------------------------------------")
-                    print(f"Playing as Player {payload}")
+            if not _training_mode:
+                print("Configuration received:") # Można coś zrobić z konfiguracją
+                print(payload)
+
+            # --- DYNAMIC BOT INITIALIZATION ---
+            ai_instances.clear()
+            player_states.clear()
+            player_markers = payload.get("playerMarkers", "")
+            move_times = payload.get("maxMoveTimes", [])
+            print(f"Initializing bots for config: {player_markers}")
+
+            for i, marker in enumerate(player_markers):
+                pid = i + 1  # Player IDs are 1-based
+                if marker == 'B':
+                    print(f" -> Player {pid} is a BOT (AI)")
+                    # Initialize AI instance
+                    if pid in LADDER_PLAYERS:
+                        print(f"    [ASSIGNMENT] Player {pid} = AiLadder ({LADDER_PLAYERS[pid]})")
+                        ai_instances[pid] = AiLadder(pid, LADDER_PLAYERS[pid])
+                    elif USE_RL:
+                        # All 'B' players share the same policy (RL brain) but have separate state handlers
+                        # They will learn from playing against each other!
+                        if USE_MCTS:
+                            print(f"    [ASSIGNMENT] Player {pid} = AiMCTS (RL Bot with search)")
+                            ai_instances[pid] = AiMCTS(pid, policy=rl_policy, num_players=len(player_markers))
+                        else:
+                            print(f"    [ASSIGNMENT] Player {pid} = AiRL (RL Bot)")
+                            ai_instances[pid] = AiRL(pid, policy=rl_policy)
+                    elif USE_BEAM_SEARCH:
+                        print(f"    [ASSIGNMENT] Player {pid} = AiBeam (Beam search)")
+                        ai_instances[pid] = AiBeam(pid)
+                    else:
+                        print(f"    [ASSIGNMENT] Player {pid} = AiEasy (Rule-based)")
+                        ai_instances[pid] = AiEasy(pid)
 
+                    # Initialize state tracking for this bot
+                    player_states[pid] = {'prev_state': None, 'prev_action': None}
+                else:
+                    print(f" -> Player {pid} is HUMAN/OTHER ({marker})")
+
+            turn_count = 0 # Reset game turn counter
+
+
+            while True: # Pętla meczu
+                tag, payload = receive_next()
+
+                if tag is None: # Jeśli nie otrzymamy danych
+                    print("Server disconnected")
+                    if not TRAINING_MODE:
+                        input()
+                    sys.exit(1)
+
+                elif tag == ACTION_SOCKET_TAG: # Ruchy niebotowych graczy, botom raczej nie są one potrzebne
+                    print("Received action")
+
+                elif tag == TURN_CHANGE_SOCKET_TAG: # Kiedy zaczynamy turę najpierw dostaniemy informację o zmianie tury
+                    currentBotPlayer = payload
+                    # The game starts the turn timer when it sends the first board, right after this
+                    if currentBotPlayer in ai_instances:
+                        limit = move_times[currentBotPlayer - 1] if currentBotPlayer <= len(move_times) else DEFAULT_MOVE_TIME
+                        turn_deadline = turn_clock.start(limit)
+                    # Increment global turn counter roughly once per round (e.g. when Player 1 starts)
+                    if currentBotPlayer == 1:
+                        turn_count += 1
 
-            elif tag == BOARD_SOCKET_TAG: # Kiedy otrzymamy planszę to otrzymujemy ruch
-                if not _training_mode:
-                    print(payload)
-                    payload.print_owners()
-                    payload.print_residents()
-                    payload.print_money()
-                
-                # Identify if the current player is a Bot we are controlling
-                if currentBotPlayer not in ai_instances:
-                    # It's a human or network player not managed by this script
                     if not _training_mode:
-                        print(f"Waiting for Player {currentBotPlayer} (Human/Other) to move...")
-                    continue
-                
-                # Retrieve the specific AI and state for this player
-                ai = ai_instances[currentBotPlayer]
-                p_state = player_states[currentBotPlayer]
-                prev_state = p_state['prev_state']
-                prev_action = p_state['prev_action']
-
-                # Create a simple board hash to detect if we've seen this exact board before
-                board_hash = hash((tuple(h.owner_id for h in payload.hexes), 
-                                  tuple(h.resident for h in payload.hexes),
-                                  tuple(h.money for h in payload.hexes)))
-                
-                # Calculate game stats for reward
-                my_hexes = sum(1 for h in payload.hexes if h.owner_id == currentBotPlayer)
-                enemy_hexes = sum(1 for h in payload.hexes if h.owner_id != 0 and h.owner_id != currentBotPlayer)
-                my_units = sum(1 for h in payload.hexes if h.owner_id == currentBotPlayer and h.resident.is_unit())
-                
-                # DODAĆ LOGIKĘ AI (najlepiej przez ActionBuilder)
-                ab = ActionBuilder()
-                
-                # CHECK TURN LIMIT BEFORE PROCESSING - if exceeded, just end turn immediately  
-                skip_ai_processing = False
-                if turn_count >= FORCE_END_AT_TURNS:
-                    print(f"[RL] FORCE END: Turn {turn_count} exceeded limit! Ending game...")
-                    # Treat as loss to discourage stalemates - apply to ALL bots? 
-                    # For now just the current one
-                    if USE_RL and prev_state is not None:
-                        if HAS_ENHANCED_QTABLE:
-                            stats = {'my_hexes': 0, 'game_length': turn_count}
-                            final_reward = reward_calc.calculate_reward(stats, won=False, lost=True)
-                        else:
-                            final_reward = reward_calc.calculate(0, 0, 0, 0, won=False, lost=True)
-                        rl_policy.update(prev_state, prev_action, final_reward, prev_state, done=True)
-                    skip_ai_processing = True
-                
-                # Check if we just got rejected on this exact board
-                if last_rejected_board_hash is not None and last_rejected_board_hash == board_hash:
-                    debug_print(f"[AI] Skipping moves - was just rejected on this board")
-                    last_rejected_board_hash = None  # Reset for next time
-                elif not skip_ai_processing:  # Only process AI if not force-ended
-                    
-                    # NOTE: 'ai' is already the correct instance for currentBotPlayer
-                    
-                    try:
-                        ai.make_move(payload, ab)
-                        
-                        # RL LEARNING: Update Q-values based on reward
-                        if USE_RL and prev_state is not None and prev_action is not None:
-                            # Get income from AI if available
-                            income = 0
-                            if hasattr(ai, 'get_province_income'):
-                                provinces = payload.get_provinces(currentBotPlayer)
-                                if provinces:
-                                    income = ai.get_province_income(provinces[0])
-                            
-                            # Calculate reward
+                        print("\n-----------------------------------------")
+                        print(f"Playing as Player {payload}")
+
+
+                elif tag == BOARD_SOCKET_TAG: # Kiedy otrzymamy planszę to otrzymujemy ruch
+                    if not _training_mode:
+                        board_renderer.maybe_dump(payload, bot_turn=currentBotPlayer in ai_instances)
+
+                    # Identify if the current player is a Bot we are controlling
+                    if currentBotPlayer not in ai_instances:
+                        # It's a human or network player not managed by this script
+                        if not _training_mode:
+                            print(f"Waiting for Player {currentBotPlayer} (Human/Other) to move...")
+                        continue
+
+                    # Retrieve the specific AI and state for this player
+                    ai = ai_instances[currentBotPlayer]
+                    p_state = player_states[currentBotPlayer]
+                    prev_state = p_state['prev_state']
+                    prev_action = p_state['prev_action']
+
+                    # A board in the middle of our turn comes after a rejected batch, which the server undid whole.
+                    # If it did not, the "end the turn" answer stored for the old board is stale: drop it and
+                    # plan on the board as the server has it now
+                    last_local = local_states.pop(currentBotPlayer, None)
+                    if last_local is not None and last_local[0] == turn_count and not last_local[1].undone(payload):
+                        debug_print(f"[AI] Board re-sent after a rejection is not the one the batch was planned on, replanning")
+                        transpositions.discard(last_local[2])
+
+                    # Have we planned for this exact board before (or had a plan for it rejected)?
+                    board_key = position_key(currentBotPlayer, payload)
+                    known_plan = transpositions.get(board_key)
+
+                    # Calculate game stats for reward
+                    owner_counts = payload.get_owner_counts()
+                    my_hexes, my_units = owner_counts.get(currentBotPlayer, (0, 0))
+                    enemy_hexes = sum(c[0] for owner, c in owner_counts.items() if owner != 0 and owner != currentBotPlayer)
+
+                    # DODAĆ LOGIKĘ AI (najlepiej przez ActionBuilder)
+                    ab = ActionBuilder()
+                    builder = ab
+
+                    # CHECK TURN LIMIT BEFORE PROCESSING - if exceeded, just end turn immediately  
+                    skip_ai_processing = False
+                    if turn_count >= FORCE_END_AT_TURNS:
+                        print(f"[RL] FORCE END: Turn {turn_count} exceeded limit! Ending game...")
+                        # Treat as loss to discourage stalemates - apply to ALL bots? 
+                        # For now just the current one
+                        if USE_RL and prev_state is not None:
                             if HAS_ENHANCED_QTABLE:
-                                stats = {
-                                    'my_hexes': my_hexes,
-                                    'my_income': income,
-                                    'my_units': my_units,
-                                    'enemy_hexes': enemy_hexes,
-                                    'game_length': turn_count,
-                                }
-                                reward = reward_calc.calculate_reward(stats, won=False, lost=False)
+                                stats = {'my_hexes': 0, 'game_length': turn_count}
+                                final_reward = reward_calc.calculate_reward(stats, won=False, lost=True)
                             else:
-                                reward = reward_calc.calculate(my_hexes, income, enemy_hexes, my_units, won=False, lost=False)
-                            
-                            current_state = ai.last_state if ai.last_state else prev_state
-                            rl_policy.update(prev_state, prev_action, reward, current_state, done=False)
-                            
-                            # Print with enhanced stats if available
-                            if not _training_mode:
-                                if HAS_ENHANCED_QTABLE and hasattr(rl_policy, 'get_stats'):
-                                    stats = rl_policy.get_stats()
-                                    print(f"[RL-P{currentBotPlayer}] Turn {turn_count}: Action={RLAction(prev_action).name}, "
-                                          f"Reward={reward:.1f}, States={stats['states']}, ε={stats['epsilon']:.3f}")
-                        
-                        # Store state/action for next update
-                        if USE_RL and hasattr(ai, 'last_state') and ai.last_state:
-                            p_state['prev_state'] = ai.last_state
-                            p_state['prev_action'] = ai.last_action
-                        
-                        # turn_count is now incremented globally on TURN_CHANGE
-                        
-                        # STALEMATE DETECTION - after too many turns, force Knight builds
-                        if turn_count >= MAX_TURNS_PER_GAME and turn_count % 20 == 0:
-                            print(f"[RL] STALEMATE WARNING: {turn_count} turns! Forcing aggressive actions...")
-                            # Force build a Knight to break through Strong Towers
-                            provinces = payload.get_provinces(currentBotPlayer)
-                            for province in provinces:
-                                if province.can_afford_unit(4):  # Knight
-                                    # Find enemy border hexes
-                                    move_zone = ai.detect_move_zone(province.capital, 4, payload)
-                                    enemy_hexes_nearby = [h for h in move_zone 
-                                                         if h.owner_id != currentBotPlayer 
-                                                         and h.owner_id != 0]
-                                    if enemy_hexes_nearby:
-                                        target = enemy_hexes_nearby[0]
-                                        print(f"[RL] Building Knight to attack ({target.x}, {target.y})")
-                                        ab.add_place(Resident.Warrior4, province.capital.x, province.capital.y,
-                                                    target.x, target.y)
-                                        province.money -= 40
-                        
-                    except Exception as e:
-                        print(f"[AI ERROR] {e}")
-                        import traceback
-                        traceback.print_exc()
-                
-                # Send moves and handle responses
-                still_awaiting = True
-                moves_were_rejected = False
-                
-                while still_awaiting:
-                    if ab.buffer and not moves_were_rejected:
-                        ab.send()
-                        tag, conf = receive_next()
-                        if tag == CONFIRMATION_SOCKET_TAG:
-                            approved, still_awaiting = conf
-                            if not _training_mode:
-                                print(f"Approved: {approved}, Still awaiting: {still_awaiting}")
-                            if not approved:
-                                debug_print(f"[AI] Move rejected, will send END_TURN on next board")
-                                # Server already sent a new BOARD message after this rejection
-                                # Store board hash so we skip moves if we see this board again
-                                last_rejected_board_hash = board_hash
+                                final_reward = reward_calc.calculate(0, 0, 0, 0, won=False, lost=True)
+                            rl_policy.update(prev_state, prev_action, final_reward, prev_state, done=True,
+                                             trajectory=currentBotPlayer)
+                        skip_ai_processing = True
+
+                    # Re-send the plan of a board we have seen (an empty one after a rejection)
+                    if known_plan is not None and not skip_ai_processing:
+                        ab.num, plan = known_plan.plan
+                        ab.buffer.extend(plan)
+                        if not ab.num:
+                            # "End the turn" only answers the board re-sent right after the rejection
+                            transpositions.discard(board_key)
+                        debug_print(f"[AI] Known board, re-sending its plan ({ab.num} actions)")
+                    elif not skip_ai_processing:  # Only process AI if not force-ended
+
+                        # NOTE: 'ai' is already the correct instance for currentBotPlayer
+
+                        try:
+                            # Re-sent boards (after a rejection) keep the deadline of the turn
+                            ai.deadline = turn_deadline
+                            if LOCAL_STATE:
+                                local = LocalState(payload, currentBotPlayer)
+                                local_states[currentBotPlayer] = (turn_count, local, board_key)
+                                builder = TrackedActionBuilder(ab, local)
+                            ai.make_move(payload, builder)
+
+                            # RL LEARNING: Update Q-values based on reward
+                            if USE_RL and prev_state is not None and prev_action is not None:
+                                # Get income from AI if available
+                                income = 0
+                                if hasattr(ai, 'get_province_income'):
+                                    provinces = payload.get_provinces(currentBotPlayer)
+                                    if provinces:
+                                        income = ai.get_province_income(provinces[0])
+
+                                # Calculate reward
+                                if HAS_ENHANCED_QTABLE:
+                                    stats = {
+                                        'my_hexes': my_hexes,
+                                        'my_income': income,
+                                        'my_units': my_units,
+                                        'enemy_hexes': enemy_hexes,
+                                        'game_length': turn_count,
+                                    }
+                                    reward = reward_calc.calculate_reward(stats, won=False, lost=False)
+                                else:
+                                    reward = reward_calc.calculate(my_hexes, income, enemy_hexes, my_units, won=False, lost=False)
+
+                                current_state = ai.last_state if ai.last_state else prev_state
+                                with PHASES.phase('q_update'):
+                                    rl_policy.update(prev_state, prev_action, reward, current_state, done=False,
+                                                     trajectory=currentBotPlayer)
+
+                                # Print with enhanced stats if available
+                                if not _training_mode:
+                                    if HAS_ENHANCED_QTABLE and hasattr(rl_policy, 'get_stats'):
+                                        stats = rl_policy.get_stats()
+                                        print(f"[RL-P{currentBotPlayer}] Turn {turn_count}: Action={RLAction(prev_action).name}, "
+                                              f"Reward={reward:.1f}, States={stats['states']}, ε={stats['epsilon']:.3f}")
+
+                            # Store state/action for next update
+                            if USE_RL and hasattr(ai, 'last_state') and ai.last_state:
+                                p_state['prev_state'] = ai.last_state
+                                p_state['prev_action'] = ai.last_action
+
+                            # turn_count is now incremented globally on TURN_CHANGE
+
+                            # STALEMATE DETECTION - after too many turns, force Knight builds
+                            if turn_count >= MAX_TURNS_PER_GAME and turn_count % 20 == 0:
+                                print(f"[RL] STALEMATE WARNING: {turn_count} turns! Forcing aggressive actions...")
+                                # Force build a Knight to break through Strong Towers
+                                provinces = payload.get_provinces(currentBotPlayer)
+                                for province in provinces:
+                                    if province.can_afford_unit(4):  # Knight
+                                        # Find enemy border hexes
+                                        move_zone = ai.detect_move_zone(province.capital, 4, payload)
+                                        enemy_hexes_nearby = [h for h in move_zone 
+                                                             if h.owner_id != currentBotPlayer 
+                                                             and h.owner_id != 0]
+                                        if enemy_hexes_nearby:
+                                            target = enemy_hexes_nearby[0]
+                                            print(f"[RL] Building Knight to attack ({target.x}, {target.y})")
+                                            if builder.add_place(Resident.Warrior4, province.capital.x, province.capital.y,
+                                                                 target.x, target.y) is not False:
+                                                province.money -= 40
+
+                            # RL bots learn from every turn, so only their rejected boards are kept
+                            if not USE_RL:
+                                transpositions.store(board_key, (ab.num, bytes(ab.buffer)), ai.last_evaluation)
+
+                        except Exception as e:
+                            print(f"[AI ERROR] {e}")
+                            import traceback
+                            traceback.print_exc()
+
+                    cache_hits += payload.cache.hits
+                    cache_misses += payload.cache.misses
+                    if builder is not ab:
+                        local_applied += builder.local.applied
+                        local_refused += builder.local.refused
+
+                    # Send moves and handle responses
+                    still_awaiting = True
+                    moves_were_rejected = False
+
+                    while still_awaiting:
+                        if ab.buffer and not moves_were_rejected:
+                            ab.send()
+                            tag, conf = receive_next()
+                            if tag == CONFIRMATION_SOCKET_TAG:
+                                approved, still_awaiting = conf
+                                if not _training_mode:
+                                    print(f"Approved: {approved}, Still awaiting: {still_awaiting}")
+                                if not approved:
+                                    debug_print(f"[AI] Move rejected, will send END_TURN on next board")
+                                    # Server already sent a new BOARD message after this rejection
+                                    # Its plan is now "end the turn", so we skip moves if we see this board again
+                                    transpositions.store(board_key, (0, b''))
+                                    ab.buffer.clear()
+                                    ab.num = 0
+                                    moves_were_rejected = True
+                                    # Don't break - continue to send END_TURN
+                            else:
+                                debug_print(f"[AI] Unexpected response: {tag}")
+                                # Unexpected response - clear buffer and break
                                 ab.buffer.clear()
                                 ab.num = 0
-                                moves_were_rejected = True
-                                # Don't break - continue to send END_TURN
+                                break
                         else:
-                            debug_print(f"[AI] Unexpected response: {tag}")
-                            # Unexpected response - clear buffer and break
-                            ab.buffer.clear()
-                            ab.num = 0
+                            # No more moves to send (or moves were rejected), end turn
+                            if moves_were_rejected:
+                                debug_print(f"[AI] Sending END_TURN after rejection")
+                            else:
+                                debug_print(f"[AI] Sending END_TURN")
+                            ab.add_end_turn()
+                            ab.send()  # Actually send the END_TURN command
+                            if turn_deadline is not None:
+                                used = turn_clock.finish(turn_deadline)
+                                if not _training_mode and turn_deadline.budget is not None:
+                                    print(f"[TIME] Turn used {used:.2f}s of {turn_deadline.budget:.2f}s")
+                            # After END_TURN, break and let outer loop handle the response
                             break
-                    else:
-                        # No more moves to send (or moves were rejected), end turn
-                        if moves_were_rejected:
-                            debug_print(f"[AI] Sending END_TURN after rejection")
-                        else:
-                            debug_print(f"[AI] Sending END_TURN")
-                        ab.add_end_turn()
-                        ab.send()  # Actually send the END_TURN command
-                        # After END_TURN, break and let outer loop handle the response
-                        break
-
-            elif tag == PLAYER_ELIMINATED_SOCKET_TAG:
-                victim_id = payload
-                if not TRAINING_MODE:
-                    print(f"Player {victim_id} eliminated!")
-                
-                # RL: Update policy if one of OUR bots got eliminated
-                if victim_id in ai_instances:
-                    p_state = player_states[victim_id]
-                    if USE_RL and p_state['prev_state'] is not None:
-                        if HAS_ENHANCED_QTABLE:
-                            # Use empty stats for elimination
-                            stats = {'my_hexes': 0, 'game_length': turn_count}
-                            final_reward = reward_calc.calculate_reward(stats, won=False, lost=True)
-                        else:
-                            final_reward = reward_calc.calculate(0, 0, 0, 0, won=False, lost=True)
-                        
-                        rl_policy.update(p_state['prev_state'], p_state['prev_action'], final_reward, p_state['prev_state'], done=True)
-                        p_state['prev_state'] = None  # Mark as done
-      
-            elif tag == GAME_OVER_SOCKET_TAG: # Koniec gry
-                game_count += 1
-                leaderboard = payload
-                winner_id = leaderboard[0]
-                
-                if not TRAINING_MODE:
-                    print(f"Game Over! Leaderboard: {leaderboard}")
-
-                # Update RL policy for ALL participating bots that are still active
-                if USE_RL:
-                    for pid, ai in ai_instances.items():
-                        p_state = player_states[pid]
-                        # If a bot wasn't eliminated (prev_state is not None), update it now
-                        if p_state['prev_state'] is not None:
-                            is_winner = (pid == winner_id)
-                            
-                            # Final rewards
+
+                elif tag == PLAYER_ELIMINATED_SOCKET_TAG:
+                    victim_id = payload
+                    if not TRAINING_MODE:
+                        print(f"Player {victim_id} eliminated!")
+
+                    # RL: Update policy if one of OUR bots got eliminated
+                    if victim_id in ai_instances:
+                        p_state = player_states[victim_id]
+                        if USE_RL and p_state['prev_state'] is not None:
                             if HAS_ENHANCED_QTABLE:
-                                # Start with base stats
-                                stats = {
-                                    'my_hexes': 0, 
-                                    'game_length': turn_count
-                                }
-                                final_reward = reward_calc.calculate_reward(stats, won=is_winner, lost=not is_winner)
-                            else:
-                                final_reward = reward_calc.calculate(0, 0, 0, 0, won=is_winner, lost=not is_winner)
-
-                            # Update Policy
-                            rl_policy.update(p_state['prev_state'], p_state['prev_action'], final_reward, p_state['prev_state'], done=True)
-                            p_state['prev_state'] = None # Reset
-                            
-                            if is_winner:
-                                wins += 1
-                                if not TRAINING_MODE:
-                                    print(f"[RL-P{pid}] WON THE GAME! Reward: {final_reward}")
+                                # Use empty stats for elimination
+                                stats = {'my_hexes': 0, 'game_length': turn_count}
+                                final_reward = reward_calc.calculate_reward(stats, won=False, lost=True)
                             else:
-                                losses += 1
-                                if not TRAINING_MODE:
-                                    print(f"[RL-P{pid}] LOST. Reward: {final_reward}")
-
-                    # Report Training Stats
-                    if game_count % 10 == 0:
-                        win_rate = (wins / (wins + losses)) * 100 if (wins + losses) > 0 else 0
-                        print(f"[STATS] Games: {game_count}, Total Wins: {wins}, Total Losses: {losses}, Rate: {win_rate:.1f}%")
-                        
-                        # Save policy periodically
-                        rl_policy.save(RL_SAVE_PATH)
-                        print(f"[RL] Saved policy to {RL_SAVE_PATH}")
-                    
-                    # Stop if target reached
-                    if TARGET_GAMES > 0 and game_count >= TARGET_GAMES:
-                         print(f"\n[RL] ======= TRAINING COMPLETE =======")
-                         print(f"[RL] Games: {game_count}")
-                         rl_policy.save(RL_SAVE_PATH)
-                         sock.close()
-                         sys.exit(0)
-
-                # Reset global tracking (though handled by config, good to be safe)
-                turn_count = 0
-                
-                break # Break inner loop to receive new configuration
-
-except Exception as e:
-    print("Connection error", e)
-    if not TRAINING_MODE:
-        input()
+                                final_reward = reward_calc.calculate(0, 0, 0, 0, won=False, lost=True)
+
+                            rl_policy.update(p_state['prev_state'], p_state['prev_action'], final_reward, p_state['prev_state'], done=True, trajectory=victim_id)
+                            p_state['prev_state'] = None  # Mark as done
+
+                elif tag == GAME_OVER_SOCKET_TAG: # Koniec gry
+                    game_count += 1
+                    PHASES.end_game()
+                    if USE_RL and HAS_ENHANCED_QTABLE:
+                        rl_policy.decay_epsilon()  # Once per game
+                    leaderboard = payload
+                    winner_id = leaderboard[0]
+
+                    if not TRAINING_MODE:
+                        print(f"Game Over! Leaderboard: {leaderboard}")
+
+                    # Update RL policy for ALL participating bots that are still active
+                    if USE_RL:
+                        for pid, ai in ai_instances.items():
+                            p_state = player_states[pid]
+                            # If a bot wasn't eliminated (prev_state is not None), update it now
+                            if p_state['prev_state'] is not None:
+                                is_winner = (pid == winner_id)
+
+                                # Final rewards
+                                if HAS_ENHANCED_QTABLE:
+                                    # Start with base stats
+                                    stats = {
+                                        'my_hexes': 0, 
+                                        'game_length': turn_count
+                                    }
+                                    final_reward = reward_calc.calculate_reward(stats, won=is_winner, lost=not is_winner)
+                                else:
+                                    final_reward = reward_calc.calculate(0, 0, 0, 0, won=is_winner, lost=not is_winner)
+
+                                # Update Policy
+                                rl_policy.update(p_state['prev_state'], p_state['prev_action'], final_reward, p_state['prev_state'], done=True, trajectory=pid)
+                                p_state['prev_state'] = None # Reset
+
+                                if is_winner:
+                                    wins += 1
+                                    if not TRAINING_MODE:
+                                        print(f"[RL-P{pid}] WON THE GAME! Reward: {final_reward}")
+                                else:
+                                    losses += 1
+                                    if not TRAINING_MODE:
+                                        print(f"[RL-P{pid}] LOST. Reward: {final_reward}")
+
+                        # Report Training Stats
+                        if game_count % 10 == 0:
+                            win_rate = (wins / (wins + losses)) * 100 if (wins + losses) > 0 else 0
+                            cache_rate = (cache_hits / (cache_hits + cache_misses)) * 100 if (cache_hits + cache_misses) > 0 else 0
+                            print(f"[STATS] Games: {game_count}, Total Wins: {wins}, Total Losses: {losses}, Rate: {win_rate:.1f}%, "
+                                  f"Board cache: {cache_hits} hits / {cache_misses} misses ({cache_rate:.1f}%), "
+                                  f"{turn_clock.summary()}, {transpositions.summary()}, "
+                                  f"Local state: {local_applied} applied / {local_refused} dropped")
+                            if PHASES.enabled:
+                                print(f"[STATS] {PHASES.summary()}")
+                                PHASES.reset()
+
+                            # Save policy periodically
+                            rl_policy.save(RL_SAVE_PATH)
+                            print(f"[RL] Saved policy to {RL_SAVE_PATH}")
+
+                        # Stop if target reached
+                        if TARGET_GAMES > 0 and game_count >= TARGET_GAMES:
+                             print(f"\n[RL] ======= TRAINING COMPLETE =======")
+                             print(f"[RL] Games: {game_count}")
+                             rl_policy.save(RL_SAVE_PATH)
+                             sock.close()
+                             sys.exit(0)
+
+                    # Reset global tracking (though handled by config, good to be safe)
+                    turn_count = 0
+
+                    break # Break inner loop to receive new configuration
+
+    except Exception as e:
+        print("Connection error", e)
+        if not TRAINING_MODE:
+            input()
 
-if sock:
-    sock.close()
\ No newline at end of file
+    if sock:
+        sock.close()
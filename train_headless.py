@@ -0,0 +1,192 @@
+"""
+Headless training: the receiver's bots play each other in-process on the
+Python rules engine (Antiyoy/bot/engine.py), no game window or socket.
+
+    python train_headless.py --games 1000 --players 4 --size 14
+
+With --workers N the policy is trained by self-play instead: N processes
+play the batched simulator (Antiyoy/bot/batch_sim.py) and this process
+learns from their transitions (Antiyoy/bot/selfplay.py):
+
+    python train_headless.py --workers 7 --seconds 600
+
+Policy updates follow the socket loop in receiver.py (per-turn shaped
+reward, terminal reward on elimination / game over), so a policy trained
+here can be loaded by receiver.py as usual.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# The root receiver.py, also in self-play worker processes (which inherit a
+# sys.path where Antiyoy/, with its own receiver.py, comes first)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import receiver
+from receiver import AiEasy, AiLadder, AiRL, Board, Hex, Resident
+from bot.engine import Engine, play_match
+from bot.phase_timer import PHASES
+from bot.selfplay import SelfPlayPool
+
+
+def make_policy(epsilon: float):
+    if receiver.HAS_ENHANCED_QTABLE:
+        policy = receiver.EnhancedQTable(num_actions=5, epsilon=epsilon, learning_rate=0.1, discount=0.99,
+                                         n_step=3, use_double=True, use_tiles=True)
+        return policy, receiver.ImprovedRewardShaping()
+    return receiver.QTablePolicy(num_actions=5, epsilon=epsilon), receiver.RewardCalculator()
+
+
+def final_reward(reward_calc, turn_count: int, won: bool) -> float:
+    if receiver.HAS_ENHANCED_QTABLE:
+        return reward_calc.calculate_reward({'my_hexes': 0, 'game_length': turn_count}, won=won, lost=not won)
+    return reward_calc.calculate(0, 0, 0, 0, won=won, lost=not won)
+
+
+def run_game(seed: int, args, policy, reward_calc):
+    engine = Engine.new_game(args.size, args.size, args.players, seed=seed)
+    bots = {}
+    states = {}
+    learners = set()  # seats whose transitions train the policy
+    for pid in range(1, args.players + 1):
+        if args.opponent and pid > 1:
+            ai = AiLadder(pid, args.opponent)
+        elif args.rule_based:
+            ai = AiEasy(pid)
+        else:
+            ai = AiRL(pid, policy=policy)
+            learners.add(pid)
+        bots[pid] = ai
+        states[pid] = {'prev_state': None, 'prev_action': None}
+
+    def turn(pid, board, builder):
+        ai = bots[pid]
+        p_state = states[pid]
+        if p_state.get('done'):
+            return
+        owner_counts = board.get_owner_counts()
+        my_hexes, my_units = owner_counts.get(pid, (0, 0))
+        enemy_hexes = sum(c[0] for owner, c in owner_counts.items() if owner != 0 and owner != pid)
+        ai.make_move(board, builder)
+        if pid in learners and p_state['prev_state'] is not None and p_state['prev_action'] is not None:
+            provinces = board.get_provinces(pid)
+            income = ai.get_province_income(provinces[0]) if provinces else 0
+            if receiver.HAS_ENHANCED_QTABLE:
+                stats = {'my_hexes': my_hexes, 'my_income': income, 'my_units': my_units,
+                         'enemy_hexes': enemy_hexes, 'game_length': engine.round}
+                reward = reward_calc.calculate_reward(stats, won=False, lost=False)
+            else:
+                reward = reward_calc.calculate(my_hexes, income, enemy_hexes, my_units, won=False, lost=False)
+            current_state = ai.last_state if ai.last_state else p_state['prev_state']
+            policy.update(p_state['prev_state'], p_state['prev_action'], reward, current_state, done=False,
+                          trajectory=pid)
+        if pid in learners and getattr(ai, 'last_state', None):
+            p_state['prev_state'] = ai.last_state
+            p_state['prev_action'] = ai.last_action
+
+    def after_turn(pid, board, builder):
+        # Eliminations: like PLAYER_ELIMINATED in the socket loop
+        losers = engine.leaderboard[1:] if engine.is_game_over() else engine.leaderboard
+        for victim in losers:
+            p_state = states[victim]
+            if not p_state.get('done'):
+                p_state['done'] = True
+                if victim in learners and p_state['prev_state'] is not None:
+                    policy.update(p_state['prev_state'], p_state['prev_action'],
+                                  final_reward(reward_calc, engine.round, False), p_state['prev_state'], done=True,
+                                  trajectory=victim)
+
+    board_factory = lambda e: e.to_board(Board, Hex, Resident)
+    result = play_match(engine, {pid: turn for pid in bots}, board_factory,
+                        max_rounds=args.max_rounds, on_turn=after_turn)
+
+    winner = result.winner
+    for pid, p_state in states.items():
+        if pid in learners and p_state['prev_state'] is not None and not p_state.get('done'):
+            policy.update(p_state['prev_state'], p_state['prev_action'],
+                          final_reward(reward_calc, engine.round, pid == winner), p_state['prev_state'], done=True,
+                          trajectory=pid)
+    if learners and receiver.HAS_ENHANCED_QTABLE:
+        policy.decay_epsilon()  # Once per game
+    return result
+
+
+def train_selfplay(args):
+    if not receiver.HAS_ENHANCED_QTABLE:
+        raise SystemExit("Self-play training needs the enhanced Q-table")
+    policy, _ = make_policy(args.epsilon)
+    policy.load(args.policy)
+
+    def report(stats):
+        print(f"[STATS] Transitions: {stats['transitions']} ({stats['transitions_per_sec']:.0f}/s), "
+              f"Turns: {stats['turns']} ({stats['turns_per_sec']:.0f}/s), Games: {stats['games']}, "
+              f"States: {len(policy.q_table_a)}, eps={policy.epsilon:.3f}")
+        policy.save(args.policy)
+
+    pool = SelfPlayPool(policy, workers=args.workers, width=args.size, height=args.size,
+                        num_players=args.players, max_rounds=args.max_rounds, seed=args.seed)
+    report(pool.train(seconds=args.seconds, report_every=30.0, on_report=report))
+    print(f"[RL] Saved policy to {args.policy}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the receiver bots without the game")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--size', type=int, default=14, help="Board width and height")
+    parser.add_argument('--max-rounds', type=int, default=receiver.FORCE_END_AT_TURNS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--epsilon', type=float, default=0.3)
+    parser.add_argument('--policy', default=receiver.RL_SAVE_PATH)
+    parser.add_argument('--rule-based', action='store_true', help="AiEasy only, nothing is learned")
+    parser.add_argument('--opponent', choices=['easy', 'normal', 'hard', 'expert', 'balancer'],
+                        help="Seats 2.. play this ladder bot (bot/ladder.py) instead of the learner")
+    parser.add_argument('--phase-timing', action='store_true',
+                        help="Time the phases of bot turns; p50/p95/max printed with [STATS] (bot/phase_timer.py)")
+    parser.add_argument('--verbose', action='store_true', help="Keep the bots' per-turn output")
+    parser.add_argument('--workers', type=int, default=0, help="Self-play worker processes (0 = play real bots)")
+    parser.add_argument('--seconds', type=float, default=600, help="Self-play training time")
+    args = parser.parse_args()
+
+    if args.workers:
+        train_selfplay(args)
+        return
+
+    if not args.verbose:
+        receiver.TRAINING_MODE = True
+        receiver._training_mode = True
+    PHASES.enabled = args.phase_timing
+
+    policy, reward_calc = make_policy(args.epsilon)
+    if not args.rule_based:
+        policy.load(args.policy)
+
+    wins = [0] * (args.players + 1)
+    turns = 0
+    rejected = 0
+    unfinished = 0
+    started = time.perf_counter()
+    for game in range(1, args.games + 1):
+        result = run_game(args.seed + game, args, policy, reward_calc)
+        PHASES.end_game()
+        wins[result.winner] += 1
+        turns += result.turns
+        rejected += result.rejected
+        unfinished += not result.finished
+        if game % 10 == 0 or game == args.games:
+            elapsed = time.perf_counter() - started
+            print(f"[STATS] Games: {game}, Wins by seat: {wins[1:]}, Unfinished: {unfinished}, "
+                  f"Turns: {turns} ({turns / elapsed * 60:.0f}/min), Rejected batches: {rejected}")
+            if PHASES.enabled:
+                print(f"[STATS] {PHASES.summary()}")
+                PHASES.reset()
+            if not args.rule_based:
+                policy.save(args.policy)
+    if not args.rule_based:
+        policy.save(args.policy)
+        print(f"[RL] Saved policy to {args.policy}")
+
+
+if __name__ == "__main__":
+    main()